@@ -0,0 +1,36 @@
+"""Distance-based activity tiers.
+
+Things near the player update every tick, things a bit further away every few ticks
+(with a proportionally bigger dt, staggered so they don't all land on the same tick),
+and things far away don't update at all until the player comes back. Each kind of
+entity gets its own ActivityTiers with its own ranges.
+"""
+import numpy as np
+
+NEAR, MID, FAR = 0, 1, 2
+
+
+class ActivityTiers:
+    def __init__(self, near=20, mid=60, mid_interval=4):
+        """near/mid are XZ distances from the player; mid-range things update every mid_interval ticks."""
+        self.near = near
+        self.mid = mid
+        self.mid_interval = mid_interval
+
+    def tiers(self, positions, center):
+        """NEAR / MID / FAR for each row of an (N, 3) positions array."""
+        dx = positions[:, 0] - center[0]
+        dz = positions[:, 2] - center[2]
+        distance_sq = dx * dx + dz * dz
+        return np.where(distance_sq < self.near ** 2, NEAR, np.where(distance_sq < self.mid ** 2, MID, FAR))
+
+    def schedule(self, slots, positions, center, tick):
+        """Which of `slots` update on `tick`, and how many ticks' worth of dt each one gets."""
+        tier = self.tiers(positions, center)
+        due = (tier == NEAR) | ((tier == MID) & ((tick + slots) % self.mid_interval == 0))
+        return due, np.where(tier == NEAR, 1, self.mid_interval)
+
+    def tier(self, x, z, center):
+        """The tier of a single thing at (x, z)."""
+        distance_sq = (x - center[0]) ** 2 + (z - center[2]) ** 2
+        return NEAR if distance_sq < self.near ** 2 else MID if distance_sq < self.mid ** 2 else FAR
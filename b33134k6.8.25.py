@@ -1,12 +1,10 @@
 from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
+from headless import make_app, run
+from static_batch import flatten_static
+from hud import HudText
 
-app = Ursina()
-window.title = 'Peach\'s Castle'
-window.size = (600,400)
-window.exit_button.visible = False
-window.fullscreen = False
-window.fps_counter.enabled = False
+app = make_app(title='Peach\'s Castle', size=(600,400), fullscreen=False, fps_counter=False, exit_button=False)
 
 # Skybox
 sky = Entity(
@@ -29,9 +27,10 @@ castle = Entity(model='cube', color=color.brown, scale=(30,20,30), collider='box
 castle.position = (0,10,-30)
 
 # Towers
+towers = []
 for i in range(4):
     angle = i * 90
-    tower = Entity(
+    towers.append(Entity(
         model='cylinder',
         color=color.brown,
         scale=(5,15,5),
@@ -39,19 +38,20 @@ for i in range(4):
         x=sin(angle)*18,
         z=cos(angle)*18,
         y=20
-    )
+    ))
 
 # Windows
+windows = []
 for y in range(5):
     for x in range(2):
-        window = Entity(
+        windows.append(Entity(
             model='cube',
             color=color.white,
             scale=(4,5,0.1),
             x=(-10 + x*20),
             z=25,
             y=(y*5 + 10)
-        )
+        ))
 
 # Main door
 door = Entity(
@@ -78,12 +78,16 @@ moat = Entity(
     collider='box'
 )
 
+# None of the castle moves, so draw it as one batch; floor, castle and moat keep their colliders
+castle_scene = flatten_static([sky, floor, castle, *towers, *windows, door, door_frame, flagpole, flag, flag_white, moat])
+
 # HUD Elements (SM64-style)
 hud = Entity(parent=camera.ui)
 lives = Text(text='x3', scale=2, origin=(-1.8,0), position=(-0.8,0.4), color=color.white)
 coins = Text(text='0', scale=2, origin=(-1.8,0), position=(-0.5,0.4), color=color.white)
 stars = Text(text='0', scale=2, origin=(-1.8,0), position=(-0.2,0.4), color=color.white)
 timer = Text(text='00:00', scale=2, origin=(-1.8,0), position=(-0.8,-0.35), color=color.white)
+timer_text = HudText(timer, '{:02d}:00') # Only re-laid out when the second ticks over
 
 # Camera controls
 player = FirstPersonController()
@@ -92,7 +96,7 @@ player.cursor.visible = False
 player.position = (0,15,-40)
 
 def update():
-    timer.text = str(int(time.time() - start_time)).zfill(2)+':00'
+    timer_text.set(int(time.time() - start_time))
 
 start_time = time.time()
-app.run()
+run(app)
@@ -0,0 +1,269 @@
+"""Headless benchmarks.
+
+Times the parts of the game that run without a window: loading each world, one
+simulation tick of the player, Goombas, stars and a 1000-player swarm, collision
+queries against levels of different sizes, and building a level's collision index,
+mesh buffers and chunk grid for 10 up to 100k platforms, and opening the same levels
+precompiled. If Ursina is installed, it also runs the 60fps build headless in a child
+process (a process only gets one app) and times its frames, the portals' update() and
+turning those mesh buffers into an Ursina Mesh. Results go to a JSON file so two
+commits can be compared.
+
+    python bench.py -o bench-new.json
+    python bench.py --quick --compare bench-old.json
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from collectibles import CollectibleGrid
+from collision_index import SpatialIndex
+from game_sim import GameSim
+from goomba_system import GoombaSystem
+from level_chunks import ChunkGrid
+from level_mesh import box_mesh_arrays, optimized_mesh_arrays
+from level_pack import PackedLevel, compile_world
+from mario_swarm import MarioSwarm, Wander
+from worlds import WORLDS
+
+TICK = 1 / 120
+BUILD = 'deltamario4k60fps6.9.25.a.py' # The build bench_ursina runs
+LEVEL_SIZES = (10, 100, 1000, 10000, 100000)
+QUERY_LEVEL_SIZES = (100, 10000)
+
+
+def measure(fn, repeat=5, number=1):
+    """Calls fn `number` times per sample, `repeat` samples, and returns per-call stats in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1000)
+    return {
+        'mean_ms': sum(samples) / len(samples),
+        'min_ms': min(samples),
+        'max_ms': max(samples),
+        'calls': repeat * number,
+    }
+
+
+def synthetic_platforms(count, seed=0):
+    """Random floating platforms, spread out so the density stays about the same at any count."""
+    rng = random.Random(seed)
+    extent = 10 * math.sqrt(count)
+    return [(rng.uniform(-extent, extent), rng.uniform(0, 20), rng.uniform(-extent, extent),
+             rng.uniform(2, 8), 1, rng.uniform(2, 8)) for _ in range(count)]
+
+
+def bench_load_world(results, repeat):
+    sim = GameSim()
+    for name in WORLDS:
+        results[f'load_world/{name}'] = measure(lambda: sim.load_world(name), repeat, 20)
+
+
+def bench_updates(results, repeat):
+    """Per-tick cost of each system on the grass world, plus crowded versions of each."""
+    sim = GameSim()
+    sim.load_world('grass')
+    body = sim.body
+    angle = [0.0]
+
+    def player():
+        # Run in a circle so we keep hitting platforms instead of idling on one spot
+        angle[0] += 0.01
+        body.handle_input(math.cos(angle[0]), math.sin(angle[0]), TICK)
+        body.update_physics(TICK)
+        if body.position[1] < sim.kill_height:
+            sim.respawn()
+
+    results['update/player'] = measure(player, repeat, 1000)
+    results['update/goombas'] = measure(lambda: sim.goombas.update(TICK, sim.level, body), repeat, 1000)
+    x, y, z = body.position
+    results['update/stars'] = measure(lambda: sim.stars.collect_near(x, y + 50, z), repeat, 1000)
+    results['update/tick'] = measure(lambda: sim.tick(TICK, 0.5, 0.5), repeat, 1000)
+
+    platforms = synthetic_platforms(1000)
+    level = SpatialIndex(platforms)
+    goombas = GoombaSystem(seed=0)
+    for px, py, pz, sx, sy, sz in platforms:
+        goombas.add((px, py + sy / 2 + 0.4, pz))
+    body.level = level
+    results['update/goombas_1000'] = measure(lambda: goombas.update(TICK, level, body), repeat, 100)
+
+    stars = CollectibleGrid()
+    for px, py, pz, sx, sy, sz in synthetic_platforms(10000, seed=1):
+        stars.add((px, py + 2, pz))
+    results['update/stars_10000'] = measure(lambda: stars.collect_near(0, 500, 0), repeat, 1000)
+
+    # 1000 independent players on the grass world, stepped together
+    sim.load_world('grass')
+    swarm = MarioSwarm(sim.level, np.tile(sim.spawn_point(), (1000, 1)))
+    wander = Wander()
+    rng = np.random.default_rng(0)
+    tick = [0]
+
+    def players():
+        tick[0] += 1
+        move, jump, long_jump = wander(swarm, tick[0], rng)
+        swarm.step(move, TICK, jump, long_jump)
+        swarm.teleport(swarm.position[:, 1] < sim.kill_height, sim.spawn_point())
+
+    results['update/swarm_1000'] = measure(players, repeat, 100)
+
+
+def bench_collision(results, repeat, sizes):
+    """Query throughput against synthetic levels; each sample runs a fixed batch of random queries."""
+    half = (0.4, 0.9, 0.4)
+    for count in sizes:
+        level = SpatialIndex(synthetic_platforms(count))
+        extent = 10 * math.sqrt(count)
+        rng = np.random.default_rng(count)
+        origins = np.column_stack([rng.uniform(-extent, extent, 1000), rng.uniform(0, 25, 1000),
+                                   rng.uniform(-extent, extent, 1000)])
+        deltas = rng.normal(0, 0.2, (1000, 3))
+        points = origins.tolist()
+        moves = deltas.tolist()
+
+        def sweeps():
+            for center, delta in zip(points, moves):
+                level.sweep(center, half, delta)
+
+        def raycasts():
+            for origin in points:
+                level.raycast(origin, (0, -1, 0), 5)
+
+        def boxes():
+            for x, y, z in points:
+                level.query_aabb((x - 1, y - 1, z - 1), (x + 1, y + 1, z + 1))
+
+        for name, fn in (('sweep', sweeps), ('raycast', raycasts), ('query_aabb', boxes),
+                         ('raycast_many', lambda: level.raycast_many(origins, (0, -1, 0), 5))):
+            stats = measure(fn, repeat)
+            stats['queries_per_second'] = 1000 / (stats['mean_ms'] / 1000)
+            results[f'collision/{count}/{name}'] = stats
+
+
+def bench_level_build(results, repeat, sizes):
+    for count in sizes:
+        platforms = synthetic_platforms(count)
+        samples = max(1, repeat // (1 + count // 10000))
+        results[f'level_build/{count}'] = measure(lambda: SpatialIndex(platforms), samples)
+        results[f'level_mesh/{count}'] = measure(lambda: box_mesh_arrays(platforms), samples)
+        results[f'level_mesh_optimized/{count}'] = measure(lambda: optimized_mesh_arrays(platforms), samples)
+        results[f'level_chunks/{count}'] = measure(lambda: ChunkGrid(platforms), samples)
+
+
+def bench_packed_load(results, repeat, sizes):
+    """Opening a compiled .mlvl (index and mesh included) against building the same level from tuples."""
+    with tempfile.TemporaryDirectory() as folder:
+        for count in sizes:
+            path = os.path.join(folder, f'{count}.mlvl')
+            compile_world(str(count), {'platforms': synthetic_platforms(count), 'stars': [], 'goombas': []}, path)
+            results[f'load_packed/{count}'] = measure(lambda: PackedLevel(path).world_data(), repeat)
+
+
+def ursina_benchmarks(repeat, sizes):
+    """The Ursina side of the 60fps build. Needs a process of its own; bench_ursina starts one."""
+    import headless
+    random.seed(0) # the build scatters props at random; the same layout every run
+    game = headless.load_game(os.path.join(os.path.dirname(os.path.abspath(__file__)), BUILD))
+    from ursina import Mesh
+
+    results = {}
+    game.step(10) # past the first frames' one-off setup
+    results['ursina/frame/hub'] = measure(lambda: game.step(), repeat, 60)
+    portals = list(game['registry'].of('portal'))
+
+    def portal_updates():
+        for portal in portals:
+            portal.update()
+
+    results['ursina/portal_update'] = measure(portal_updates, repeat, 1000)
+    results['ursina/update_portal'] = measure(game['player'].update_portal, repeat, 1000)
+    for count in sizes:
+        vertices, triangles, uvs = optimized_mesh_arrays(synthetic_platforms(count))
+        samples = max(1, repeat // (1 + count // 10000))
+        results[f'ursina/mesh/{count}'] = measure(
+            lambda: Mesh(vertices=vertices, triangles=triangles, uvs=uvs, static=True), samples)
+    return results
+
+
+def bench_ursina(results, repeat, sizes):
+    if importlib.util.find_spec('ursina') is None:
+        print('ursina is not installed, skipping the Ursina benchmarks', file=sys.stderr)
+        return
+    code = f'import bench, json; print(json.dumps(bench.ursina_benchmarks({repeat}, {tuple(sizes)})))'
+    child = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                           capture_output=True, text=True, check=True)
+    results.update(json.loads(child.stdout.strip().splitlines()[-1])) # Ursina prints its own lines first
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(quick=False):
+    repeat = 3 if quick else 7
+    sizes = LEVEL_SIZES[:-1] if quick else LEVEL_SIZES
+    results = {}
+    bench_load_world(results, repeat)
+    bench_updates(results, repeat)
+    bench_collision(results, repeat, QUERY_LEVEL_SIZES)
+    bench_level_build(results, repeat, sizes)
+    bench_packed_load(results, repeat, sizes)
+    bench_ursina(results, repeat, sizes)
+    return {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'quick': quick,
+        'results': results,
+    }
+
+
+def compare(old, new):
+    """Prints each benchmark's mean against an older run; >1x means the new run is slower."""
+    print(f'{"benchmark":40} {"old ms":>10} {"new ms":>10} {"ratio":>7}')
+    for name, stats in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print(f'{name:40} {"-":>10} {stats["mean_ms"]:10.4f}')
+            continue
+        ratio = stats['mean_ms'] / before['mean_ms'] if before['mean_ms'] else math.inf
+        print(f'{name:40} {before["mean_ms"]:10.4f} {stats["mean_ms"]:10.4f} {ratio:6.2f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless benchmarks for the Mario builds.')
+    parser.add_argument('-o', '--output', help='write results to this JSON file (default: stdout)')
+    parser.add_argument('--quick', action='store_true', help='fewer samples and no 100k-platform level')
+    parser.add_argument('--compare', metavar='OLD_JSON', help='print a comparison against an earlier run')
+    args = parser.parse_args()
+
+    report = run(args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
@@ -3,12 +3,21 @@ from ursina.prefabs.first_person_controller import FirstPersonController
 import random
 import math
 import cProfile
-
-app = Ursina()
-window.title = 'Mario Platformer'
-window.size = (600, 400)
-window.vsync = True  # Keep vsync for smooth 60 FPS, adjustable in GPU settings
-window.fps_counter.enabled = True
+from collectibles import CollectibleGrid, star_transform
+from collision_index import SpatialIndex
+from instanced_props import InstancedProps
+from level_mesh import box_mesh_arrays
+from entity_registry import EntityRegistry
+from hud import HudText
+from events import EventBus, TimerWheel
+from headless import make_app, run
+
+app = make_app(
+    title='Mario Platformer',
+    size=(600, 400),
+    vsync=True,  # Keep vsync for smooth 60 FPS, adjustable in GPU settings
+    fps_counter=True,
+)
 
 class GameState:
     def __init__(self):
@@ -21,7 +30,17 @@ class GameState:
             'lava': 15
         }
 
+    def on_star_collected(self, star_count):
+        for world_name, required in self.world_star_requirements.items():
+            if star_count >= required and world_name not in self.unlocked_worlds:
+                self.unlocked_worlds.append(world_name)
+                events.emit('portal_unlocked', world_name)
+
 game_state = GameState()
+events = EventBus() # star_collected, portal_reached/left, portal_unlocked, world_entered
+events.subscribe('star_collected', game_state.on_star_collected)
+timers = TimerWheel() # Delayed cleanups, stepped once a frame by update()
+stars = CollectibleGrid(pickup_radius=1.5, spherical=True)
 
 class MarioController(Entity):
     def __init__(self):
@@ -48,13 +67,19 @@ class MarioController(Entity):
         camera.position = (0, 2, -8)
         camera.rotation_x = 10
         self.movement_input = Vec3(0, 0, 0)
-        self.last_raycast_time = 0
-        self.raycast_interval = 0.05  # Reduce raycast frequency
+        # Ground and walls come from the level's boxes, cheap enough to check every frame
+        self.half_height = 0.8
+        self.step_height = 0.9  # Ground this far above our feet still counts, so we step up onto it
+        self.snap_distance = 0.2  # ...and this far below them, so we stick to the floor
+        self.wall_distance = 1.5
+        self.portal = None # The portal we're standing at, if any
+        self.portal_distance = 2
 
     def update(self):
         self.handle_input()
         self.update_movement()
         self.update_camera()
+        self.update_portal()
         self.jump_timer += time.dt
         self.wall_jump_timer += time.dt
         if self.y < -20:
@@ -93,22 +118,28 @@ class MarioController(Entity):
             self.air_time += time.dt
 
         new_y = self.y + self.velocity_y * time.dt
-        if time.time - self.last_raycast_time > self.raycast_interval:
-            ground_ray = raycast(self.world_position + Vec3(0, 0.1, 0), Vec3(0, -1, 0), distance=2, ignore=[self])
-            self.last_raycast_time = time.time
-            if ground_ray.hit and ground_ray.distance < 1.1:
-                if self.velocity_y <= 0:
-                    self.y = ground_ray.world_point.y + 0.8
-                    if not self.grounded:
-                        self.land()
-                    self.grounded = True
-                    self.velocity_y = 0
-                    self.air_time = 0
-                else:
-                    self.y = new_y
-            else:
-                self.y = new_y
-                self.grounded = False
+        ground = self.ground_below(new_y) if self.velocity_y <= 0 else None
+        if ground is not None:
+            self.y = ground + self.half_height
+            if not self.grounded:
+                self.land()
+            self.grounded = True
+            self.velocity_y = 0
+            self.air_time = 0
+        else:
+            self.y = new_y
+            self.grounded = False
+
+    def ground_below(self, new_y):
+        """Top of the highest platform under the middle of the player that we'd land on this frame, or None.
+
+        Looks from step_height above our feet down to snap_distance below where this frame's
+        fall takes them, so even a fast fall can't skip past a platform.
+        """
+        feet = self.y - self.half_height
+        low = min(feet, new_y - self.half_height) - self.snap_distance
+        high = feet + self.step_height
+        return level.ground_height(self.x, (low + high) / 2, self.z, 0, 0, (high - low) / 2)
 
     def jump(self):
         if self.grounded:
@@ -146,13 +177,11 @@ class MarioController(Entity):
             self.jump_count = 0
 
     def check_collision(self, movement):
-        test_pos = self.position + movement
-        collision_ray = raycast(test_pos + Vec3(0, 0.5, 0), Vec3(0, -1, 0), distance=2, ignore=[self])
-        wall_ray = raycast(self.world_position, movement.normalized(), distance=1.5, ignore=[self])
-        if wall_ray.hit:
-            self.can_wall_jump = True
-            return True
-        return False
+        """Whether a wall is within wall_distance of our middle the way we're moving (which allows a wall jump)."""
+        if level.raycast(tuple(self.position), tuple(movement.normalized()), self.wall_distance) is None:
+            return False
+        self.can_wall_jump = True
+        return True
 
     def update_camera(self):
         target_pos = self.position + Vec3(0, 2, 0)
@@ -161,41 +190,55 @@ class MarioController(Entity):
             self.camera_pivot.rotation_y += mouse.velocity.x * 30
             self.camera_pivot.rotation_x = max(-80, min(80, self.camera_pivot.rotation_x - mouse.velocity.y * 30))
 
+    def update_portal(self):
+        """Tells everyone when we walk up to a portal or away from it, rather than each portal checking every frame."""
+        near = None
+        for portal in registry.of('portal'):
+            if distance(self, portal) < self.portal_distance:
+                near = portal
+                break
+        if near is self.portal:
+            return
+        if self.portal is not None:
+            events.emit('portal_left', self.portal)
+        self.portal = near
+        if near is not None:
+            events.emit('portal_reached', near)
+
     def respawn(self):
         if game_state.current_world == 'hub':
             self.position = (0, 2, 0)
         else:
             self.position = (0, 5, -10)
 
-class Star(Button):
+class Star(Entity):
     def __init__(self, position=(0, 1, 0), **kwargs):
-        super().__init__(
-            parent=scene,
-            model='cube',
-            texture='white_cube',
-            color=color.yellow,
-            scale=0.5,
-            position=position,
-            collider='box'
-        )
-        self.rotation_speed = 50
-        self.float_amplitude = 0.3
-        self.float_speed = 2
-        self.start_y = position[1]
-
-    def update(self):
-        self.rotation_y += self.rotation_speed * time.dt
-        self.y = self.start_y + math.sin(time.time() * self.float_speed) * self.float_amplitude
-        if distance(self, player) < 1.5:
-            self.collect()
+        super().__init__(parent=scene, position=position)
+        # Model, spin and bob come from the CollectibleManager's shared prototype
+        collectible_manager.star_model.instanceTo(self)
+        self.slot = stars.add(position, self)
+        registry.add(self, 'star', current_world)
 
     def collect(self):
         game_state.stars += 1
-        destroy(self)
         collection_effect = Entity(model='cube', color=color.gold, scale=0.8, position=self.position)
         collection_effect.animate_scale(2, duration=0.5)
         collection_effect.animate('color', color.clear, duration=0.5)
-        destroy(collection_effect, delay=0.5)
+        timers.after(0.5, destroy, collection_effect)
+        destroy(self) # Last, our node is gone after this
+        events.emit('star_collected', game_state.stars)
+
+class CollectibleManager(Entity):
+    """Animates the shared star model and runs pickups for the player's nearby grid cells only."""
+    def __init__(self):
+        super().__init__()
+        self.star_model = Entity(model='cube', texture='white_cube', color=color.yellow, scale=0.5)
+        self.star_model.parent = NodePath('star_prototype') # Only ever drawn through its instances
+
+    def update(self):
+        self.star_model.rotation_y, self.star_model.y = star_transform(time.time(), float_amplitude=0.3)
+        for i in stars.collect_near(*player.position):
+            stars.entities[i].collect()
 
 class Goomba(Entity):
     def __init__(self, position=(0, 0, 0), **kwargs):
@@ -211,17 +254,17 @@ class Goomba(Entity):
         self.change_direction_timer = 0
         self.patrol_range = 5
         self.start_position = Vec3(position)
+        registry.add(self, 'goomba', current_world)
 
     def update(self):
         self.change_direction_timer += time.dt
         if (self.change_direction_timer > 3 or 
-            distance(self, Entity(position=self.start_position)) > self.patrol_range):
+            (self.position - self.start_position).length() > self.patrol_range):
             self.direction = Vec3(random.uniform(-1, 1), 0, random.uniform(-1, 1)).normalized()
             self.change_direction_timer = 0
         movement = self.direction * self.move_speed * time.dt
-        if not raycast(self.position + movement + Vec3(0, 0.5, 0), Vec3(0, -1, 0), distance=2, ignore=[self]).hit:
-            pass
-        else:
+        # Only walk on if there's ground from half a unit above us to 1.5 below where we'd end up
+        if level.ground_height(self.x + movement.x, self.y - 0.5, self.z + movement.z, 0, 0, 1) is not None:
             self.position += movement
         if distance(self, player) < 1.2 and player.y > self.y + 0.5:
             if player.velocity_y < 0:
@@ -232,7 +275,7 @@ class Goomba(Entity):
         defeat_effect = Entity(model='cube', color=color.orange, scale=0.5, position=self.position)
         defeat_effect.animate_scale(1.5, duration=0.3)
         defeat_effect.animate('color', color.clear, duration=0.3)
-        destroy(defeat_effect, delay=0.3)
+        timers.after(0.3, destroy, defeat_effect)
         destroy(self)
 
 class WorldPortal(Button):
@@ -249,56 +292,105 @@ class WorldPortal(Button):
         self.required_stars = required_stars
         self.original_color = color_theme
         self.rotation_speed = 20
-
-    def update(self):
-        self.rotation_y += self.rotation_speed * time.dt
-        if distance(self, player) < 2:
-            if game_state.stars >= self.required_stars:
-                self.color = lerp(self.color, color.white, time.dt * 3)
-                if held_keys['e']:
-                    self.enter_world()
+        self.unlocked = game_state.stars >= required_stars
+        # A looping Panda3D interval spins it, so a portal has no update() of its own
+        self.spin = self.hprInterval(360 / self.rotation_speed, (-360, 0, 0), startHpr=(0, 0, 0))
+        self.spin.loop()
+        events.subscribe('portal_unlocked', self.on_portal_unlocked)
+        events.subscribe('portal_reached', self.on_portal_reached)
+        registry.add(self, 'portal', current_world)
+
+    def on_portal_unlocked(self, world_name):
+        if world_name == self.world_name:
+            self.unlocked = True
+
+    def on_portal_reached(self, portal):
+        if portal is self:
+            if self.unlocked:
+                self.animate('color', color.white, duration=0.5)
             else:
                 self.color = color.gray
 
     def enter_world(self):
+        if not self.unlocked:
+            return
         game_state.current_world = self.world_name
         load_world(self.world_name)
 
+    def on_destroy(self):
+        self.spin.finish()
+        events.unsubscribe('portal_unlocked', self.on_portal_unlocked)
+        events.unsubscribe('portal_reached', self.on_portal_reached)
+
 class UI:
     def __init__(self):
         self.star_text = Text(f'{game_state.stars}', position=(-0.85, 0.45), scale=2, color=color.yellow)
         self.instruction_text = Text('', position=(0, -0.45), scale=1, color=color.white, origin=(0, 0))
-
-    def update(self):
-        self.star_text.text = f'{game_state.stars}'
+        self.stars = HudText(self.star_text)
+        self.instruction = HudText(self.instruction_text)
+        self.instruction_hider = None
+        events.subscribe('star_collected', self.stars.set)
+        events.subscribe('portal_reached', self.on_portal_reached)
+        events.subscribe('portal_left', lambda portal: self.hide_instruction())
+        events.subscribe('portal_unlocked', lambda world_name: self.show_instruction(f'{world_name.title()} unlocked!', 2))
+        events.subscribe('world_entered', lambda world_name: self.hide_instruction())
+
+    def on_portal_reached(self, portal):
+        if portal.unlocked:
+            self.show_instruction(f"Press 'E' to enter {portal.world_name.title()}")
+        else:
+            self.show_instruction(f'Need {portal.required_stars - game_state.stars} more stars!')
+
+    def show_instruction(self, text, duration=None):
+        """Shows text until hide_instruction(), or for `duration` seconds if one is given."""
+        if self.instruction_hider is not None:
+            self.instruction_hider.cancel()
+        self.instruction.set(text)
+        self.instruction_text.enabled = True
+        self.instruction_hider = timers.after(duration, self.hide_instruction) if duration else None
+
+    def hide_instruction(self):
+        if self.instruction_hider is not None:
+            self.instruction_hider.cancel()
+            self.instruction_hider = None
+        self.instruction_text.enabled = False
+
+def scenery(entity):
+    """Files a piece of level geometry under the world being built, so clear_world finds it."""
+    return registry.add(entity, 'scenery', current_world)
+
+def solid(entity):
+    """scenery() for geometry the player stands on and bumps into; its box goes into the level too."""
+    level_platforms.append((*entity.position, *entity.scale))
+    return scenery(entity)
+
+def spawn_props(count, prop_color, scale, spread, y):
+    """Scatters `count` boxes as one instanced node. Their boxes go into the level, so they still block."""
+    positions = [(random.uniform(-spread, spread), y, random.uniform(-spread, spread)) for i in range(count)]
+    level_platforms.extend((*position, *scale) for position in positions)
+    return scenery(InstancedProps(model='cube', color=prop_color, positions=positions, scales=scale))
+
+def create_platforms(platforms, platform_color):
+    """Builds a world's (x, y, z, sx, sy, sz) platforms as one merged mesh, straight from level_mesh's buffers."""
+    level_platforms.extend(platforms)
+    vertices, triangles, uvs = box_mesh_arrays(platforms)
+    # No mesh collider: the player and Goombas collide through the world's SpatialIndex
+    return scenery(Entity(model=Mesh(vertices=vertices, triangles=triangles, uvs=uvs, static=True),
+                          color=platform_color))
 
 def create_hub_world():
-    clear_world()
-    ground = Entity(model='cube', color=color.green, scale=(20, 1, 20), position=(0, -1, 0), collider='box')
-    castle = Entity(model='cube', color=color.gray, scale=(4, 6, 4), position=(0, 2, 0), collider='box')
+    ground = solid(Entity(model='cube', color=color.green, scale=(20, 1, 20), position=(0, -1, 0), collider='box'))
+    castle = solid(Entity(model='cube', color=color.gray, scale=(4, 6, 4), position=(0, 2, 0), collider='box'))
     portals = [
         WorldPortal((-8, 1, 5), 'grass', 0, color.green),
         WorldPortal((8, 1, 5), 'desert', 3, color.yellow),
         WorldPortal((-8, 1, -5), 'ice', 8, color.cyan),
         WorldPortal((8, 1, -5), 'lava', 15, color.red),
     ]
-    for i in range(8):
-        tree = Entity(model='cube', color=color.dark_green, 
-                     scale=(1, 3, 1), 
-                     position=(random.uniform(-15, 15), 0.5, random.uniform(-15, 15)),
-                     collider='box')
+    spawn_props(8, color.hex('#006400'), (1, 3, 1), 15, 0.5)
 
 def create_grass_world():
-    clear_world()
-    # Combine platforms into one mesh
-    level_parent = Entity(model=Mesh(vertices=[], uvs=[]), color=color.green, collider='mesh')
-    platform_positions = [(0, -1, 0, 15, 1, 15), (12, 2, 5, 8, 1, 8), (-10, 4, -8, 6, 1, 6), (5, 6, -12, 10, 1, 4)]
-    for x, y, z, sx, sy, sz in platform_positions:
-        cube = Entity(model='cube', scale=(sx, sy, sz), position=(x, y, z))
-        cube.parent = level_parent
-        level_parent.model.vertices.extend([Vec3(v.x * sx + x, v.y * sy + y, v.z * sz + z) for v in cube.model.vertices])
-        destroy(cube)
-    level_parent.model.generate()
+    create_platforms([(0, -1, 0, 15, 1, 15), (12, 2, 5, 8, 1, 8), (-10, 4, -8, 6, 1, 6), (5, 6, -12, 10, 1, 4)], color.green)
     
     stars = [
         Star((0, 2, 0)),
@@ -313,21 +405,13 @@ def create_grass_world():
         Goomba((12, 4, 8)),
         Goomba((-8, 6, -8)),
     ]
-    Entity(model='cube', color=color.purple, scale=(2, 3, 1), position=(0, 1, -12), collider='box')
+    solid(Entity(model='cube', color=color.hex('#800080'), scale=(2, 3, 1), position=(0, 1, -12), collider='box'))
 
 def create_desert_world():
-    clear_world()
-    level_parent = Entity(model=Mesh(vertices=[], uvs=[]), color=color.orange, collider='mesh')
-    platform_positions = [(0, -1, 0, 12, 1, 12), (15, 3, 8, 6, 1, 6), (-12, 5, -6, 8, 1, 4), (8, 8, -15, 4, 1, 8)]
-    for x, y, z, sx, sy, sz in platform_positions:
-        cube = Entity(model='cube', scale=(sx, sy, sz), position=(x, y, z))
-        cube.parent = level_parent
-        level_parent.model.vertices.extend([Vec3(v.x * sx + x, v.y * sy + y, v.z * sz + z) for v in cube.model.vertices])
-        destroy(cube)
-    level_parent.model.generate()
+    create_platforms([(0, -1, 0, 12, 1, 12), (15, 3, 8, 6, 1, 6), (-12, 5, -6, 8, 1, 4), (8, 8, -15, 4, 1, 8)], color.orange)
     
-    pyramid1 = Entity(model='cube', color=color.yellow, scale=(3, 4, 3), position=(6, 1, 6), collider='box')
-    pyramid2 = Entity(model='cube', color=color.yellow, scale=(2, 6, 2), position=(-8, 2, -3), collider='box')
+    pyramid1 = solid(Entity(model='cube', color=color.yellow, scale=(3, 4, 3), position=(6, 1, 6), collider='box'))
+    pyramid2 = solid(Entity(model='cube', color=color.yellow, scale=(2, 6, 2), position=(-8, 2, -3), collider='box'))
     stars = [
         Star((0, 2, 0)),
         Star((15, 6, 8)),
@@ -342,21 +426,9 @@ def create_desert_world():
     ]
 
 def create_ice_world():
-    clear_world()
-    level_parent = Entity(model=Mesh(vertices=[], uvs=[]), color=color.cyan, collider='mesh')
-    platform_positions = [(0, -1, 0, 10, 1, 10), (15, 4, 10, 6, 1, 6), (-12, 7, -8, 8, 1, 5), (10, 10, -12, 5, 1, 8)]
-    for x, y, z, sx, sy, sz in platform_positions:
-        cube = Entity(model='cube', scale=(sx, sy, sz), position=(x, y, z))
-        cube.parent = level_parent
-        level_parent.model.vertices.extend([Vec3(v.x * sx + x, v.y * sy + y, v.z * sz + z) for v in cube.model.vertices])
-        destroy(cube)
-    level_parent.model.generate()
+    create_platforms([(0, -1, 0, 10, 1, 10), (15, 4, 10, 6, 1, 6), (-12, 7, -8, 8, 1, 5), (10, 10, -12, 5, 1, 8)], color.cyan)
     
-    for i in range(6):
-        crystal = Entity(model='cube', color=color.light_blue, 
-                        scale=(1, 2, 1),
-                        position=(random.uniform(-8, 8), 1, random.uniform(-8, 8)),
-                        collider='box')
+    spawn_props(6, color.hex('#add8e6'), (1, 2, 1), 8, 1) # Crystals
     stars = [
         Star((0, 2, 0)),
         Star((15, 7, 10)),
@@ -371,22 +443,10 @@ def create_ice_world():
     ]
 
 def create_lava_world():
-    clear_world()
-    level_parent = Entity(model=Mesh(vertices=[], uvs=[]), color=color.dark_red, collider='mesh')
-    platform_positions = [(0, -1, 0, 8, 1, 8), (12, 5, 8, 5, 1, 5), (-10, 8, -10, 6, 1, 4), (8, 12, -15, 4, 1, 6)]
-    for x, y, z, sx, sy, sz in platform_positions:
-        cube = Entity(model='cube', scale=(sx, sy, sz), position=(x, y, z))
-        cube.parent = level_parent
-        level_parent.model.vertices.extend([Vec3(v.x * sx + x, v.y * sy + y, v.z * sz + z) for v in cube.model.vertices])
-        destroy(cube)
-    level_parent.model.generate()
+    create_platforms([(0, -1, 0, 8, 1, 8), (12, 5, 8, 5, 1, 5), (-10, 8, -10, 6, 1, 4), (8, 12, -15, 4, 1, 6)], color.hex('#8b0000'))
     
-    lava_pool = Entity(model='cube', color=color.orange, scale=(15, 0.5, 15), position=(0, -2, 0))
-    for i in range(5):
-        rock = Entity(model='cube', color=color.dark_gray,
-                     scale=(2, 1, 2),
-                     position=(random.uniform(-12, 12), 1, random.uniform(-12, 12)),
-                     collider='box')
+    lava_pool = scenery(Entity(model='cube', color=color.orange, scale=(15, 0.5, 15), position=(0, -2, 0)))
+    spawn_props(5, color.dark_gray, (2, 1, 2), 12, 1) # Rocks
     stars = [
         Star((0, 2, 0)),
         Star((12, 8, 8)),
@@ -400,12 +460,21 @@ def create_lava_world():
         Goomba((12, 7, 10)),
     ]
 
+registry = EntityRegistry() # Everything a world builds, filed under that world
+current_world = None
+level_platforms = [] # (x, y, z, sx, sy, sz) of everything solid, gathered while a world is built
+level = SpatialIndex() # ...and indexed once it's done, for the player's ground and wall checks
+
 def clear_world():
-    for entity in scene.entities.copy():
-        if entity != player and not hasattr(entity, 'parent') or entity.parent != camera.ui:
-            destroy(entity)
+    stars.clear()
+    level_platforms.clear()
+    for entity in registry.take_world(current_world):
+        destroy(entity)
 
 def load_world(world_name):
+    global current_world, level
+    clear_world()
+    current_world = world_name
     if world_name == 'hub':
         create_hub_world()
         player.position = (0, 2, 0)
@@ -421,6 +490,9 @@ def load_world(world_name):
     elif world_name == 'lava':
         create_lava_world()
         player.position = (0, 2, -10)
+    level = SpatialIndex(level_platforms)
+    player.portal = None
+    events.emit('world_entered', world_name)
 
 def input(key):
     if key == 'escape':
@@ -430,18 +502,20 @@ def input(key):
         load_world('hub')
     elif key == 'f':
         window.fullscreen = not window.fullscreen
+    elif key == 'e' and player.portal is not None:
+        player.portal.enter_world()
 
 player = MarioController()
+collectible_manager = CollectibleManager()
 ui = UI()
 sun = DirectionalLight()
 sun.look_at(Vec3(1, -1, -1))
 sky = Sky(color=color.cyan)
-create_hub_world()
-player.position = (0, 2, 0)
+load_world('hub')
 
 def update():
-    ui.update()
+    timers.advance(time.dt)
 
 # Enable profiling for performance analysis
-# Uncomment to run: cProfile.run("app.run()", sort="time")
-app.run(info=False)
+# Uncomment to run: cProfile.run("run(app, info=False)", sort="time")
+run(app, info=False)
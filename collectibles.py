@@ -0,0 +1,83 @@
+"""Pickup grid for stars and coins.
+
+Collectible positions live in one flat NumPy array, bucketed by XZ grid cell, so each
+frame only the player's cell and its eight neighbours get a pickup test. The spin and
+bob every Star used to do in its own update() is a single shared transform now (see
+star_transform), applied once to a prototype model that every star instances.
+"""
+import math
+
+import numpy as np
+
+
+def star_transform(t, rotation_speed=50, float_speed=2, float_amplitude=0.2):
+    """Returns the shared (rotation_y, y offset) for every star at time t."""
+    return (t * rotation_speed) % 360, math.sin(t * float_speed) * float_amplitude
+
+
+class CollectibleGrid:
+    PICKUP_RADIUS = 1.2
+    PICKUP_HEIGHT = 2
+
+    def __init__(self, cell_size=4.0, pickup_radius=PICKUP_RADIUS, pickup_height=PICKUP_HEIGHT, spherical=False):
+        """spherical=True tests a full 3D distance instead of an XZ radius plus a height window."""
+        self.cell_size = max(cell_size, pickup_radius) # 3x3 cells must cover the pickup radius
+        self.pickup_radius = pickup_radius
+        self.pickup_height = pickup_height
+        self.spherical = spherical
+        self.count = 0
+        self.positions = np.zeros((16, 3))
+        self.active = np.zeros(16, dtype=bool)
+        self.entities = []
+        self.cells = {}
+
+    def __len__(self):
+        return self.count
+
+    def _cell(self, x, z):
+        return math.floor(x / self.cell_size), math.floor(z / self.cell_size)
+
+    def add(self, position, entity=None):
+        """Registers a pickup and returns its slot."""
+        if self.count == len(self.active):
+            self.positions = np.concatenate([self.positions, np.zeros_like(self.positions)])
+            self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+        i = self.count
+        self.positions[i] = position
+        self.active[i] = True
+        self.entities.append(entity)
+        self.cells.setdefault(self._cell(position[0], position[2]), []).append(i)
+        self.count += 1
+        return i
+
+    def remove(self, i):
+        self.active[i] = False
+
+    def clear(self):
+        self.count = 0
+        self.active[:] = False
+        self.entities.clear()
+        self.cells.clear()
+
+    def nearby(self, x, z):
+        """Returns the active slots in the 3x3 block of cells around (x, z)."""
+        cx, cz = self._cell(x, z)
+        cells = self.cells
+        slots = [i for dx in (-1, 0, 1) for dz in (-1, 0, 1) for i in cells.get((cx + dx, cz + dz), ())]
+        slots = np.array(slots, dtype=np.int64)
+        return slots[self.active[slots]]
+
+    def collect_near(self, x, y, z):
+        """Marks and returns the slots close enough to (x, y, z) to be picked up."""
+        slots = self.nearby(x, z)
+        if not len(slots):
+            return slots
+        offset = self.positions[slots] - (x, y, z)
+        if self.spherical:
+            hit = np.einsum('ij,ij->i', offset, offset) < self.pickup_radius ** 2
+        else:
+            hit = ((offset[:, 0] ** 2 + offset[:, 2] ** 2 < self.pickup_radius ** 2)
+                   & (np.abs(offset[:, 1]) < self.pickup_height))
+        picked = slots[hit]
+        self.active[picked] = False
+        return picked
@@ -0,0 +1,425 @@
+"""Static collision index over a level's platform boxes.
+
+Built once per world from the same (x, y, z, sx, sy, sz) tuples create_level_from_data
+takes. Boxes are bucketed into a uniform XZ grid, so ray, sweep and point queries only
+look at the handful of boxes near them instead of the whole level mesh collider.
+raycast_many and slide_many run the same grid lookup for a whole batch of rays or
+moving boxes at once with NumPy.
+"""
+import math
+
+import numpy as np
+
+EPSILON = 1e-6
+SLIDE_BATCH = 4096 # rows per batch in SpatialIndex.slide_many
+SLIDE_MARGIN = 1e-3 # slack on slide_many's broad phase, well over any rounding in the sweep
+
+
+def platform_boxes(platforms):
+    """Turns (x, y, z, sx, sy, sz) platform tuples into (min_x, min_y, min_z, max_x, max_y, max_z) boxes."""
+    return [(x - sx / 2, y - sy / 2, z - sz / 2, x + sx / 2, y + sy / 2, z + sz / 2)
+            for x, y, z, sx, sy, sz in platforms]
+
+
+def sweep_aabb(boxes, center, half, delta):
+    """Sweeps a box with half-extents `half` from `center` along `delta`.
+
+    Returns (t, normal) for the earliest box entered with 0 <= t <= 1, or (1.0, None)
+    if the whole move is free. Boxes we're already buried in are ignored so the
+    player can always walk out of them.
+    """
+    best_t = 1.0
+    best_normal = None
+    for box in boxes:
+        t_enter = -math.inf
+        t_exit = math.inf
+        normal = None
+        for axis in range(3):
+            lo = box[axis] - half[axis]
+            hi = box[axis + 3] + half[axis]
+            o = center[axis]
+            d = delta[axis]
+            if d == 0:
+                # Touching a face we slide along is not a hit
+                if o <= lo + EPSILON or o >= hi - EPSILON:
+                    break
+                continue
+            t1 = (lo - o) / d
+            t2 = (hi - o) / d
+            if t1 > t2:
+                t1, t2 = t2, t1
+            if t1 > t_enter:
+                t_enter = t1
+                normal = [0.0, 0.0, 0.0]
+                normal[axis] = -1.0 if d > 0 else 1.0
+            if t2 < t_exit:
+                t_exit = t2
+            if t_enter > t_exit or t_exit <= 0:
+                break
+        else:
+            if normal is not None and -EPSILON <= t_enter < best_t:
+                best_t = max(t_enter, 0.0)
+                best_normal = tuple(normal)
+    return best_t, best_normal
+
+
+def slide_aabb(boxes, center, half, delta, iterations=4):
+    """Moves a box along delta, sliding along whatever it runs into.
+
+    Each contact stops the box at the face it hit, drops the rest of the move's
+    component into that face, and sweeps what's left again, up to `iterations` times.
+    Returns the final centre and the normals hit in order. Contact normals are always
+    axis aligned, so a slide never leaves the box the original move swept through.
+    """
+    center = list(center)
+    remaining = list(delta)
+    contacts = []
+    for _ in range(iterations):
+        t, normal = sweep_aabb(boxes, center, half, remaining)
+        for i in range(3):
+            center[i] += remaining[i] * t
+        if normal is None:
+            break
+        contacts.append(normal)
+        for i in range(3):
+            remaining[i] = 0.0 if normal[i] else remaining[i] * (1 - t)
+        if not (remaining[0] or remaining[1] or remaining[2]):
+            break
+    return center, contacts
+
+
+def _slide_batch(centers, remaining, valid, lo, hi, iterations):
+    """slide_aabb for a batch of rows, each against its own (K,) row of candidate boxes
+    already grown by the moving box's half size. Same rules as sweep_aabb throughout."""
+    remaining = remaining.copy()
+    contacts = np.zeros((iterations,) + centers.shape)
+    moving = np.arange(len(centers))
+    for step in range(iterations):
+        if not len(moving):
+            break
+        o = centers[moving, None, :]
+        d = remaining[moving, None, :]
+        box_lo, box_hi = lo[moving], hi[moving]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t1 = (box_lo - o) / d
+            t2 = (box_hi - o) / d
+        still = d == 0
+        between = (o > box_lo + EPSILON) & (o < box_hi - EPSILON)
+        t_near = np.where(still, np.where(between, -np.inf, np.inf), np.minimum(t1, t2))
+        t_far = np.where(still, np.where(between, np.inf, -np.inf), np.maximum(t1, t2))
+        # Three-way max/min by hand, NumPy's reductions are slow over an axis this short
+        t_enter = np.maximum(np.maximum(t_near[..., 0], t_near[..., 1]), t_near[..., 2])
+        t_exit = np.minimum(np.minimum(t_far[..., 0], t_far[..., 1]), t_far[..., 2])
+        hits = valid[moving] & (t_enter <= t_exit) & (t_exit > 0) & (t_enter >= -EPSILON) & (t_enter < 1)
+        t = np.where(hits, np.maximum(t_enter, 0.0), np.inf)
+        first = t.argmin(axis=1)
+        t = t[np.arange(len(moving)), first]
+        hit = np.isfinite(t)
+        centers[moving] += remaining[moving] * np.where(hit, t, 1.0)[:, None]
+
+        # The entering axis is the face we hit; stop there and slide on with what's left
+        rows = moving[hit]
+        axis = t_near[hit, first[hit]].argmax(axis=-1)
+        contacts[step, rows, axis] = np.where(remaining[rows, axis] > 0, -1.0, 1.0)
+        left = remaining[rows] * (1 - t[hit])[:, None]
+        left[np.arange(len(rows)), axis] = 0.0
+        remaining[rows] = left
+        moving = rows[left.any(axis=1)]
+    return centers, contacts
+
+
+def ground_height(boxes, x, y, z, half_x, half_z, reach):
+    """Returns the highest box top within `reach` of y under the given footprint, or None."""
+    best = None
+    for min_x, min_y, min_z, max_x, max_y, max_z in boxes:
+        if (x - half_x < max_x and x + half_x > min_x and z - half_z < max_z and z + half_z > min_z
+                and y - reach <= max_y <= y + reach and (best is None or max_y > best)):
+            best = max_y
+    return best
+
+
+class PackedBoxes:
+    """Read-only list of box tuples over an (N, 6) array, each converted the first time it's used."""
+    def __init__(self, array):
+        self.array = array
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, i):
+        box = self.cache.get(i)
+        if box is None:
+            box = self.cache[i] = tuple(self.array[i].tolist())
+        return box
+
+
+class PackedCells(dict):
+    """Cell -> box list lookups read straight out of the dense batch tables.
+
+    Stands in for SpatialIndex.cells when an index comes from a packed level, so
+    nothing gets re-bucketed on load; each cell is unpacked the first time it's asked for.
+    """
+    def __init__(self, rows, grid, origin):
+        super().__init__()
+        self.rows = rows
+        self.grid = grid
+        self.origin = origin
+
+    def get(self, key, default=None):
+        try:
+            bucket = self[key]
+        except KeyError:
+            bucket = None
+            cx, cz = key[0] - int(self.origin[0]), key[1] - int(self.origin[1])
+            if 0 <= cx < self.grid.shape[0] and 0 <= cz < self.grid.shape[1]:
+                row = self.rows[self.grid[cx, cz]]
+                bucket = row[row >= 0].tolist() or None
+            self[key] = bucket
+        return default if bucket is None else bucket
+
+
+class SpatialIndex:
+    """Uniform XZ grid of platform boxes with ray, sweep and point queries.
+
+    Boxes covering more than MAX_CELLS_PER_BOX cells (big ground slabs) skip the grid
+    and get checked by every query instead of filling thousands of buckets.
+    """
+    MAX_CELLS_PER_BOX = 256
+
+    def __init__(self, platforms=(), cell_size=4.0):
+        self.cell_size = cell_size
+        self.boxes = platform_boxes(platforms)
+        self.cells = {}
+        self.large = []
+        self._batch_table = None
+        for i, (min_x, min_y, min_z, max_x, max_y, max_z) in enumerate(self.boxes):
+            keys = self._cell_keys(min_x, min_z, max_x, max_z)
+            if len(keys) > self.MAX_CELLS_PER_BOX:
+                self.large.append(i)
+                continue
+            for key in keys:
+                self.cells.setdefault(key, []).append(i)
+
+    @classmethod
+    def from_tables(cls, platforms, rows, grid, origin, large, cell_size=4.0):
+        """Rebuilds an index from the arrays _build_batch_table made (say, out of a packed
+        level file) without bucketing every box again."""
+        index = cls(cell_size=cell_size)
+        platforms = np.asarray(platforms, dtype=float).reshape(-1, 6)
+        boxes = np.concatenate([platforms[:, :3] - platforms[:, 3:] / 2, platforms[:, :3] + platforms[:, 3:] / 2], axis=1)
+        index.boxes = PackedBoxes(boxes)
+        index.large = np.asarray(large).tolist()
+        index.cells = PackedCells(rows, grid, origin)
+        index._batch_table = boxes, rows, grid, origin, np.asarray(large, dtype=np.int64)
+        return index
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cell_keys(self, min_x, min_z, max_x, max_z):
+        size = self.cell_size
+        x0, x1 = math.floor(min_x / size), math.floor(max_x / size)
+        z0, z1 = math.floor(min_z / size), math.floor(max_z / size)
+        return [(cx, cz) for cx in range(x0, x1 + 1) for cz in range(z0, z1 + 1)]
+
+    def candidates(self, min_x, min_z, max_x, max_z):
+        """Returns the boxes whose grid cells touch the given XZ rectangle (a superset of real hits)."""
+        found = set(self.large)
+        cells = self.cells
+        for key in self._cell_keys(min_x, min_z, max_x, max_z):
+            bucket = cells.get(key)
+            if bucket:
+                found.update(bucket)
+        boxes = self.boxes
+        return [boxes[i] for i in found]
+
+    def query_aabb(self, min_corner, max_corner):
+        """Returns every box overlapping the given box (touching counts)."""
+        min_x, min_y, min_z = min_corner
+        max_x, max_y, max_z = max_corner
+        return [b for b in self.candidates(min_x, min_z, max_x, max_z)
+                if b[0] <= max_x and b[3] >= min_x and b[1] <= max_y and b[4] >= min_y
+                and b[2] <= max_z and b[5] >= min_z]
+
+    def query_point(self, point):
+        """Returns every box containing the point."""
+        return self.query_aabb(point, point)
+
+    def sweep(self, center, half, delta):
+        """Grid-accelerated sweep_aabb: returns (t, normal) for a box moved from center by delta."""
+        x, z = center[0], center[2]
+        dx, dz = delta[0], delta[2]
+        boxes = self.candidates(min(x, x + dx) - half[0], min(z, z + dz) - half[2],
+                                max(x, x + dx) + half[0], max(z, z + dz) + half[2])
+        return sweep_aabb(boxes, center, half, delta)
+
+    def slide(self, center, half, delta, iterations=4):
+        """Grid-accelerated slide_aabb; one grid lookup covers every iteration."""
+        x, z = center[0], center[2]
+        dx, dz = delta[0], delta[2]
+        boxes = self.candidates(min(x, x + dx) - half[0], min(z, z + dz) - half[2],
+                                max(x, x + dx) + half[0], max(z, z + dz) + half[2])
+        return slide_aabb(boxes, center, half, delta, iterations)
+
+    def slide_many(self, centers, half, deltas, iterations=4):
+        """slide() for N same-sized boxes at once. Returns the (N, 3) final centres and an
+        (iterations, N, 3) array of contact normals, all zero where a box hit nothing that time.
+
+        Like raycast_many, only the cells under the corners of each box's swept rectangle are
+        searched, so that only covers moves up to a grid cell across; longer ones (rare at a
+        fixed tick) go through slide() one by one.
+        """
+        table = self._batch_table or self._build_batch_table()
+        boxes, rows, grid, origin, large = table
+        centers = np.array(centers, dtype=float).reshape(-1, 3)
+        deltas = np.asarray(deltas, dtype=float).reshape(-1, 3)
+        half = np.asarray(half, dtype=float)
+        contacts = np.zeros((iterations, len(centers), 3))
+        if not len(boxes):
+            return centers + deltas, contacts
+
+        ends = centers + deltas
+        lo_x = np.minimum(centers[:, 0], ends[:, 0]) - half[0]
+        hi_x = np.maximum(centers[:, 0], ends[:, 0]) + half[0]
+        lo_z = np.minimum(centers[:, 2], ends[:, 2]) - half[2]
+        hi_z = np.maximum(centers[:, 2], ends[:, 2]) + half[2]
+        span_x = np.floor(hi_x / self.cell_size) - np.floor(lo_x / self.cell_size)
+        span_z = np.floor(hi_z / self.cell_size) - np.floor(lo_z / self.cell_size)
+        wide = (span_x > 1) | (span_z > 1)
+        for i in np.flatnonzero(wide):
+            center, hits = self.slide(centers[i].tolist(), half.tolist(), deltas[i].tolist(), iterations)
+            centers[i] = center
+            if hits:
+                contacts[:len(hits), i] = hits
+
+        # Grow every box by the moving box's half size, so the sweep is a ray against it
+        grown_lo = boxes[:, :3] - half
+        grown_hi = boxes[:, 3:] + half
+        # Most moves stay inside one cell, so they only need that cell's boxes, not all four corners'
+        single = ~wide & (span_x == 0) & (span_z == 0)
+        for group, corners in ((single, ((lo_x, lo_z),)),
+                               (~wide & ~single, ((lo_x, lo_z), (lo_x, hi_z), (hi_x, lo_z), (hi_x, hi_z)))):
+            group = np.flatnonzero(group)
+            # In batches, so the (rows, candidates, 3) tables stay a few MB however big the level
+            for start in range(0, len(group), SLIDE_BATCH):
+                batch = group[start:start + SLIDE_BATCH]
+                candidates = np.concatenate([self._rows_for(x[batch], z[batch]) for x, z in corners]
+                                            + [np.broadcast_to(large, (len(batch), len(large)))], axis=1)
+                valid = candidates >= 0
+                candidates = np.where(valid, candidates, 0)
+                lo, hi = grown_lo[candidates], grown_hi[candidates]
+
+                # A slide never leaves the box its whole move sweeps through, so only boxes touching
+                # that can be hit. Most rows touch none (mid-air) or just the floor under them.
+                before, after = centers[batch], ends[batch]
+                upper = np.maximum(before, after) + SLIDE_MARGIN
+                lower = np.minimum(before, after) - SLIDE_MARGIN
+                near = valid
+                for axis in range(3):
+                    near &= (lo[..., axis] <= upper[:, axis, None]) & (hi[..., axis] >= lower[:, axis, None])
+                touching = near.sum(axis=1)
+                busy = touching > 0
+                centers[batch[~busy]] = after[~busy]
+                if not busy.any():
+                    continue
+                # Pack each busy row's nearby boxes to the front (in the same order) and drop the rest
+                order = np.argsort(~near[busy], axis=1, kind='stable')[:, :touching.max()]
+                moving = batch[busy]
+                centers[moving], contacts[:, moving] = _slide_batch(
+                    centers[moving], deltas[moving], np.take_along_axis(near[busy], order, axis=1),
+                    np.take_along_axis(lo[busy], order[..., None], axis=1),
+                    np.take_along_axis(hi[busy], order[..., None], axis=1), iterations)
+        return centers, contacts
+
+    def raycast(self, origin, direction, distance):
+        """Casts a ray along a normalised direction. Returns (hit_distance, normal) or None."""
+        delta = (direction[0] * distance, direction[1] * distance, direction[2] * distance)
+        t, normal = self.sweep(origin, (0, 0, 0), delta)
+        if normal is None:
+            return None
+        return t * distance, normal
+
+    def ground_height(self, x, y, z, half_x, half_z, reach):
+        """Returns the highest box top within `reach` of y under the given footprint, or None."""
+        boxes = self.candidates(x - half_x, z - half_z, x + half_x, z + half_z)
+        return ground_height(boxes, x, y, z, half_x, half_z, reach)
+
+    def _build_batch_table(self):
+        """Packs the grid into dense NumPy arrays: a cell -> row map and a padded row -> box index table."""
+        size = len(self.boxes)
+        boxes = np.array(self.boxes, dtype=float).reshape(size, 6)
+        width = max((len(bucket) for bucket in self.cells.values()), default=0)
+        rows = np.full((len(self.cells) + 1, width), -1, dtype=np.int64) # last row stays empty
+        if self.cells:
+            keys = np.array(list(self.cells), dtype=np.int64)
+            origin = keys.min(axis=0)
+            grid = np.full(tuple(keys.max(axis=0) - origin + 1), len(self.cells), dtype=np.int64)
+            for row, bucket in enumerate(self.cells.values()):
+                rows[row, :len(bucket)] = bucket
+            grid[keys[:, 0] - origin[0], keys[:, 1] - origin[1]] = np.arange(len(self.cells))
+        else:
+            origin = np.zeros(2, dtype=np.int64)
+            grid = np.zeros((1, 1), dtype=np.int64)
+        self._batch_table = boxes, rows, grid, origin, np.array(self.large, dtype=np.int64)
+        return self._batch_table
+
+    def _rows_for(self, x, z):
+        boxes, rows, grid, origin, large = self._batch_table
+        cx = np.floor(x / self.cell_size).astype(np.int64) - origin[0]
+        cz = np.floor(z / self.cell_size).astype(np.int64) - origin[1]
+        inside = (cx >= 0) & (cx < grid.shape[0]) & (cz >= 0) & (cz < grid.shape[1])
+        row = np.full(len(x), len(rows) - 1, dtype=np.int64)
+        row[inside] = grid[cx[inside], cz[inside]]
+        return rows[row]
+
+    def raycast_many(self, origins, directions, distance):
+        """Casts N rays at once. Returns (hit mask, hit distance) arrays; misses have distance inf.
+
+        origins and directions are (N, 3) arrays, distance is a scalar or (N,) array. Every cell
+        under each ray's XZ bounding rectangle is searched: for rays up to a grid cell across
+        that's the cells under its four corners, all at once. Longer rays go through raycast()
+        one by one.
+        """
+        table = self._batch_table or self._build_batch_table()
+        boxes, rows, grid, origin, large = table
+        origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+        directions = np.broadcast_to(np.asarray(directions, dtype=float).reshape(-1, 3), origins.shape)
+        distance = np.broadcast_to(np.asarray(distance, dtype=float), (len(origins),))
+        deltas = directions * distance[:, None]
+        ends = origins + deltas
+        lo_x, hi_x = np.minimum(origins[:, 0], ends[:, 0]), np.maximum(origins[:, 0], ends[:, 0])
+        lo_z, hi_z = np.minimum(origins[:, 2], ends[:, 2]), np.maximum(origins[:, 2], ends[:, 2])
+        # A diagonal ray can cross a cell neither end is in, so take all four corners of its rectangle
+        candidates = np.concatenate([self._rows_for(lo_x, lo_z), self._rows_for(lo_x, hi_z),
+                                     self._rows_for(hi_x, lo_z), self._rows_for(hi_x, hi_z),
+                                     np.broadcast_to(large, (len(origins), len(large)))], axis=1)
+        span_x = np.floor(hi_x / self.cell_size) - np.floor(lo_x / self.cell_size)
+        span_z = np.floor(hi_z / self.cell_size) - np.floor(lo_z / self.cell_size)
+        wide = np.flatnonzero((span_x > 1) | (span_z > 1))
+        if candidates.shape[1] == 0:
+            return np.zeros(len(origins), dtype=bool), np.full(len(origins), np.inf)
+
+        valid = candidates >= 0
+        picked = boxes[np.where(valid, candidates, 0)] if len(boxes) else np.zeros(candidates.shape + (6,))
+        lo, hi = picked[..., :3], picked[..., 3:]
+        o = origins[:, None, :]
+        d = deltas[:, None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t1 = (lo - o) / d
+            t2 = (hi - o) / d
+        # Same rules as sweep_aabb: sliding along a face isn't a hit, buried boxes are ignored
+        still = d == 0
+        between = (o > lo + EPSILON) & (o < hi - EPSILON)
+        t_near = np.where(still, np.where(between, -np.inf, np.inf), np.minimum(t1, t2))
+        t_far = np.where(still, np.where(between, np.inf, -np.inf), np.maximum(t1, t2))
+        # Three-way max/min by hand, NumPy's reductions are slow over an axis this short
+        t_enter = np.maximum(np.maximum(t_near[..., 0], t_near[..., 1]), t_near[..., 2])
+        t_exit = np.minimum(np.minimum(t_far[..., 0], t_far[..., 1]), t_far[..., 2])
+        hits = valid & (t_enter <= t_exit) & (t_exit > 0) & (t_enter >= -EPSILON) & (t_enter <= 1)
+        t = np.where(hits, np.maximum(t_enter, 0.0), np.inf).min(axis=1)
+        hit_distance = t * distance
+        for i in wide:
+            hit = self.raycast(origins[i].tolist(), directions[i].tolist(), float(distance[i]))
+            hit_distance[i] = np.inf if hit is None else hit[0]
+        return np.isfinite(hit_distance), hit_distance
@@ -1,16 +1,12 @@
 from ursina import *
 # FirstPersonController is not used, so it's removed from imports.
 import random
+import math
+from collectibles import CollectibleGrid, star_transform
+from collision_index import SpatialIndex
+from headless import make_app, run
 
-app = Ursina()
-window.title = 'Mario Platformer'
-window.size = (800, 600)
-window.fps_counter.enabled = True
-window.exit_button.visible = False
-
-def distance_xz(a, b):
-    """Calculates the squared distance on the XZ plane for efficiency."""
-    return (a.x - b.x)**2 + (a.z - b.z)**2
+app = make_app(title='Mario Platformer', size=(800, 600), fps_counter=True, exit_button=False)
 
 class GameState:
     def __init__(self):
@@ -82,28 +78,27 @@ class MarioController(Entity):
 
     def update_physics(self):
         """Applies gravity and handles collisions."""
-        # Apply gravity only when airborne
-        if not self.grounded:
-            self.velocity.y -= self.GRAVITY * time.dt
-
-        # Use Ursina's built-in move method which handles collisions automatically
-        self.move(self.velocity * time.dt)
-        
-        # A robust ground check using a downward raycast
-        # This checks for ground slightly below the player's feet
-        ground_ray = raycast(self.world_position + Vec3(0,0.1,0), direction=(0, -1, 0), ignore=[self,], distance=0.2)
-        
-        if ground_ray.hit:
-            if self.velocity.y < 0: # Only zero velocity if falling onto the ground
+        # Gravity always pulls, so standing still still presses us into the floor and finds it
+        self.velocity.y -= self.GRAVITY * time.dt
+        self.grounded = False
+        for normal in self.slide(self.velocity * time.dt):
+            if normal[1]: # Landed, or bumped our head
                 self.velocity.y = 0
-            self.grounded = True
-        else:
-            self.grounded = False
-            
+                self.grounded = self.grounded or normal[1] > 0
+
         # Respawn if the player falls out of the world
         if self.y < -20:
             self.respawn()
 
+    def slide(self, delta):
+        """Moves our box by delta through the level's SpatialIndex, sliding along what it hits.
+
+        Returns the contact normals, in the order they were hit.
+        """
+        center, contacts = level.slide(tuple(self.position), tuple(self.scale / 2), tuple(delta))
+        self.position = center
+        return contacts
+
     def respawn(self):
         spawn_point = {
             'hub': (0, 2, 0),
@@ -118,23 +113,10 @@ class MarioController(Entity):
 
 class Star(Entity):
     def __init__(self, position=(0, 1, 0), **kwargs):
-        super().__init__(
-            model='sphere',
-            color=color.yellow,
-            scale=0.6,
-            position=position,
-            collider='sphere',
-            always_on_top=True,
-            **kwargs
-        )
-        self.rotation_speed = 100
-        self.start_y = self.y
-
-    def update(self):
-        self.rotation_y += self.rotation_speed * time.dt
-        self.y = self.start_y + sin(time.time() * 2) * 0.1 # Bobbing effect
-        if distance_xz(self.position, player.position) < 1.2**2: # Use squared distance
-            self.collect()
+        super().__init__(position=position, **kwargs)
+        # Model, spin and bob come from the CollectibleManager's shared prototype
+        collectible_manager.star_model.instanceTo(self)
+        self.slot = stars.add(position, self)
 
     def collect(self):
         game_state.stars += 1
@@ -142,6 +124,18 @@ class Star(Entity):
         Audio('coin_sound.wav', pitch=random.uniform(0.9, 1.1), volume=0.5) # Example sound
         self.disable()
 
+class CollectibleManager(Entity):
+    """Animates the shared star model and runs pickups for the player's nearby grid cells only."""
+    def __init__(self):
+        super().__init__()
+        self.star_model = Entity(model='sphere', color=color.yellow, scale=0.6, always_on_top=True)
+        self.star_model.parent = NodePath('star_prototype') # Only ever drawn through its instances
+
+    def update(self):
+        self.star_model.rotation_y, self.star_model.y = star_transform(time.time(), rotation_speed=100, float_amplitude=0.1)
+        for i in stars.collect_near(*player.position):
+            stars.entities[i].collect()
+
 class Goomba(Entity):
     def __init__(self, position=(0, 0, 0), **kwargs):
         super().__init__(
@@ -158,8 +152,10 @@ class Goomba(Entity):
 
     def update(self):
         # Move and check for wall collisions to turn around
-        hit_info = self.move(self.direction * self.move_speed * time.dt)
-        if hit_info.hit and hit_info.entity is not player:
+        delta = self.direction * self.move_speed * time.dt
+        center, contacts = level.slide(tuple(self.position), tuple(self.scale / 2), tuple(delta))
+        self.position = center
+        if any(normal[0] or normal[2] for normal in contacts): # Walked into a wall
             self.direction = -self.direction
 
         # Check for interaction with the player
@@ -218,15 +214,21 @@ class UI(Entity):
 
 # Global container for all dynamically loaded world objects
 world_objects = []
+stars = CollectibleGrid(pickup_height=math.inf) # Stars are picked up at any height here
+level = SpatialIndex() # The current world's platforms, for the player's and Goombas' collision
 
 def clear_world():
     global world_objects
     for obj in world_objects:
         destroy(obj)
     world_objects.clear()
+    stars.clear()
 
 def create_level(platforms, color_theme, sky_texture):
     """Creates platforms and sets the sky."""
+    global level
+    # Platforms are (sx, sy, sz, x, y, z) here; the index takes (x, y, z, sx, sy, sz)
+    level = SpatialIndex([(*p[3:], *p[:3]) for p in platforms])
     for p in platforms:
         platform = Entity(
             model='cube',
@@ -290,8 +292,9 @@ if not os.path.exists('coin_sound.wav'):
 
 ui = UI()
 player = MarioController(position=(0, 5, 0))
+collectible_manager = CollectibleManager()
 
 # Load the initial world
 load_world('hub')
 
-app.run()dd
+run(app)
@@ -2,21 +2,40 @@ from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
 import random
 import math
+import os
+import numpy as np
+from mario_physics import MarioBody
+from collectibles import star_transform
+from fixed_timestep import FixedTimestep, lerp_tuple
+from game_sim import GameSim, move_vector
+from replay import InputRecorder, RECORDED_KEYS, MOUSE_SENSITIVITY
+from worlds import WORLDS
+from level_pack import packed_worlds
+from world_loader import WorldLoader
+from activity import ActivityTiers, MID, FAR
+from profiler import profiler
+from level_mesh import optimized_mesh_arrays
+from level_chunks import ChunkStreamer
+from entity_pool import PoolRegistry
+from instanced_props import InstancedProps
+from hud import HudText, Instruction
+from entity_registry import EntityRegistry
+from events import EventBus, TimerWheel
+from headless import make_app, run
 
 # I'm leaving the profiler here for you, sweetie. Sometimes it's fun to see just how fast you can make things go.
-# import cProfile
-
-# CAT-SAN'S FIX: Added the missing distance_xz helper function. Crucial for 2D plane calculations.
-def distance_xz(a, b):
-    """Calculates the distance between two entities on the XZ plane."""
-    return distance(a.world_position.xz, b.world_position.xz)
-
-app = Ursina()
-window.title = 'Mario Platformer'
-window.size = (800, 600)  # A bigger canvas for our masterpiece
-window.vsync = True
-window.fps_counter.enabled = True
-window.exit_button.visible = False # Let's handle our own exits.
+# F3 shows where each frame goes, F4 saves a Chrome trace of the last few seconds.
+
+app = make_app(
+    title='Mario Platformer',
+    size=(800, 600), # A bigger canvas for our masterpiece
+    vsync=True,
+    fps_counter=True,
+    exit_button=False, # Let's handle our own exits.
+)
+SIMULATION_RATE = 120 # Physics ticks per second, whatever the frame rate
+CHUNK_RADIUS = 2 # Big worlds are drawn in 32x32 chunks, this many around the player...
+CHUNK_BUDGET = 48 # ...and this many kept in memory before the least recently visited go
 
 # --- Game State ---
 # Keeps track of all the important little details.
@@ -31,41 +50,42 @@ class GameState:
             'lava': 15
         }
 
+    def on_star_collected(self, star_count):
+        for world_name, required in self.world_star_requirements.items():
+            if star_count >= required and world_name not in self.unlocked_worlds:
+                self.unlocked_worlds.append(world_name)
+                events.emit('portal_unlocked', world_name)
+
 game_state = GameState()
+events = EventBus() # star_collected, portal_reached/left, portal_unlocked
+events.subscribe('star_collected', game_state.on_star_collected)
+timers = TimerWheel() # Sound, sparkle and squish releases, stepped once a frame by update()
+
+# The headless simulation everything on screen mirrors, and the input log that feeds it
+# Worlds compiled with level_pack.py (if up to date) load straight from levels/*.mlvl
+sim = GameSim(seed=random.randrange(2**32), worlds={**WORLDS, **packed_worlds(sources=WORLDS)})
+recorder = InputRecorder(SIMULATION_RATE, sim.seed)
+world_loader = WorldLoader(sim.worlds) # Builds worlds in the background before we walk into them
+registry = EntityRegistry() # Portals and per-world scenery, so nothing has to scan scene.entities
+pools = PoolRegistry() # Stars, Goombas, effects and sounds get recycled instead of destroyed (see the setup at the bottom)
 
 # --- Player Controller ---
 # This is you, darling. Powerful, fast, and ready for anything.
+# The movement rules live in the headless GameSim so they can run without a window;
+# this entity feeds it input (through the recorder) and mirrors its position.
 class MarioController(Entity):
-    # Constants for fine-tuning your moves
-    SPEED = 7
-    RUN_ACCEL = 10
-    RUN_DECEL = 8
-    JUMP_FORCE = 10
-    GRAVITY = 30
-    AIR_CONTROL = 0.8
-    TRIPLE_JUMP_MULTS = (1.0, 1.2, 1.5) # Normal, Double, Triple
-    LONG_JUMP_MIN_SPEED = 4
-    LONG_JUMP_FORWARD_BOOST = 10
-    LONG_JUMP_VERTICAL_BOOST = 7
-    WALL_JUMP_FORCE = 9
-    WALL_JUMP_KICKOFF = 6
-
     def __init__(self, **kwargs):
         super().__init__(
             model='cube',
             color=color.red,
-            scale=(0.8, 1.8, 0.8), # A bit taller, more heroic
+            scale=(MarioBody.WIDTH, MarioBody.HEIGHT, MarioBody.WIDTH), # A bit taller, more heroic
+            origin_y=-.5, # position is at the feet, same as the body
             position=(0, 5, 0),
             **kwargs
         )
-        # Player properties
-        self.velocity = Vec3(0)
-        self.grounded = False
-        self.jump_count = 0
-        self.jump_timer = 0.0
-        self.max_jump_chain_time = 0.4 # A tighter window for more skilled moves
-        self.can_wall_jump = False
-        self.wall_normal = None
+        self.body = sim.body
+        self.portal = None # The portal we're standing in, if any
+        self.yaw = 0.0 # Camera yaw, advanced from the same recorded mouse input a replay sees
         
         # CAT-SAN'S FIX: Stored the original scale to prevent animation bugs.
         self.original_scale = self.scale
@@ -77,192 +97,105 @@ class MarioController(Entity):
         camera.rotation_x = 10
         mouse.locked = True
 
+    @property
+    def velocity(self):
+        return Vec3(*self.body.velocity)
+
     def update(self):
-        self.handle_input()
-        self.update_physics()
+        recorder.add_mouse(mouse.velocity[0], mouse.velocity[1])
         self.update_camera()
-
-        # Fall out of the world
-        if self.y < -30:
-            self.respawn()
-
-    def handle_input(self):
-        # Movement input
-        move_direction = Vec3(
-            held_keys['d'] - held_keys['a'],
-            0,
-            held_keys['w'] - held_keys['s']
-        ).normalized()
-
-        # Align movement to camera
-        camera_forward = Vec3(camera.forward.x, 0, camera.forward.z).normalized()
-        world_move = camera_forward * move_direction.z + camera.right * move_direction.x
-        
-        # Apply air control or ground movement
-        if not self.grounded:
-            self.velocity.x = lerp(self.velocity.x, world_move.x * self.SPEED, time.dt * self.AIR_CONTROL)
-            self.velocity.z = lerp(self.velocity.z, world_move.z * self.SPEED, time.dt * self.AIR_CONTROL)
-        else:
-            # CAT-SAN'S FIX: Implemented smooth acceleration/deceleration using the constants you already had. Feels much better.
-            target_velocity_xz = world_move.xz * self.SPEED
-            if target_velocity_xz.length() > 0:
-                 self.velocity.xz = lerp(self.velocity.xz, target_velocity_xz, time.dt * self.RUN_ACCEL)
-            else:
-                 self.velocity.xz = lerp(self.velocity.xz, Vec2(0,0), time.dt * self.RUN_DECEL)
-
-            # Reset jump chain if the window expires
-            if self.jump_timer > self.max_jump_chain_time:
-                self.jump_count = 0
-        
-        self.jump_timer += time.dt
-
-
-    def jump(self):
-        # Wall Jump
-        if self.can_wall_jump:
-            self.velocity.y = self.WALL_JUMP_FORCE
-            # Kick away from the wall
-            self.velocity += self.wall_normal * self.WALL_JUMP_KICKOFF
-            self.jump_count = 1 # A wall jump counts as the first jump
-            self.can_wall_jump = False
-            return
-
-        # Ground Jumps
-        if self.grounded:
-            self.grounded = False
-            running_speed = Vec2(self.velocity.x, self.velocity.z).length()
-
-            # Long Jump
-            if running_speed > self.LONG_JUMP_MIN_SPEED and held_keys['shift']:
-                self.velocity.y = self.LONG_JUMP_VERTICAL_BOOST
-                self.velocity += self.velocity.normalized() * self.LONG_JUMP_FORWARD_BOOST
-                self.jump_count = 0 # Long jump resets the chain
-            # Triple Jump Chain
-            else:
-                self.jump_count = min(self.jump_count + 1, 3)
-                self.velocity.y = self.JUMP_FORCE * self.TRIPLE_JUMP_MULTS[self.jump_count - 1]
-                if self.jump_count == 3:
-                    # CAT-SAN'S FIX: Used the stored original_scale to ensure the player returns to the correct size.
-                    self.animate_scale(self.original_scale * 1.2, duration=0.1, curve=curve.out_quad)
-                    self.animate_scale(self.original_scale, duration=0.2, delay=0.1, curve=curve.in_quad)
-
-            self.jump_timer = 0
-
-    def update_physics(self):
-        # Apply gravity
-        if not self.grounded:
-            self.velocity.y -= self.GRAVITY * time.dt
-        
-        # Move and collide
-        movement = self.velocity * time.dt
-        
-        # Use a box cast for robust collision detection
-        # The logic here was solid, no changes needed. A little complex, but it gets the job done.
-        hit_info = boxcast(self.position + Vec3(0,self.scale_y/2,0), direction=movement.normalized(), 
-                           distance=movement.length() + 0.2, thickness=(self.scale_x, self.scale_y), ignore=[self,])
-
-        if hit_info.hit:
-            # Move player to the point of impact
-            self.position += movement.normalized() * hit_info.distance
-            # Slide along walls by removing velocity component into the wall
-            self.velocity = self.velocity - hit_info.world_normal * Vec3.dot(self.velocity, hit_info.world_normal)
-        else:
-            self.position += movement
-
-        # Ground and Wall detection
-        self.grounded = False
-        self.can_wall_jump = False
-        
-        # Downward check for ground
-        ground_check = boxcast(self.world_position + Vec3(0,0.1,0), direction=Vec3(0,-1,0), distance=0.2, thickness=(0.9,0.1), ignore=[self,])
-        if ground_check.hit:
-            # Check if we're landing on top of something, not the side
-            if ground_check.world_normal.y > 0.7 and self.velocity.y <= 0:
-                self.y = ground_check.world_point.y
-                self.velocity.y = 0
-                self.grounded = True
-                self.jump_count = 0
-
-        # Wall check if we are in the air
-        if not self.grounded:
-            side_check = boxcast(self.position + Vec3(0,self.scale_y/2,0), direction=self.velocity.xz.normalized(),
-                                 distance=0.51, thickness=(self.scale_x, self.scale_y*0.8), ignore=[self,])
-            if side_check.hit and side_check.world_normal.y < 0.7:
-                self.can_wall_jump = True
-                self.wall_normal = side_check.world_normal
-                # Slide down walls slowly
-                if self.velocity.y < 0:
-                    self.velocity.y = max(self.velocity.y, -3)
-
+        self.update_portal()
+
+    def tick(self, dt):
+        """One fixed simulation step; the Simulation entity calls this, not Ursina."""
+        frame = recorder.tick(key for key in RECORDED_KEYS if held_keys[key])
+        self.yaw += frame.mouse[0] * MOUSE_SENSITIVITY
+        move_x, move_z = move_vector(frame.held, self.yaw)
+        events = sim.tick(dt, move_x, move_z, jump='space' in frame.events, long_jump='shift' in frame.held)
+        if events.jump == 'triple':
+            # CAT-SAN'S FIX: Used the stored original_scale to ensure the player returns to the correct size.
+            self.animate_scale(self.original_scale * 1.2, duration=0.1, curve=curve.out_quad)
+            self.animate_scale(self.original_scale, duration=0.2, delay=0.1, curve=curve.in_quad)
+        return events
+
+    def sync(self, alpha):
+        """Draws the player `alpha` of the way between its last two simulated positions."""
+        self.position = lerp_tuple(self.body.previous_position, self.body.position, alpha)
 
     def update_camera(self):
-        self.camera_pivot.rotation_y += mouse.velocity[0] * 40
-        self.camera_pivot.rotation_x -= mouse.velocity[1] * 40
+        self.camera_pivot.rotation_y = self.yaw
+        self.camera_pivot.rotation_x -= mouse.velocity[1] * MOUSE_SENSITIVITY
         self.camera_pivot.rotation_x = clamp(self.camera_pivot.rotation_x, -80, 80)
 
-    def respawn(self):
-        if game_state.current_world == 'hub':
-            self.position = (0, 2, 0)
-        else:
-            # Find a safe spawn point
-            self.position = find_safe_spawn_point()
-        self.velocity = Vec3(0)
+    def update_portal(self):
+        """Tells everyone when we walk into a portal or out of it, rather than each portal checking every frame."""
+        with profiler.scope('portals'):
+            near = None
+            for portal in registry.of('portal'):
+                if portal.enabled and portal.contains(self.position):
+                    near = portal
+                    break
+            if near is self.portal:
+                return
+            if self.portal is not None:
+                events.emit('portal_left', self.portal)
+            self.portal = near
+            if near is not None:
+                events.emit('portal_reached', near)
 
     def input(self, key):
         if key == 'space':
-            self.jump()
+            recorder.event(key) # Jumps happen on the next tick, so replays line up
         if key == 'escape':
             mouse.locked = not mouse.locked
         if key == 'r':
             load_world('hub')
+        if key == 'f5':
+            toggle_recording()
+        if key == 'e' and self.portal is not None:
+            self.portal.enter_world()
 
 # --- Game Objects ---
 
-class Star(Entity):
-    def __init__(self, position=(0, 1, 0), **kwargs):
-        super().__init__(
-            parent=scene, # Stars should be independent of the level mesh for simplicity
-            model='sphere', # A nice round star
-            texture='white_cube',
-            color=color.yellow,
-            scale=0.6,
-            position=position,
-            collider='sphere',
-            **kwargs
-        )
-        self.rotation_speed = 50
-        self.float_amplitude = 0.2
-        self.float_speed = 2
-        self.start_y = position[1]
+def play_sound(name, volume=1, pitch=1):
+    sound = pools.get('sound:' + name, volume, pitch)
+    timers.after(max(sound.length, 0.1), pools.release, sound)
 
-    def update(self):
-        self.rotation_y += self.rotation_speed * time.dt
-        self.y = self.start_y + math.sin(time.time() * self.float_speed) * self.float_amplitude
-        if self.enabled and distance_xz(self, player) < 1.2 and abs(self.y - player.y) < 2:
-            self.collect()
+class Star:
+    """One copy in the CollectibleManager's instanced star props, not a node of its own.
+
+    Model, spin and bob are shared; pickups are tested by the simulation's star grid.
+    """
+    def __init__(self, position=(0, 1, 0)):
+        self.position = Vec3(*position)
+        self.slot = collectible_manager.stars.add(position, scale=0.6) # A nice round star
+
+    @property
+    def enabled(self):
+        return collectible_manager.stars.is_enabled(self.slot)
+
+    @enabled.setter
+    def enabled(self, value):
+        collectible_manager.stars.set_enabled(self.slot, value)
 
     def collect(self):
         game_state.stars += 1
-        ui.star_text.text = f'★ {game_state.stars}' # Immediate feedback
-        ui.star_text.animate_scale(1.5, duration=0.1)
-        ui.star_text.animate_scale(1, duration=0.2, delay=0.1)
+        events.emit('star_collected', game_state.stars) # The HUD counts it, GameState unlocks portals
         
         # A more satisfying collection effect
         # CAT-SAN'S FIX: Swapped 'powerup' for 'coin', a sound that actually comes with Ursina.
-        Audio('coin', pitch=random.uniform(0.9, 1.1), volume=0.5)
+        play_sound('coin', volume=0.5, pitch=random.uniform(0.9, 1.1))
         for i in range(5):
-            e = Entity(parent=camera.ui, model='quad', color=color.gold, scale=random.uniform(0.01, 0.05),
-                       position=self.world_position, rotation_z=random.uniform(0,360))
+            e = pools.get('sparkle', self.position)
             e.animate_position((ui.star_text.x, ui.star_text.y), duration=0.5, curve=curve.in_quad)
             e.animate_scale(0, duration=0.5)
-            destroy(e, delay=0.5)
-        
-        self.disable() # Disabling is faster than destroying and prevents double collection
-        invoke(destroy, self, delay=1)
+            timers.after(0.5, pools.release, e)
+
+        self.enabled = False # Gone right away; the simulation won't report it twice
 
 
 class Goomba(Entity):
-    def __init__(self, position=(0, 0, 0), patrol_area=5, **kwargs):
+    def __init__(self, position=(0, 0, 0), **kwargs):
         super().__init__(
             parent=scene, # Also independent of the level mesh
             model='cube',
@@ -272,40 +205,59 @@ class Goomba(Entity):
             collider='box',
             **kwargs
         )
-        self.move_speed = 2
-        self.direction = random.choice([Vec3(1,0,0), Vec3(-1,0,0), Vec3(0,0,1), Vec3(0,0,-1)])
-        self.start_position = Vec3(position)
-        self.patrol_area = patrol_area
+        # All the AI lives in the simulation's GoombaSystem; this entity is just what it draws
+
+    def defeat(self):
+        # CAT-SAN'S FIX: Replaced 'hit' with a low-pitched 'blip' for a satisfying squish sound.
+        play_sound('blip', volume=0.7, pitch=0.5)
+        # The squish is a stand-in, so this Goomba can go straight back to the pool
+        squish = pools.get('squish', self.position)
+        squish.animate_scale_y(0.1, duration=0.2)
+        squish.animate_color(color.clear, duration=0.2)
+        timers.after(0.3, pools.release, squish)
+        pools.release(self)
+
+class CollectibleManager(Entity):
+    """Draws every Star as one instanced node and spins and bobs them all together."""
+    def __init__(self):
+        super().__init__()
+        self.stars = InstancedProps(model='sphere', texture='white_cube', color=color.yellow)
 
     def update(self):
-        # Ledge and wall detection
-        wall_check = raycast(self.world_position, self.direction, distance=0.6, ignore=[self, player])
-        ledge_check = not raycast(self.world_position + self.direction*0.6, Vec3(0,-1,0), distance=2, ignore=[self, player]).hit
+        self.stars.animate_all(*star_transform(time.time()))
 
-        if wall_check.hit or ledge_check or distance_xz(self.position, self.start_position) > self.patrol_area:
-            self.direction = random.choice([Vec3(1,0,0), Vec3(-1,0,0), Vec3(0,0,1), Vec3(0,0,-1)])
+class Simulation(Entity):
+    """Steps player, enemies and collectibles at a fixed rate and interpolates what gets drawn.
 
-        self.position += self.direction * self.move_speed * time.dt
-        
-        # Interaction with player
-        if self.intersects(player).hit:
-            # Player stomps Goomba
-            if player.velocity.y < -1 and player.y > self.y + 0.5:
-                self.defeat()
-                player.velocity.y = 8 # Bounce
-            # Goomba hurts player
-            else:
-                player.respawn()
+    A slow frame just runs more ticks, so nothing tunnels through platforms on a spike
+    and a run plays out the same regardless of frame rate.
+    """
+    def __init__(self, rate=SIMULATION_RATE):
+        super().__init__()
+        self.clock = FixedTimestep(rate)
 
-    def defeat(self):
-        # CAT-SAN'S FIX: Replaced 'hit' with a low-pitched 'blip' for a satisfying squish sound.
-        Audio('blip', pitch=0.5, volume=0.7)
-        self.disable()
-        self.animate_scale_y(0.1, duration=0.2)
-        self.animate_color(color.clear, duration=0.2)
-        destroy(self, delay=0.3)
+    def update(self):
+        # GameSim times player, enemies and collectibles itself; this is input and drawing glue
+        with profiler.scope('simulation'):
+            dt = self.clock.step
+            for _ in range(self.clock.advance(time.dt)):
+                events = player.tick(dt)
+                for i in events.stomped:
+                    sim.goombas.entities[i].defeat()
+                for i in events.collected:
+                    sim.stars.entities[i].collect()
+            alpha = self.clock.alpha
+            player.sync(alpha)
+            sim.goombas.write_back(alpha)
 
 class WorldPortal(Entity):
+    PRELOAD_DISTANCE = 8 # Start building the world behind an unlocked portal once we're this close
+    ENTER_DISTANCE = 1.5
+    # Per frame: mid-range portals animate every 6th frame, far ones sit still. The hub's portals
+    # are ~13 units from its spawn, so near covers them all from there and none is ever
+    # a throttled one while the player walks up to it
+    ACTIVITY = ActivityTiers(near=20, mid=40, mid_interval=6)
+
     def __init__(self, position, world_name, required_stars=0, color_theme=color.blue):
         super().__init__(
             parent=scene, # Portals are part of the main scene, not the level
@@ -316,39 +268,58 @@ class WorldPortal(Entity):
             position=position,
             collider='box',
         )
+        registry.add(self, 'portal') # No world: portals stay around, the hub just turns them on
         self.world_name = world_name
         self.required_stars = required_stars
         self.original_color = color_theme
-        self.unlocked = False
+        self.unlocked = game_state.stars >= required_stars
+        self.idle_frames = random.randrange(self.ACTIVITY.mid_interval) # staggered, so they don't all wake up together
+        self.idle_time = 0
 
         # Fancy text above the portal
         self.label = Text(parent=self, text=f"{world_name.title()}\n★ {required_stars}",
-                          scale=5, position=(0, 0.6, -0.51), origin=(0,0), color=color.black)
+                          scale=5, position=(0, 0.6, -0.51), origin=(0,0),
+                          color=color.white if self.unlocked else color.dark_gray)
+        events.subscribe('portal_unlocked', self.on_portal_unlocked)
 
-    def update(self):
-        self.rotation_y += time.dt * 15
-        self.unlocked = game_state.stars >= self.required_stars
-
-        if self.unlocked:
-            self.color = lerp(self.color, self.original_color, time.dt*2)
+    def on_portal_unlocked(self, world_name):
+        if world_name == self.world_name:
+            self.unlocked = True
             self.label.color = color.white
-        else:
-            self.color = lerp(self.color, color.gray, time.dt*2)
-            self.label.color = color.dark_gray
-        
-        # Check for intersection and clear instruction text if player moves away
-        if self.intersects(player).hit:
+
+    def contains(self, position):
+        """Whether `position` is standing in the portal. The player has no collider, so this goes by distance."""
+        offset_x, offset_z = position[0] - self.x, position[2] - self.z
+        return (offset_x * offset_x + offset_z * offset_z < self.ENTER_DISTANCE ** 2
+                and abs(position[1] - self.y) < self.scale_y)
+
+    def update(self):
+        with profiler.scope('portals'):
+            tier = self.ACTIVITY.tier(self.x, self.z, player.position)
+            if tier == FAR:
+                self.idle_time = 0
+                return
+            self.idle_frames += 1
+            self.idle_time += time.dt
+            if tier == MID and self.idle_frames < self.ACTIVITY.mid_interval:
+                return
+            dt = self.idle_time # everything since we last ran, so the spin keeps its speed
+            self.idle_frames = 0
+            self.idle_time = 0
+
+            self.rotation_y += dt * 15
+            self.color = lerp(self.color, self.original_color if self.unlocked else color.gray, min(dt*2, 1))
+
+            # Standing in the portal is the player's business (see update_portal); we only get the world ready
             if self.unlocked:
-                ui.show_instruction(f"Press 'E' to enter {self.world_name.title()}")
-                if held_keys['e']:
-                    self.enter_world()
-            else:
-                ui.show_instruction(f"Need {self.required_stars - game_state.stars} more stars!")
-        elif ui.instruction_text.text.startswith(f"Press 'E' to enter {self.world_name.title()}"):
-            ui.hide_instruction()
+                offset_x, offset_z = player.x - self.x, player.z - self.z
+                if offset_x * offset_x + offset_z * offset_z < self.PRELOAD_DISTANCE ** 2:
+                    world_loader.preload(self.world_name)
 
     def enter_world(self):
-        Audio('blip', volume=0.5)
+        if not self.unlocked:
+            return
+        play_sound('blip', volume=0.5)
         game_state.current_world = self.world_name
         load_world(self.world_name)
 
@@ -360,60 +331,167 @@ class UI(Entity):
                               position=window.top_left + Vec2(0.05, -0.05),
                               scale=2, color=color.yellow, origin=(-0.5, 0.5))
         
+        self.stars = HudText(self.star_text, '★ {}')
         self.instruction_text = Text(parent=self, text='', position=(0, -0.4), scale=1.5,
                                      origin=(0,0), background=True)
-        self.instruction_text.enabled = False
-        self.instruction_hider = None
+        self.instruction = Instruction(self.instruction_text)
+        self.portal_message = None # What the portal the player is standing in told them, if that's still up
+        events.subscribe('star_collected', self.on_star_collected)
+        events.subscribe('portal_reached', self.on_portal_reached)
+        events.subscribe('portal_left', self.on_portal_left)
+        events.subscribe('portal_unlocked', lambda world_name: self.show_instruction(f'{world_name.title()} unlocked!'))
+
+    def update(self):
+        with profiler.scope('ui'):
+            self.instruction.update(time.dt)
+
+    def on_star_collected(self, star_count):
+        self.stars.set(star_count) # Immediate feedback
+        self.star_text.animate_scale(1.5, duration=0.1)
+        self.star_text.animate_scale(1, duration=0.2, delay=0.1)
+
+    def on_portal_reached(self, portal):
+        if portal.unlocked:
+            self.portal_message = f"Press 'E' to enter {portal.world_name.title()}"
+        else:
+            self.portal_message = f"Need {portal.required_stars - game_state.stars} more stars!"
+        self.show_instruction(self.portal_message, None)
+
+    def on_portal_left(self, portal):
+        # Unless something else has taken the line over since
+        if self.instruction.text.value == self.portal_message:
+            self.hide_instruction()
+        self.portal_message = None
 
     def show_instruction(self, text, duration=2):
-        if self.instruction_hider:
-            self.instruction_hider.kill()
-        self.instruction_text.text = text
-        self.instruction_text.enabled = True
-        self.instruction_hider = invoke(self.hide_instruction, delay=duration)
+        """Shows text for `duration` seconds, or until hide_instruction() if it's None."""
+        with profiler.scope('ui'):
+            self.instruction.show(text, math.inf if duration is None else duration)
 
     def hide_instruction(self):
-        self.instruction_text.enabled = False
+        self.instruction.hide()
+
+class ProfilerOverlay(Entity):
+    """F3 toggles a per-section frame time breakdown, F4 exports a Chrome trace."""
+    REFRESH = 0.25 # Seconds between text updates, so the numbers are readable
+
+    def __init__(self):
+        super().__init__(parent=camera.ui)
+        self.text = Text(parent=self, text='', position=window.top_right + Vec2(-0.02, -0.02),
+                         origin=(0.5, 0.5), font='VeraMono.ttf', scale=0.8, background=True)
+        self.text.enabled = False
+        self.timer = 0
+
+    def update(self):
+        profiler.next_frame()
+        if not profiler.enabled:
+            return
+        self.timer += time.dt
+        if self.timer >= self.REFRESH:
+            self.timer = 0
+            self.text.text = profiler.overlay_text()
+
+    def input(self, key):
+        if key == 'f3':
+            profiler.enabled = not profiler.enabled
+            self.text.enabled = profiler.enabled
+            profiler.reset()
+        if key == 'f4':
+            path = os.path.join('traces', time.strftime('%Y%m%d-%H%M%S') + '.json')
+            count = profiler.export_chrome_trace(path)
+            ui.show_instruction(f'Saved {count} trace events to {path}')
+
+class LevelStreamer(Entity):
+    """Draws worlds too big for one mesh a chunk at a time around the player (see level_chunks)."""
+    def __init__(self):
+        super().__init__()
+        self.streamer = None
+        self.color_theme = color.white
+
+    def start(self, grid, color_theme):
+        self.stop()
+        self.color_theme = color_theme
+        self.streamer = ChunkStreamer(grid, self.load_chunk, self.unload_chunk, CHUNK_RADIUS, CHUNK_BUDGET)
+
+    def stop(self):
+        if self.streamer is not None:
+            self.streamer.clear()
+            self.streamer = None
+
+    def load_chunk(self, key):
+        vertices, triangles, uvs = self.streamer.grid.mesh_arrays(key)
+        return Entity(parent=level_parent, model=Mesh(vertices=vertices, triangles=triangles, uvs=uvs, static=True),
+                      texture='white_cube', texture_scale=(1,1), color=self.color_theme)
+
+    def unload_chunk(self, key, chunk):
+        destroy(chunk)
+
+    def fill(self):
+        """Loads every chunk around the player at once, for right after a (re)spawn."""
+        if self.streamer is not None:
+            self.streamer.fill(player.x, player.z)
+            self.show_active()
+
+    def update(self):
+        if self.streamer is None:
+            return
+        with profiler.scope('streaming'):
+            if self.streamer.update(player.x, player.z):
+                self.show_active()
+
+    def show_active(self):
+        active = self.streamer.active
+        for key, chunk in self.streamer.resident.items():
+            chunk.enabled = key in active
+        # Goombas and stars out in unloaded chunks aren't drawn either (and far Goombas don't move anyway)
+        grid = self.streamer.grid
+        for system, live in ((sim.goombas, sim.goombas.alive), (sim.stars, sim.stars.active)):
+            keys = grid.keys(system.positions[:system.count, 0], system.positions[:system.count, 2])
+            for i in np.flatnonzero(live[:system.count]):
+                if system.entities[i] is not None:
+                    system.entities[i].enabled = (int(keys[i, 0]), int(keys[i, 1])) in active
 
 # --- World Generation ---
+# Layouts live in worlds.py so the headless simulation sees the same geometry we draw here
 level_parent = Entity()
-active_level_objects = []
 
-def create_level_from_data(platforms, color_theme):
+def create_level_from_data(platforms, color_theme, mesh=None):
     global level_parent
     # We combine all static geometry into one for huge performance gains. Your idea, and a brilliant one.
-    verts = []
-    uvs = []
-    tris = []
-    i = 0
-    for p in platforms: # p is a tuple of (pos_x, pos_y, pos_z, scale_x, scale_y, scale_z)
-        pos = Vec3(p[0], p[1], p[2])
-        scale = Vec3(p[3], p[4], p[5])
-        # Manually add vertices for a cube, transformed by position and scale
-        for v in Cube.model.vertices:
-            verts.append(pos + (v-.5) * scale)
-        uvs.extend(Cube.model.uvs)
-        tris.extend([t+i for t in (0,1,2,0,2,3, 4,5,6,4,6,7, 8,9,10,8,10,11, 12,13,14,12,14,15, 16,17,18,16,18,19, 20,21,22,20,22,23)])
-        i += 24
-
-    if verts:
-        level_parent = Entity(model=Mesh(vertices=verts, triangles=tris, uvs=uvs, static=True), 
+    # The buffers are built in one go by level_mesh (or come ready-made in a packed level), minus
+    # faces buried against other boxes; collision goes through the simulation's grid index, so
+    # no (very slow to build) mesh collider.
+    if len(platforms):
+        vertices, triangles, uvs = mesh if mesh is not None else optimized_mesh_arrays(platforms)
+        level_parent = Entity(model=Mesh(vertices=vertices, triangles=triangles, uvs=uvs, static=True),
                               texture='white_cube', texture_scale=(1,1),
-                              color=color_theme, collider='mesh')
+                              color=color_theme)
     else: # Handle cases with no platforms
         level_parent = Entity()
 
 def clear_world():
-    global level_parent, active_level_objects
+    global level_parent
+    level_streamer.stop()
     # Destroying one parent is much cleaner and faster.
     destroy(level_parent)
-    for obj in active_level_objects:
-        destroy(obj)
-    active_level_objects.clear()
+    if sim.world is not None: # Before the first load there is nothing to clear, and None is the portals
+        for obj in registry.take_world(sim.world): # Scenery the world we're leaving added
+            destroy(obj)
+    pools.release_all('goomba')
+    collectible_manager.stars.clear()
     # Hide portals not in the hub
-    for p in scene.entities:
-        if isinstance(p, WorldPortal):
-            p.enabled = False
+    for p in registry.of('portal'):
+        p.enabled = False
+
+def create_world_level(world_name, color_theme):
+    # Usually already built in the background by the time we get here, so this is just the swap
+    data = world_loader.take(world_name)
+    if 'chunks' in data:
+        # Too big for one mesh: an empty parent now, chunks stream in once the player is placed
+        create_level_from_data((), color_theme)
+        level_streamer.start(data['chunks'], color_theme)
+    else:
+        create_level_from_data(data['platforms'], color_theme, data['mesh'])
 
 world_registry = {}
 def world(func):
@@ -424,120 +502,122 @@ def world(func):
 @world
 def hub():
     clear_world()
-    platforms = [
-        (0, -1, 0, 30, 1, 30), # Ground
-    ]
-    create_level_from_data(platforms, color.lime_green)
+    create_world_level('hub', color.hex('#32cd32'))
 
     # Scenery (no colliders needed, just for looks)
     castle = Entity(parent=level_parent, model='cube', color=color.light_gray, scale=(8,10,6), position=(0,4,-15))
-    active_level_objects.append(castle)
-    for i in range(12):
-        tree = Entity(parent=level_parent, model='cube', color=color.dark_green, 
-               scale=(1, random.randint(3,6), 1), 
-               position=(random.uniform(-14, 14), .5, random.uniform(-14, 14)))
-        active_level_objects.append(tree)
-    
+    registry.add(castle, 'scenery', 'hub')
+    # All the trees are one instanced node, so a forest costs the same single draw call
+    trees = InstancedProps(parent=level_parent, model='cube', color=color.hex('#006400'),
+                           positions=[(random.uniform(-14, 14), .5, random.uniform(-14, 14)) for i in range(12)],
+                           scales=[(1, random.randint(3,6), 1) for i in range(12)])
+    registry.add(trees, 'scenery', 'hub')
+
     # Enable and position portals for the hub
-    for p in scene.entities:
-        if isinstance(p, WorldPortal):
-            p.enabled = True
+    for p in registry.of('portal'):
+        p.enabled = True
 
     ui.show_instruction("Welcome! WASD to move, Mouse to look, Space to jump.", 5)
 
 @world
 def grass():
     clear_world()
-    platforms = [
-        (0, 0, 0, 20, 1, 20), (8, 2, 5, 8, 1, 8), (-10, 4, -8, 6, 1, 6),
-        (5, 6, 12, 10, 1, 4), (0, 8, -5, 3, 1, 3)
-    ]
-    create_level_from_data(platforms, color.green)
-    active_level_objects.extend([
-        Star(position=(0, 2, 0)), Star(position=(8, 5, 5)), Star(position=(-10, 7, -8)), Star(position=(5, 9, 12)), Star(position=(0, 12, -5)),
-        Goomba(position=(3, 1, 3)), Goomba(position=(-5, 1, -2)), Goomba(position=(8, 4, 8)), Goomba(position=(-8, 6, -8))
-    ])
+    create_world_level('grass', color.green)
 
 @world
 def desert():
     clear_world()
-    platforms = [
-        (0, 0, 0, 25, 1, 25), (15, 3, 8, 6, 1, 6), (-12, 5, -6, 8, 1, 4), 
-        (8, 8, -15, 4, 1, 8), (0, 4, 10, 3, 8, 3) # Pyramid
-    ]
-    create_level_from_data(platforms, color.sand)
-    active_level_objects.extend([
-        Star(position=(0, 2, 0)), Star(position=(15, 6, 8)), Star(position=(-12, 8, -6)), Star(position=(8, 11, -15)), Star(position=(0, 10, 10)),
-        Goomba(position=(4, 1, -4)), Goomba(position=(-6, 1, 5)), Goomba(position=(15, 5, 10))
-    ])
+    create_world_level('desert', color.hex('#c2b280'))
 
 @world
 def ice():
     clear_world()
-    player.SPEED = 8 # Slippery!
-    platforms = [
-        (0, -1, 0, 20, 1, 20), (15, 4, 10, 6, 1, 6), (-12, 7, -8, 8, 1, 5), (10, 10, -12, 5, 1, 8)
-    ]
-    create_level_from_data(platforms, color.light_gray)
-    active_level_objects.extend([
-        Star(position=(0, 2, 0)), Star(position=(15, 7, 10)), Star(position=(-12, 10, -8)), Star(position=(10, 13, -12)), Star(position=(-5, 5, 5)),
-        Goomba(position=(5, 1, -3)), Goomba(position=(-4, 1, 6)), Goomba(position=(15, 6, 12))
-    ])
+    create_world_level('ice', color.light_gray)
 
 @world
 def lava():
     clear_world()
-    platforms = [
-        (0, 0, 0, 8, 1, 8), (12, 5, 8, 5, 1, 5), (-10, 8, -10, 6, 1, 4), (8, 12, -15, 4, 1, 6)
-    ]
-    create_level_from_data(platforms, color.dark_gray)
-    # Lava floor that hurts you
+    create_world_level('lava', color.dark_gray)
+    # Lava floor that hurts you (the simulation does the hurting)
     lava_pool = Entity(model='quad', color=color.orange.tint(-0.2), 
-                       scale=40, position=(0, -2, 0), rotation_x=90)
-    def lava_check():
-        if player.y < lava_pool.y + 1:
-            player.respawn()
-    lava_pool.update = lava_check
-    active_level_objects.append(lava_pool)
-    active_level_objects.extend([
-        Star(position=(0, 3, 0)), Star(position=(12, 8, 8)), Star(position=(-10, 11, -10)), Star(position=(8, 15, -15)), Star(position=(5, 3, -5)),
-        Goomba(position=(6, 1, -2)), Goomba(position=(-3, 1, 4)), Goomba(position=(12, 7, 10))
-    ])
+                       scale=40, position=(0, sim.worlds['lava']['lava_y'], 0), rotation_x=90)
+    registry.add(lava_pool, 'scenery', 'lava')
 
 
 def load_world(world_name):
-    player.SPEED = MarioController.SPEED # Reset speed on world change
-    if world_name in world_registry:
-        world_registry[world_name]()
-    player.respawn()
-    ui.hide_instruction()
-
-def find_safe_spawn_point():
-    # Find the highest platform to spawn on
-    if level_parent and level_parent.model and level_parent.model.vertices:
-        platforms = [v for v in level_parent.model.vertices]
-        if platforms:
-            highest_y = -9999
-            for v in platforms:
-                if v.y > highest_y:
-                    highest_y = v.y
-            return Vec3(0, highest_y + 2, 0)
-    return Vec3(0, 5, -10) # Fallback
+    with profiler.scope('world_load'):
+        recorder.event('world:' + world_name) # So a replay switches worlds on the same tick
+        if world_name in world_registry:
+            world_registry[world_name]()
+        else: # A level that only exists as a levels/*.mlvl file
+            clear_world()
+            create_world_level(world_name, color.light_gray)
+        data = world_loader.take(world_name)
+        pools.prewarm({'goomba': len(data['goombas'])})
+        sim.load_world(world_name, data) # Collision, Goombas and stars, then respawns the player
+        player.sync(1)
+        level_streamer.fill()
+        ui.hide_instruction()
+
+def toggle_recording():
+    """F5: starts logging input from a fresh load of this world, or saves the log for replay.py."""
+    if recorder.recording:
+        recorder.stop()
+        path = os.path.join('recordings', time.strftime('%Y%m%d-%H%M%S') + '.json')
+        recorder.save(path)
+        ui.show_instruction(f'Saved {path}')
+    else:
+        recorder.start(player.yaw)
+        load_world(sim.world)
+        ui.show_instruction('Recording... F5 to stop')
 
 # --- Initial Setup ---
 # Create portals once, they will be enabled/disabled by the world loader
-WorldPortal((-10, 1, 8), 'grass', 0, color.green)
-WorldPortal((10, 1, 8), 'desert', 3, color.orange)
-WorldPortal((-10, 1, -8), 'ice', 8, color.cyan)
-WorldPortal((10, 1, -8), 'lava', 15, color.red)
+portal_colors = {'grass': color.green, 'desert': color.orange, 'ice': color.cyan, 'lava': color.red}
+for position, world_name, required_stars in sim.worlds['hub']['portals']:
+    WorldPortal(position, world_name, required_stars, portal_colors[world_name])
 player = MarioController()
+collectible_manager = CollectibleManager()
+
+def reset_sparkle(e, position):
+    e.position = position
+    e.scale = random.uniform(0.01, 0.05)
+    e.rotation_z = random.uniform(0, 360)
+
+def reset_squish(e, position):
+    e.position = position
+    e.scale = (1, 0.8, 1)
+    e.color = color.rgb(139, 69, 19)
+
+def reset_sound(sound, volume, pitch):
+    if sound.clip: # Missing sound files leave an Audio with no clip
+        sound.volume = volume
+        sound.pitch = pitch
+        sound.play()
+
+pools.register('goomba', Goomba, lambda e, position: setattr(e, 'position', position))
+pools.register('sparkle', lambda: Entity(parent=camera.ui, model='quad', color=color.gold), reset_sparkle)
+pools.register('squish', lambda: Entity(model='cube'), reset_squish)
+for name in ('coin', 'blip'):
+    pools.register('sound:' + name, lambda name=name: Audio(name, autoplay=False), reset_sound,
+                   retire=lambda sound: None, revive=lambda sound: None)
+pools.prewarm({'sparkle': 10, 'squish': 2, 'sound:coin': 2, 'sound:blip': 2})
+sim.make_star = Star
+sim.make_goomba = lambda position: pools.get('goomba', position)
+simulation = Simulation()
+level_streamer = LevelStreamer()
 ui = UI()
+profiler_overlay = ProfilerOverlay()
 sun = DirectionalLight()
 sun.look_at(Vec3(1, -1.5, -1))
 sky = Sky() # Default sky is fine
 
+def update():
+    with profiler.scope('timers'):
+        timers.advance(time.dt)
+
 # Load the hub world to start
 load_world('hub')
 
-# Start the engine, darling.
-app.run()
+# Start the engine, darling. (--headless runs it with no window, see headless.py)
+run(app)
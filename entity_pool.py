@@ -0,0 +1,95 @@
+"""Recycling for short-lived entities.
+
+Stars, Goombas, pickup sparkles and sound effects come and go all the time, and building
+and destroying a Panda3D node for each one shows up as GC pauses and frame hitches.
+EntityPool keeps released entities (disabled) and hands them back out instead, so once a
+pool is warm, steady play doesn't allocate. Pools don't know about Ursina: a pool is a
+factory plus hooks to reset an entity for reuse and to put it away.
+"""
+
+
+def enable(entity):
+    entity.enabled = True
+
+
+def disable(entity):
+    entity.enabled = False
+
+
+class EntityPool:
+    def __init__(self, factory, reset=None, retire=disable, revive=enable):
+        """factory() builds a new entity. reset(entity, *args, **kwargs) gets get()'s arguments
+        and sets a reused entity up; retire/revive put it away and bring it back."""
+        self.factory = factory
+        self.reset = reset
+        self.retire = retire
+        self.revive = revive
+        self.free = []
+        self.in_use = {} # id -> entity
+        self.created = 0
+
+    def __len__(self):
+        return len(self.free) + len(self.in_use)
+
+    def _create(self):
+        self.created += 1
+        return self.factory()
+
+    def prewarm(self, count):
+        """Builds entities up front until at least `count` are free."""
+        while len(self.free) < count:
+            entity = self._create()
+            self.retire(entity)
+            self.free.append(entity)
+
+    def get(self, *args, **kwargs):
+        entity = self.free.pop() if self.free else self._create()
+        self.in_use[id(entity)] = entity
+        self.revive(entity)
+        if self.reset is not None:
+            self.reset(entity, *args, **kwargs)
+        return entity
+
+    def release(self, entity):
+        """Puts an entity back. Releasing one twice (or one this pool didn't hand out) does nothing."""
+        if self.in_use.pop(id(entity), None) is None:
+            return False
+        self.retire(entity)
+        self.free.append(entity)
+        return True
+
+    def release_all(self):
+        for entity in list(self.in_use.values()):
+            self.release(entity)
+
+
+class PoolRegistry:
+    """Named EntityPools, so code can ask for a 'star' or a 'sparkle' without holding the pool."""
+    def __init__(self):
+        self.pools = {}
+
+    def __getitem__(self, name):
+        return self.pools[name]
+
+    def register(self, name, factory, reset=None, retire=disable, revive=enable):
+        pool = self.pools[name] = EntityPool(factory, reset, retire, revive)
+        return pool
+
+    def get(self, name, *args, **kwargs):
+        return self.pools[name].get(*args, **kwargs)
+
+    def release(self, entity):
+        """Returns an entity to whichever pool it came from."""
+        return any(pool.release(entity) for pool in self.pools.values())
+
+    def release_all(self, *names):
+        for name in names or self.pools:
+            self.pools[name].release_all()
+
+    def prewarm(self, counts):
+        """counts is {pool name: how many should be ready}, e.g. a world's star and Goomba counts."""
+        for name, count in counts.items():
+            self.pools[name].prewarm(count)
+
+    def stats(self):
+        return {name: (len(pool.in_use), len(pool.free), pool.created) for name, pool in self.pools.items()}
@@ -0,0 +1,61 @@
+"""Entities grouped by kind and by world.
+
+Instead of walking every entity in the scene and isinstance-checking it to find the
+portals, or everything that belongs to the world being unloaded, entities are filed
+under a kind ('portal', 'scenery', 'sky', ...) and the world they belong to (None for
+ones that outlive world changes) when they're made. Lookups and world teardown then
+only touch the entities involved. Destroying an entity takes it out of the registry too,
+through the on_destroy hook Ursina's destroy() calls.
+"""
+from collections import defaultdict
+
+
+class EntityRegistry:
+    def __init__(self):
+        self.kinds = defaultdict(dict) # kind -> {id: entity}, in the order they were added
+        self.worlds = defaultdict(dict) # world -> {id: entity}
+        self.where = {} # id -> (kind, world)
+
+    def __len__(self):
+        return len(self.where)
+
+    def add(self, entity, kind, world=None):
+        """Files an entity and returns it, so creation can be wrapped in place."""
+        key = id(entity)
+        if key in self.where:
+            self.remove(entity)
+        self.kinds[kind][key] = entity
+        self.worlds[world][key] = entity
+        self.where[key] = (kind, world)
+
+        previous = getattr(entity, 'on_destroy', None)
+        def on_destroy():
+            self.remove(entity)
+            if previous is not None:
+                previous()
+        entity.on_destroy = on_destroy
+        return entity
+
+    def remove(self, entity):
+        key = id(entity)
+        if key not in self.where:
+            return False
+        kind, world = self.where.pop(key)
+        del self.kinds[kind][key]
+        del self.worlds[world][key]
+        return True
+
+    def of(self, kind):
+        return list(self.kinds.get(kind, {}).values())
+
+    def in_world(self, world, kind=None):
+        entities = self.worlds.get(world, {}).values()
+        return [e for e in entities if kind is None or self.where[id(e)][0] == kind]
+
+    def take_world(self, world):
+        """Removes and returns everything filed under `world`, e.g. to destroy it on unloading."""
+        entities = list(self.worlds.pop(world, {}).values())
+        for entity in entities:
+            kind, world = self.where.pop(id(entity))
+            del self.kinds[kind][id(entity)]
+        return entities
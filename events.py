@@ -0,0 +1,100 @@
+"""Game events and timers, so things only run when something happens to them.
+
+EventBus hands named events ('star_collected', 'world_entered', 'portal_unlocked', ...)
+to whoever subscribed to them, in the order they subscribed. A portal waits to hear that
+the star count changed instead of comparing it every frame, and the HUD redraws its
+counter when a star is collected instead of setting it every frame.
+
+TimerWheel replaces invoke() and destroy(delay=...) for short delays. Timers are dropped
+into one of a ring of per-tick slots by the tick they're due on, so scheduling and
+cancelling are O(1), and each tick only looks at the one slot that's due. With nothing
+scheduled, advance() is a couple of float operations however long the game runs.
+"""
+import math
+from collections import defaultdict
+
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = defaultdict(list) # event -> [callback], in the order they subscribed
+
+    def subscribe(self, event, callback):
+        """Calls callback(*args) every time `event` is emitted. Returns the callback."""
+        self.subscribers[event].append(callback)
+        return callback
+
+    def unsubscribe(self, event, callback):
+        callbacks = self.subscribers.get(event)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+
+    def emit(self, event, *args):
+        """Calls everything subscribed to `event`. Returns how many there were."""
+        callbacks = self.subscribers.get(event)
+        if not callbacks:
+            return 0
+        # A copy, so subscribers can unsubscribe (or destroy each other) while we're going through them
+        for callback in list(callbacks):
+            callback(*args)
+        return len(callbacks)
+
+
+class Timer:
+    __slots__ = ('due', 'callback', 'args', 'cancelled')
+
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, tick=1 / 60, slots=256):
+        """tick is the wheel's resolution in seconds; a delay is rounded up to whole ticks.
+
+        Delays longer than slots ticks go around the wheel and wait in their slot until
+        their round comes up.
+        """
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.now = 0 # ticks since the wheel started
+        self.elapsed = 0.0 # seconds towards the next tick
+        self.pending = 0
+
+    def __len__(self):
+        return self.pending
+
+    def after(self, delay, callback, *args):
+        """Calls callback(*args) `delay` seconds from now. Returns a Timer that can be cancelled."""
+        due = self.now + max(1, math.ceil(delay / self.tick - 1e-9))
+        timer = Timer(due, callback, args)
+        self.slots[due % len(self.slots)].append(timer)
+        self.pending += 1
+        return timer
+
+    def advance(self, dt):
+        """Moves the clock on by dt seconds and runs every timer that came due."""
+        self.elapsed += dt
+        ticks = int(self.elapsed / self.tick)
+        if not ticks:
+            return
+        self.elapsed -= ticks * self.tick
+        end = self.now + ticks
+        while self.pending and self.now < end:
+            self.now += 1
+            slot = self.slots[self.now % len(self.slots)]
+            if not slot:
+                continue
+            due = [timer for timer in slot if timer.due <= self.now]
+            if not due:
+                continue
+            slot[:] = [timer for timer in slot if timer.due > self.now]
+            self.pending -= len(due)
+            for timer in due:
+                if not timer.cancelled:
+                    timer.callback(*timer.args)
+        self.now = end
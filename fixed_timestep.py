@@ -0,0 +1,43 @@
+"""Accumulator-based fixed timestep.
+
+Frame times go in, a whole number of equal simulation ticks comes out, so physics
+runs the same no matter how fast (or unevenly) frames are drawn. Whatever time is
+left over becomes `alpha`, the fraction of a tick to interpolate rendering by.
+"""
+
+
+def lerp_tuple(a, b, t):
+    """Linearly interpolates two equal-length sequences."""
+    return tuple(x + (y - x) * t for x, y in zip(a, b))
+
+
+class FixedTimestep:
+    def __init__(self, rate=120, max_steps=8):
+        """rate is ticks per second; after max_steps in one frame the backlog is dropped
+        so a long stall doesn't turn into a spiral of catch-up frames."""
+        self.rate = rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.ticks = 0
+
+    @property
+    def step(self):
+        return 1 / self.rate
+
+    @property
+    def alpha(self):
+        """How far between the last two ticks the current frame sits, 0..1."""
+        return self.accumulator / self.step
+
+    def advance(self, frame_dt):
+        """Adds a frame's worth of time and returns how many ticks to run now."""
+        step = self.step
+        self.accumulator += frame_dt
+        steps = int(self.accumulator / step)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * step
+        self.ticks += steps
+        return steps
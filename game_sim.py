@@ -0,0 +1,126 @@
+"""Headless game state for one player.
+
+GameSim bundles the collision level, MarioBody, GoombaSystem and star grid for the
+current world and advances them one fixed tick at a time. The 60fps build drives one
+from its Simulation entity and only mirrors it on screen; replays and other tools
+drive it directly with no window at all.
+"""
+import math
+import zlib
+from collections import namedtuple
+
+from collectibles import CollectibleGrid
+from collision_index import SpatialIndex
+from goomba_system import GoombaSystem
+from mario_physics import MarioBody
+from profiler import profiler
+from spawn_index import SpawnIndex
+from worlds import WORLDS
+
+TickEvents = namedtuple('TickEvents', 'jump stomped collected hurt respawned')
+
+
+def move_vector(held, yaw):
+    """Turns held WASD keys and a camera yaw in degrees into a world-space (x, z) move direction."""
+    x = ('d' in held) - ('a' in held)
+    z = ('w' in held) - ('s' in held)
+    length = math.hypot(x, z)
+    if not length:
+        return 0.0, 0.0
+    x /= length
+    z /= length
+    s = math.sin(math.radians(yaw))
+    c = math.cos(math.radians(yaw))
+    # camera forward is (s, 0, c) and right is (c, 0, -s)
+    return s * z + c * x, c * z - s * x
+
+
+class GameSim:
+    FALL_LIMIT = -30
+    STOMP_BOUNCE = 8
+
+    def __init__(self, seed=0, worlds=WORLDS):
+        self.seed = seed
+        self.worlds = worlds
+        self.world = None
+        self.world_data = {}
+        self.stars_collected = 0
+        self.kill_height = self.FALL_LIMIT
+        self.level = SpatialIndex()
+        self.spawns = SpawnIndex(self.level, spawn=(0, 5, -10))
+        self.checkpoint = None # last checkpoint touched in this world, if any
+        self.body = MarioBody(self.level)
+        self.goombas = GoombaSystem(seed=seed)
+        self.stars = CollectibleGrid()
+        self.profiler = profiler
+        # Optional factories for on-screen entities; called with a position, return the entity
+        self.make_star = None
+        self.make_goomba = None
+
+    def load_world(self, name, data=None):
+        """Swaps in a world's collision, Goombas and stars and respawns the player.
+
+        `data` can be a copy of the world with its 'index' already built (see world_loader).
+        """
+        data = self.worlds[name] if data is None else data
+        self.world = name
+        self.world_data = data
+        self.level = data['index'] if 'index' in data else SpatialIndex(data['platforms']) # prepared and packed worlds come prebuilt
+        self.body.level = self.level
+        self.body.SPEED = data.get('speed', MarioBody.SPEED)
+        self.kill_height = self.world_kill_height(data)
+        # Worked out once here, so respawning (every fall and every Goomba hit) is a lookup
+        self.spawns = SpawnIndex(self.level, data.get('spawn'), data.get('checkpoints', ()), self.kill_height)
+        self.checkpoint = None
+
+        # Same seed + same world = same Goomba patrols, however we got here
+        self.goombas.clear()
+        self.goombas.reseed((self.seed, zlib.crc32(name.encode())))
+        for position in data['goombas']:
+            self.goombas.add(position, entity=self.make_goomba(position) if self.make_goomba else None)
+        self.stars.clear()
+        for position in data['stars']:
+            self.stars.add(position, self.make_star(position) if self.make_star else None)
+        self.respawn()
+
+    @classmethod
+    def world_kill_height(cls, data):
+        """Below this the player respawns: just above a world's lava, or FALL_LIMIT."""
+        return data['lava_y'] + 1 if 'lava_y' in data else cls.FALL_LIMIT
+
+    def spawn_point(self):
+        return self.spawns.respawn_point(self.checkpoint)
+
+    def respawn(self):
+        self.body.teleport(self.spawn_point())
+
+    def tick(self, dt, move_x=0.0, move_z=0.0, jump=False, long_jump=False):
+        """Advances everything by one fixed step and reports what happened as TickEvents."""
+        body = self.body
+        scope = self.profiler.scope
+        with scope('player'):
+            kind = body.jump(long_jump) if jump else None
+            body.handle_input(move_x, move_z, dt)
+            body.update_physics(dt)
+
+            # Fall out of the world (or into the lava)
+            respawned = body.position[1] < self.kill_height
+            if respawned:
+                self.respawn()
+            else:
+                checkpoint = self.spawns.checkpoint_at(*body.position)
+                if checkpoint is not None:
+                    self.checkpoint = checkpoint
+
+        with scope('enemies'):
+            stomped, hurt = self.goombas.update(dt, self.level, body)
+            if len(stomped):
+                body.velocity[1] = self.STOMP_BOUNCE
+            if hurt:
+                self.respawn()
+
+        with scope('collectibles'):
+            x, y, z = body.position
+            collected = self.stars.collect_near(x, y, z)
+            self.stars_collected += len(collected)
+        return TickEvents(kind, stomped, collected, hurt, respawned or hurt)
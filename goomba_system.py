@@ -0,0 +1,143 @@
+"""Batched Goomba AI.
+
+Instead of every Goomba running its own update() with two raycasts, a distance check and
+an intersects(player), GoombaSystem keeps every enemy's position, heading and patrol
+centre in NumPy arrays and does the ledge/wall checks, patrol clamping and stomp/hurt
+tests for all of them in one pass a frame. Entities are only told where to draw.
+Goombas far from the player update less often, or not at all (see activity.py).
+"""
+import numpy as np
+
+from activity import ActivityTiers
+
+
+class GoombaSystem:
+    MOVE_SPEED = 2
+    PATROL_AREA = 5
+    SIZE = (1, 0.8, 1)
+    WALL_PROBE = 0.6
+    LEDGE_PROBE = 2
+    DIRECTIONS = np.array([(1, 0, 0), (-1, 0, 0), (0, 0, 1), (0, 0, -1)], dtype=float)
+
+    def __init__(self, capacity=16, seed=None, activity=None):
+        self.rng = np.random.default_rng(seed)
+        self.activity = activity or ActivityTiers(near=25, mid=60, mid_interval=4)
+        self.ticks = 0
+        self.count = 0
+        self.entities = []
+        self.positions = np.zeros((capacity, 3))
+        self.previous_positions = np.zeros((capacity, 3)) # where each one's last move started...
+        self.moved_ticks = np.zeros(capacity, dtype=np.int64) # ...the tick it made it on...
+        self.move_steps = np.ones(capacity, dtype=np.int64) # ...and how many ticks' worth it was
+        self.start_positions = np.zeros((capacity, 3))
+        self.directions = np.zeros((capacity, 3))
+        self.patrol_areas = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        capacity = max(16, len(self.alive) * 2)
+        for name in ('positions', 'previous_positions', 'moved_ticks', 'move_steps', 'start_positions', 'directions',
+                     'patrol_areas', 'alive'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, position, patrol_area=PATROL_AREA, entity=None):
+        """Registers a Goomba and returns its slot. `entity` (if any) gets its position written back."""
+        if self.count == len(self.alive):
+            self._grow()
+        i = self.count
+        self.positions[i] = position
+        self.previous_positions[i] = position
+        self.moved_ticks[i] = self.ticks
+        self.move_steps[i] = 1
+        self.start_positions[i] = position
+        self.directions[i] = self.DIRECTIONS[self.rng.integers(len(self.DIRECTIONS))]
+        self.patrol_areas[i] = patrol_area
+        self.alive[i] = True
+        self.entities.append(entity)
+        self.count += 1
+        return i
+
+    def reseed(self, seed):
+        """Restarts the direction picker so the same seed replays the same patrols."""
+        self.rng = np.random.default_rng(seed)
+
+    def kill(self, i):
+        self.alive[i] = False
+
+    def clear(self):
+        self.count = 0
+        self.ticks = 0 # so a world plays out the same from load, whatever ran before
+        self.entities.clear()
+        self.alive[:] = False
+
+    def update(self, dt, level, player):
+        """Steps every live Goomba against `level` (a SpatialIndex) and a MarioBody.
+
+        Returns (stomped, hurt): the slots the player landed on this frame, and whether
+        any other Goomba touched the player.
+        """
+        n = self.count
+        live = np.flatnonzero(self.alive[:n])
+        self.ticks += 1
+        if not len(live):
+            return live, False
+        # Only the ones near enough to be due this tick; mid-range ones catch up with a bigger dt
+        due, steps = self.activity.schedule(live, self.positions[live], player.position, self.ticks)
+        live, steps = live[due], steps[due]
+        if not len(live):
+            return live, False
+        # Only rows that move now start a new move; the rest are still drawn easing through their last one
+        self.previous_positions[live] = self.positions[live]
+        self.moved_ticks[live] = self.ticks
+        self.move_steps[live] = steps
+        pos = self.positions[live]
+        heading = self.directions[live]
+
+        # Ledge and wall detection
+        wall_hit, _ = level.raycast_many(pos, heading, self.WALL_PROBE)
+        ledge_hit, _ = level.raycast_many(pos + heading * self.WALL_PROBE, (0, -1, 0), self.LEDGE_PROBE)
+        offset = pos[:, [0, 2]] - self.start_positions[live][:, [0, 2]]
+        wandered = np.einsum('ij,ij->i', offset, offset) > self.patrol_areas[live] ** 2
+
+        turn = wall_hit | ~ledge_hit | wandered
+        if turn.any():
+            heading[turn] = self.DIRECTIONS[self.rng.integers(len(self.DIRECTIONS), size=int(turn.sum()))]
+            self.directions[live] = heading
+
+        pos += heading * (self.MOVE_SPEED * dt * steps)[:, None]
+        self.positions[live] = pos
+
+        # Interaction with player: box overlap, stomped if falling onto the top half
+        px, py, pz = player.position
+        hx, hy, hz = player.half_extents
+        size = np.array(self.SIZE) / 2
+        touching = ((np.abs(pos[:, 0] - px) < size[0] + hx) & (np.abs(pos[:, 2] - pz) < size[2] + hz)
+                    & (pos[:, 1] - size[1] < py + hy * 2) & (pos[:, 1] + size[1] > py))
+        if not touching.any():
+            return live[:0], False
+        stomping = touching & (player.velocity[1] < -1) & (py > pos[:, 1])
+        stomped = live[stomping]
+        self.alive[stomped] = False
+        return stomped, bool((touching & ~stomping).any())
+
+    def write_back(self, alpha=1.0):
+        """Copies positions onto the registered entities, `alpha` of a tick past the last update.
+
+        A Goomba that moved several ticks' worth at once is spread over that many ticks, so
+        mid-range ones glide at the same speed as near ones instead of jumping every few ticks.
+        """
+        n = self.count
+        progress = (self.ticks - self.moved_ticks[:n] + alpha) / self.move_steps[:n]
+        progress = np.minimum(progress, 1.0)[:, None]
+        previous = self.previous_positions[:n]
+        positions = previous + (self.positions[:n] - previous) * progress
+        for i in np.flatnonzero(self.alive[:self.count]):
+            entity = self.entities[i]
+            if entity is not None:
+                entity.position = tuple(positions[i])
@@ -0,0 +1,180 @@
+"""Running the game scripts without a window.
+
+Every build makes its app with make_app() and ends with run(app) instead of Ursina()
+and app.run(). Started normally, those are just that. Started with --headless (or
+MARIO_HEADLESS=1) there's no window at all; with --offscreen the game still renders,
+into an offscreen buffer, for screenshots or GPU timings on a machine with no display.
+Either way the clock is forced to fixed frames, so a run plays out the same every
+time, and run() steps --frames frames as fast as it can and prints the frame times:
+
+    python deltamario4k60fps6.9.25.a.py --headless --frames 1200
+    python headless.py b33134k6.8.25.py --offscreen --screenshot castle.png
+
+A test or a nightly job can drive a build itself instead:
+
+    game = load_game('deltamario4k60fps6.9.25.a.py')
+    game.hold('w')
+    game.step(120)
+    print(game['player'].position)
+"""
+import argparse
+import os
+import runpy
+import sys
+import time
+
+import numpy as np
+
+FRAME_RATE = 60
+DEFAULT_FRAMES = 600
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--offscreen', action='store_true')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES)
+    parser.add_argument('--fps', type=int, default=FRAME_RATE)
+    parser.add_argument('--screenshot')
+    return parser.parse_known_args(argv)[0]
+
+
+options = _parse_args(sys.argv[1:])
+if options.offscreen:
+    WINDOW_TYPE = 'offscreen'
+elif options.headless or os.environ.get('MARIO_HEADLESS', '') not in ('', '0'):
+    WINDOW_TYPE = 'none'
+else:
+    WINDOW_TYPE = 'onscreen'
+HEADLESS = WINDOW_TYPE != 'onscreen'
+_driven = [] # load_game() puts a slot here; run() fills it instead of stepping frames itself
+
+
+def make_app(fps_counter=False, exit_button=True, **kwargs):
+    """Ursina(**kwargs) in whichever window mode we were started in.
+
+    fps_counter and exit_button set the window's widgets, which don't exist without one.
+    """
+    from ursina import Ursina, camera, mouse, window
+    app = Ursina(window_type=WINDOW_TYPE, **kwargs)
+    if WINDOW_TYPE != 'none':
+        window.fps_counter.enabled = fps_counter
+        window.exit_button.visible = exit_button
+    else:
+        camera._clip_plane_far = 10000 # No lens gets set up with no window, but Sky still sizes itself off this
+    if WINDOW_TYPE != 'onscreen':
+        # There's no pointer to lock without a window, but the builds (and FirstPersonController)
+        # lock it anyway, which asks a window that isn't there to grab it
+        type(mouse).locked = property(lambda m: getattr(m, '_locked', False),
+                                      lambda m, value: setattr(m, '_locked', value))
+    return app
+
+
+def run(app, **kwargs):
+    """app.run(**kwargs), or with no window, the fixed-frame loop described up top."""
+    if not HEADLESS:
+        app.run(**kwargs)
+        return
+    game = HeadlessGame(app, vars(sys.modules['__main__']), options.fps)
+    if _driven:
+        _driven[-1] = game
+        return
+    game.step(options.frames)
+    if options.screenshot:
+        game.screenshot(options.screenshot)
+    print(game.report())
+
+
+class HeadlessGame:
+    """A build running without a window, stepped a frame at a time.
+
+    Indexing gives the script's globals, e.g. game['sim'] or game['load_world']('ice').
+    """
+    def __init__(self, app, namespace, fps=FRAME_RATE):
+        from panda3d.core import ClockObject
+        self.app = app
+        self.namespace = namespace
+        self.fps = fps
+        self.frame_times = []
+        # Every frame is exactly 1/fps long, however long it really took, and nothing waits for real time to catch up
+        clock = ClockObject.get_global_clock()
+        clock.set_mode(ClockObject.M_non_real_time)
+        clock.set_frame_rate(fps)
+
+    def __getitem__(self, name):
+        return self.namespace[name]
+
+    def step(self, frames=1):
+        clock = time.perf_counter
+        for _ in range(frames):
+            start = clock()
+            self.app.step()
+            self.frame_times.append(clock() - start)
+
+    def run_for(self, seconds):
+        self.step(round(seconds * self.fps))
+
+    def hold(self, key):
+        """Presses a key and keeps it down (held_keys and the input hooks see it) until release()."""
+        self.app.input(key, is_raw=True)
+
+    def release(self, key):
+        self.app.input_up(key, is_raw=True)
+
+    def press(self, key, frames=1):
+        """Taps a key: down for `frames` frames, then up."""
+        self.hold(key)
+        self.step(frames)
+        self.release(key)
+
+    def screenshot(self, path):
+        """Saves the last frame drawn; only offscreen runs draw anything."""
+        from panda3d.core import Filename
+        if WINDOW_TYPE != 'offscreen':
+            raise RuntimeError('screenshots need --offscreen')
+        self.app.graphicsEngine.render_frame()
+        return self.app.win.save_screenshot(Filename.from_os_specific(os.path.abspath(path)))
+
+    def report(self):
+        """Frame count, simulated seconds and real frame times (ms) since the start."""
+        times = np.array(self.frame_times) * 1000
+        if not len(times):
+            return {'frames': 0}
+        return {
+            'frames': len(times),
+            'seconds': len(times) / self.fps,
+            'frame_ms_mean': round(float(times.mean()), 3),
+            'frame_ms_p99': round(float(np.percentile(times, 99)), 3),
+            'frame_ms_max': round(float(times.max()), 3),
+        }
+
+
+def load_game(path, offscreen=False):
+    """Runs a build's script with no window up to where it would start its main loop, and
+    returns it as a HeadlessGame to step. Call before anything else imports Ursina; a
+    process only gets one app."""
+    global WINDOW_TYPE, HEADLESS
+    WINDOW_TYPE = 'offscreen' if offscreen else 'none'
+    HEADLESS = True
+    folder = os.path.dirname(os.path.abspath(path))
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    _driven.append(None)
+    try:
+        runpy.run_path(path, run_name='__main__')
+        game = _driven[-1]
+    finally:
+        _driven.pop()
+    if game is None:
+        raise RuntimeError(f'{path} never called headless.run(app)')
+    return game
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1].startswith('-'):
+        sys.exit(__doc__.strip())
+    path = sys.argv[1]
+    os.environ['MARIO_HEADLESS'] = '1' # the build imports its own copy of this module, which reads this
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    runpy.run_path(path, run_name='__main__')
@@ -0,0 +1,63 @@
+"""HUD text that only re-lays out when what it shows changes.
+
+Assigning Text.text rebuilds the text's geometry, even when the string is the same as
+before, so a HUD that sets its counters every frame pays for a full rebuild of every
+one of them every frame. A HudText remembers the value it last showed and only touches
+the Text when that changes. An Instruction is a message line that stays up for a while
+after the last time it was asked for, so asking for the same message every frame (as a
+portal does while the player stands in it) just keeps it up instead of redrawing it and
+restarting a timer each time.
+"""
+
+
+class HudText:
+    """A Text showing template.format(value), rebuilt only when value changes."""
+    def __init__(self, widget, template='{}'):
+        self.widget = widget
+        self.template = template
+        self.value = None
+
+    def set(self, value):
+        """Shows `value` and returns True, or returns False if it's already showing."""
+        if value == self.value:
+            return False
+        self.value = value
+        self.widget.text = self.template.format(value)
+        return True
+
+
+class Instruction:
+    """A message line that hides itself `duration` seconds after it was last shown.
+
+    The owner calls update(dt) once a frame; while nothing is showing, that's one compare.
+    """
+    def __init__(self, widget, template='{}'):
+        self.text = HudText(widget, template)
+        self.remaining = 0.0
+        widget.enabled = False
+
+    @property
+    def widget(self):
+        return self.text.widget
+
+    @property
+    def showing(self):
+        return self.remaining > 0
+
+    def show(self, message, duration=2):
+        """Shows `message` for `duration` seconds, or just keeps it up if it's already showing."""
+        changed = self.text.set(message)
+        if not self.showing:
+            self.widget.enabled = True
+        self.remaining = duration if changed else max(self.remaining, duration)
+
+    def hide(self):
+        if self.showing:
+            self.remaining = 0.0
+            self.widget.enabled = False
+
+    def update(self, dt):
+        if self.remaining > 0:
+            self.remaining -= dt
+            if self.remaining <= 0:
+                self.widget.enabled = False
@@ -0,0 +1,137 @@
+"""Instanced drawing for repeated props.
+
+InstancedProps draws every copy of one model (trees, crystals, rocks, stars) from a
+single node in one draw call. Each copy's position, yaw, scale and colour live in a float
+buffer texture that the vertex shader reads by gl_InstanceID. Copies can be switched off
+and on without touching the scene graph, and all of them can share a spin and a bob,
+which is all a star's animation is.
+"""
+import numpy as np
+from panda3d.core import BoundingBox, GeomEnums, Point3, Texture
+from ursina import Entity, Shader
+
+TEXELS = 3 # per instance: (x, y, z, yaw), (sx, sy, sz, enabled), (r, g, b, a)
+
+instanced_props_shader = Shader(name='instanced_props_shader', language=Shader.GLSL, vertex='''#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer instances;
+uniform float spin;
+uniform float bob;
+in vec4 p3d_Vertex;
+in vec2 p3d_MultiTexCoord0;
+out vec2 texcoords;
+out vec4 instance_color;
+
+void main() {
+    vec4 placement = texelFetch(instances, gl_InstanceID * 3);
+    vec4 scale = texelFetch(instances, gl_InstanceID * 3 + 1);
+    instance_color = texelFetch(instances, gl_InstanceID * 3 + 2);
+    float yaw = radians(placement.w + spin);
+    vec3 v = p3d_Vertex.xyz * scale.xyz * scale.w; // disabled copies collapse to a point
+    v = vec3(v.x * cos(yaw) + v.z * sin(yaw), v.y, v.z * cos(yaw) - v.x * sin(yaw));
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(v + placement.xyz + vec3(0, bob, 0), 1.0);
+    texcoords = p3d_MultiTexCoord0;
+}
+''',
+fragment='''#version 140
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+in vec2 texcoords;
+in vec4 instance_color;
+out vec4 fragColor;
+
+void main() {
+    fragColor = texture(p3d_Texture0, texcoords) * p3d_ColorScale * instance_color;
+}
+''',
+default_input={
+    'spin': 0.0,
+    'bob': 0.0,
+})
+
+
+class InstancedProps(Entity):
+    """Many copies of one model as one node. Positions are relative to this entity."""
+    def __init__(self, model='cube', positions=(), scales=1, yaws=0, colors=(1, 1, 1, 1), capacity=16, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.count = 0
+        self.data = np.zeros((capacity, TEXELS, 4), dtype=np.float32)
+        self.buffer = Texture('instances')
+        self.dirty = True
+        self.shader = instanced_props_shader
+        if len(positions):
+            self.extend(positions, scales, yaws, colors)
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, positions, scales=1, yaws=0, colors=(1, 1, 1, 1)):
+        """Adds a copy per position and returns the new slots.
+
+        scales is a number, an (x, y, z) or an (N, 3) / (N, 1) array; yaws a number or
+        (N,) degrees; colors an (r, g, b, a) or an (N, 4) array.
+        """
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        start, end = self.count, self.count + len(positions)
+        if end > len(self.data):
+            data = np.zeros((max(end, 2 * len(self.data)), TEXELS, 4), dtype=np.float32)
+            data[:start] = self.data[:start]
+            self.data = data
+        rows = self.data[start:end]
+        rows[:, 0, :3] = positions
+        rows[:, 0, 3] = yaws
+        rows[:, 1, :3] = scales
+        rows[:, 1, 3] = 1
+        rows[:, 2] = colors
+        self.count = end
+        self.dirty = True
+        return range(start, end)
+
+    def add(self, position, scale=1, yaw=0, color=(1, 1, 1, 1)):
+        return self.extend([position], scale, yaw, color)[0]
+
+    def set_enabled(self, i, enabled):
+        self.data[i, 1, 3] = enabled
+        self.dirty = True
+
+    def is_enabled(self, i):
+        return bool(self.data[i, 1, 3])
+
+    def set_position(self, i, position):
+        self.data[i, 0, :3] = position
+        self.dirty = True
+
+    def clear(self):
+        self.count = 0
+        self.dirty = True
+
+    def animate_all(self, spin, bob=0):
+        """Turns every copy by `spin` degrees and lifts it by `bob`, on top of its own yaw and position."""
+        self.set_shader_input('spin', spin)
+        self.set_shader_input('bob', bob)
+
+    def update(self):
+        if self.dirty:
+            self.upload()
+
+    def upload(self):
+        """Sends the instance table to the GPU; update() does this once a frame when something changed."""
+        self.dirty = False
+        if self.buffer.get_x_size() != len(self.data) * TEXELS:
+            self.buffer.setup_buffer_texture(len(self.data) * TEXELS, Texture.T_float, Texture.F_rgba32,
+                                             GeomEnums.UH_dynamic)
+        self.buffer.set_ram_image(self.data.tobytes())
+        self.set_shader_input('instances', self.buffer)
+        # An instance count of 0 means "not instanced" to Panda3D, so with nothing to draw, hide instead
+        if not self.count:
+            self.model.hide()
+            return
+        self.model.show()
+        self.setInstanceCount(self.count)
+
+        # Culling only sees the one model, so give the node bounds that cover every copy
+        rows = self.data[:self.count]
+        reach = np.abs(rows[:, 1, :3]).max() * 1.75 + 1 # a unit model turned any way, plus some bob
+        low, high = rows[:, 0, :3].min(axis=0) - reach, rows[:, 0, :3].max(axis=0) + reach
+        self.node().set_bounds(BoundingBox(Point3(*low), Point3(*high)))
+        self.node().set_final(True)
@@ -0,0 +1,133 @@
+"""Chunked level meshes for worlds too big to draw as one.
+
+ChunkGrid buckets a level's platforms into fixed-size XZ chunks and builds any one
+chunk's merged mesh on demand. A box reaching over several chunks (a ground slab, a long
+bridge) is cut at the chunk edges and each chunk gets its own piece, so whatever part of
+it is near the player is drawn however far away its centre is. ChunkStreamer decides which chunks
+should be resident for a given player position: everything within `radius` chunks, the
+nearest first and a few per frame, with chunks that fall out of range kept around until
+an LRU budget runs out. Nothing here touches Ursina; the game supplies load/unload.
+
+Collision stays in the level's SpatialIndex, which is already bucketed into small cells
+and only looks at the ones a query touches, however big the level is.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from level_mesh import as_box_array, optimized_mesh_arrays
+
+STREAM_THRESHOLD = 2000 # platforms; smaller worlds are cheaper as one mesh
+
+
+class ChunkGrid:
+    def __init__(self, platforms, chunk_size=32.0):
+        self.chunk_size = chunk_size
+        self.boxes = self.pieces(as_box_array(platforms))
+        keys = self.keys(self.boxes[:, 0], self.boxes[:, 2])
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        unique, starts = np.unique(keys[order], axis=0, return_index=True)
+        self.chunks = {(int(cx), int(cz)): rows for (cx, cz), rows in zip(unique, np.split(order, starts[1:]))}
+
+    def pieces(self, boxes):
+        """Cuts every box at the chunk edges its XZ footprint crosses, as (x, y, z, sx, sy, sz) pieces.
+
+        Each piece lies inside one chunk, so bucketing by centre puts it in the right one.
+        Boxes inside a single chunk come back as they are.
+        """
+        size = self.chunk_size
+        lo = boxes[:, [0, 2]] - boxes[:, [3, 5]] / 2
+        hi = boxes[:, [0, 2]] + boxes[:, [3, 5]] / 2
+        first = np.floor(lo / size).astype(np.int64)
+        # A box ending right on a chunk edge doesn't reach into the next chunk
+        last = np.maximum(np.ceil(hi / size).astype(np.int64) - 1, first)
+        span = last - first + 1
+        count = span[:, 0] * span[:, 1]
+        if (count == 1).all():
+            return boxes
+        box = np.repeat(np.arange(len(boxes)), count)
+        k = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+        chunk = first[box] + np.column_stack([k // span[box, 1], k % span[box, 1]])
+        piece_lo = np.maximum(lo[box], chunk * size)
+        piece_hi = np.minimum(hi[box], (chunk + 1) * size)
+        pieces = boxes[box].copy()
+        pieces[:, [0, 2]] = (piece_lo + piece_hi) / 2
+        pieces[:, [3, 5]] = piece_hi - piece_lo
+        return pieces
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def keys(self, x, z):
+        """Chunk coordinates for arrays of x and z, as an (N, 2) int array."""
+        return np.floor(np.column_stack([x, z]) / self.chunk_size).astype(np.int64)
+
+    def key(self, x, z):
+        return (int(x // self.chunk_size), int(z // self.chunk_size))
+
+    def chunks_near(self, x, z, radius):
+        """Existing chunks within `radius` chunks of (x, z), nearest first."""
+        cx, cz = self.key(x, z)
+        found = []
+        for dx in range(-radius, radius + 1):
+            for dz in range(-radius, radius + 1):
+                if dx * dx + dz * dz <= radius * radius and (cx + dx, cz + dz) in self.chunks:
+                    found.append((dx * dx + dz * dz, (cx + dx, cz + dz)))
+        return [key for distance, key in sorted(found)]
+
+    def platforms(self, key):
+        return self.boxes[self.chunks[key]]
+
+    def mesh_arrays(self, key):
+        """Flat (vertices, triangles, uvs) for one chunk; faces against boxes in other chunks aren't culled."""
+        return optimized_mesh_arrays(self.platforms(key))
+
+
+class ChunkStreamer:
+    def __init__(self, grid, load, unload, radius=2, budget=64, loads_per_update=2):
+        """load(key) builds and returns whatever represents a chunk; unload(key, chunk) gets rid of it."""
+        self.grid = grid
+        self.load = load
+        self.unload = unload
+        self.radius = radius
+        self.budget = budget
+        self.loads_per_update = loads_per_update
+        self.resident = OrderedDict() # key -> chunk, least recently wanted first
+        self.active = set() # the resident chunks in range, i.e. the ones to draw
+
+    def update(self, x, z):
+        """Loads missing chunks around (x, z) and evicts old ones past the budget.
+
+        Returns True if `active` changed.
+        """
+        wanted = self.grid.chunks_near(x, z, self.radius)
+        loads = 0
+        for key in wanted:
+            if key in self.resident:
+                self.resident.move_to_end(key)
+            elif loads < self.loads_per_update:
+                self.resident[key] = self.load(key)
+                loads += 1
+        # Only chunks out of range get evicted, so a budget smaller than the radius can't cause thrashing
+        keep = set(wanted)
+        for key in list(self.resident):
+            if len(self.resident) <= self.budget:
+                break
+            if key not in keep:
+                self.unload(key, self.resident.pop(key))
+        active = keep.intersection(self.resident)
+        changed = active != self.active
+        self.active = active
+        return changed
+
+    def fill(self, x, z):
+        """Loads everything in range right away, e.g. on spawning."""
+        loads_per_update, self.loads_per_update = self.loads_per_update, len(self.grid)
+        self.update(x, z)
+        self.loads_per_update = loads_per_update
+
+    def clear(self):
+        for key, chunk in self.resident.items():
+            self.unload(key, chunk)
+        self.resident.clear()
+        self.active = set()
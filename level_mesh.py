@@ -0,0 +1,311 @@
+"""Vectorized mesh building for box levels.
+
+Takes the same (x, y, z, sx, sy, sz) platform tuples as the collision index, as an
+(N, 6) array, and builds the merged level mesh's vertex, UV and index buffers with
+NumPy broadcasting instead of a Python loop over every corner of every cube. The
+buffers come back flat, which Ursina's Mesh copies straight into Panda3D.
+"""
+import numpy as np
+
+# A unit cube as six quads (-z, +z, -x, +x, +y, -y), corners counter-clockwise seen from outside
+CUBE_VERTICES = np.array([
+    (0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+    (1, 0, 1), (0, 0, 1), (0, 1, 1), (1, 1, 1),
+    (0, 0, 1), (0, 0, 0), (0, 1, 0), (0, 1, 1),
+    (1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0),
+    (0, 1, 0), (1, 1, 0), (1, 1, 1), (0, 1, 1),
+    (1, 0, 0), (0, 0, 0), (0, 0, 1), (1, 0, 1),
+], dtype=np.float32) - 0.5
+CUBE_UVS = np.tile(np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32), (6, 1))
+CUBE_TRIANGLES = (np.arange(0, 24, 4)[:, None] + (0, 1, 2, 0, 2, 3)).ravel().astype(np.uint32)
+
+
+def as_box_array(platforms):
+    """Platform tuples (or an array of them) as a float32 (N, 6) array."""
+    return np.asarray(platforms, dtype=np.float32).reshape(-1, 6)
+
+
+def box_mesh_arrays(platforms):
+    """Returns flat (vertices, triangles, uvs) buffers for a merged mesh of every box.
+
+    vertices is float32 x,y,z triples, uvs float32 u,v pairs, and triangles uint32
+    indices, three per triangle, 24 vertices and 36 indices per box.
+    """
+    boxes = as_box_array(platforms)
+    count = len(boxes)
+    vertices = boxes[:, None, :3] + CUBE_VERTICES * boxes[:, None, 3:]
+    triangles = (np.arange(count, dtype=np.uint32)[:, None] * 24 + CUBE_TRIANGLES).ravel()
+    uvs = np.broadcast_to(CUBE_UVS, (count, 24, 2))
+    return vertices.ravel(), triangles, np.ascontiguousarray(uvs).ravel()
+
+
+# Face order matches CUBE_VERTICES: which axis each face is on, and whether it's the box's min or max side
+FACE_AXIS = np.array([2, 2, 0, 0, 1, 1])
+FACE_SIDE = np.array([0, 1, 0, 1, 1, 0])
+PLANE_AXES = np.array([(1, 2), (0, 2), (0, 1)]) # the two in-plane axes for faces along x, y and z
+QUAD_TRIANGLES = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+MAX_MERGE_CELLS = 1 << 20 # past this a plane's faces are cut one by one instead of merged
+MAX_PAIR_CELLS = 64
+
+
+def face_mesh_arrays(face_min, face_max, faces):
+    """Flat (vertices, triangles, uvs) for quads given as flat boxes (min == max on the face's
+    axis) plus the cube face (0-5) each one is, so it gets that face's winding.
+
+    UVs run in world units along each quad's edges, so a texture repeats once per unit
+    however big a merged quad gets instead of stretching over it.
+    """
+    corners = CUBE_VERTICES.reshape(6, 4, 3)[faces] + 0.5
+    vertices = face_min[:, None] + corners * (face_max - face_min)[:, None]
+    count = len(faces)
+    triangles = (np.arange(count, dtype=np.uint32)[:, None] * 4 + QUAD_TRIANGLES).ravel()
+    # Corners go round each quad in CUBE_UVS order, so 0 -> 1 is its u edge and 0 -> 3 its v edge
+    size = np.column_stack([np.linalg.norm(vertices[:, 1] - vertices[:, 0], axis=1),
+                            np.linalg.norm(vertices[:, 3] - vertices[:, 0], axis=1)])
+    uvs = CUBE_UVS[:4] * size[:, None, :]
+    return vertices.astype(np.float32).ravel(), triangles, uvs.astype(np.float32).ravel()
+
+
+def touching_pairs(mins, maxs):
+    """Returns index arrays (i, j), i < j, of every pair of boxes whose closed bounds intersect.
+
+    Boxes are hashed into a 3D grid sized to a typical box and only boxes sharing a cell
+    are compared. The few boxes covering more than MAX_PAIR_CELLS cells (ground slabs)
+    are checked against everything instead.
+    """
+    count = len(mins)
+    cell = np.maximum(np.median(maxs - mins, axis=0), 1e-6)
+    lo = np.floor(mins / cell).astype(np.int64)
+    span = np.floor(maxs / cell).astype(np.int64) - lo + 1
+    cells = span.prod(axis=1)
+    big = cells > MAX_PAIR_CELLS
+    found = []
+
+    # One entry per (cell, box), sorted so boxes sharing a cell sit next to each other
+    boxes = np.flatnonzero(~big)
+    n = cells[boxes]
+    entry_box = np.repeat(boxes, n)
+    k = np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n)
+    sx, sy = span[entry_box, 0], span[entry_box, 1]
+    key = lo[entry_box] + np.column_stack([k % sx, k // sx % sy, k // (sx * sy)])
+    order = np.lexsort(key.T)
+    entry_box, key = entry_box[order], key[order]
+    new_cell = np.ones(len(key), dtype=bool)
+    new_cell[1:] = np.any(key[1:] != key[:-1], axis=1)
+    cell_end = np.append(np.flatnonzero(new_cell)[1:], len(key))[np.cumsum(new_cell) - 1]
+    # Pair each entry with the ones after it in its cell
+    n = cell_end - np.arange(len(key)) - 1
+    first = np.repeat(np.arange(len(key)), n)
+    second = first + 1 + np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n)
+    found.append((entry_box[first], entry_box[second]))
+
+    for i in np.flatnonzero(big):
+        found.append((np.full(count, i), np.arange(count)))
+
+    i = np.concatenate([pair[0] for pair in found])
+    j = np.concatenate([pair[1] for pair in found])
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    keep = (i != j) & np.all((mins[i] <= maxs[j]) & (mins[j] <= maxs[i]), axis=1)
+    pairs = np.unique(i[keep] * count + j[keep])
+    return pairs // count, pairs % count
+
+
+def _flatten(mins, maxs, faces):
+    """Squashes each box onto the plane of its face in `faces`, giving face_mesh_arrays' bounds."""
+    rows = np.arange(len(faces))
+    axis = FACE_AXIS[faces]
+    plane = np.where(FACE_SIDE[faces], maxs[rows, axis], mins[rows, axis])
+    lo = mins.copy()
+    hi = maxs.copy()
+    lo[rows, axis] = hi[rows, axis] = plane
+    return lo, hi
+
+
+def _cover(us, vs, rects):
+    """Which cells of the us x vs grid the (k, 4) u0, v0, u1, v1 rects cover."""
+    i0 = np.searchsorted(us, rects[:, 0])
+    i1 = np.searchsorted(us, rects[:, 2])
+    j0 = np.searchsorted(vs, rects[:, 1])
+    j1 = np.searchsorted(vs, rects[:, 3])
+    # 2D difference array: +1/-1 at the corners, then a running sum down and across
+    corners = np.concatenate([i0 * len(vs) + j0, i1 * len(vs) + j0, i0 * len(vs) + j1, i1 * len(vs) + j1])
+    signs = np.repeat([1, -1, -1, 1], len(rects))
+    diff = np.bincount(corners, signs, minlength=len(us) * len(vs)).reshape(len(us), len(vs))
+    return diff.cumsum(axis=0).cumsum(axis=1)[:-1, :-1] > 0.5
+
+
+def _grid_rects(grid, us, vs):
+    """Merges a boolean cell grid back into rects: runs along v, stacked across identical runs in u."""
+    padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = grid
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    by_row = {}
+    for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        by_row.setdefault(row, []).append((start, end))
+    rects = []
+    active = {} # (start, end) -> row it started on, for the runs on the last row
+    last = -2
+    for row in list(by_row) + [grid.shape[0]]:
+        adjacent = row == last + 1
+        continued = {run: active.pop(run) if adjacent and run in active else row for run in by_row.get(row, ())}
+        for (start, end), first in active.items():
+            rects.append((us[first], vs[start], us[last + 1], vs[end]))
+        active = continued
+        last = row
+    return rects
+
+
+def merge_plane(rects, occluders):
+    """Union of `rects` minus `occluders` (both (k, 4) u0, v0, u1, v1 on one plane) as merged rects.
+
+    Returns None if the plane's compressed grid would have more than MAX_MERGE_CELLS cells.
+    """
+    lo_u, lo_v = rects[:, 0].min(), rects[:, 1].min()
+    hi_u, hi_v = rects[:, 2].max(), rects[:, 3].max()
+    occluders = np.column_stack([np.maximum(occluders[:, 0], lo_u), np.maximum(occluders[:, 1], lo_v),
+                                 np.minimum(occluders[:, 2], hi_u), np.minimum(occluders[:, 3], hi_v)])
+    occluders = occluders[(occluders[:, 0] < occluders[:, 2]) & (occluders[:, 1] < occluders[:, 3])]
+    us = np.unique(np.concatenate([rects[:, 0], rects[:, 2], occluders[:, 0], occluders[:, 2]]))
+    vs = np.unique(np.concatenate([rects[:, 1], rects[:, 3], occluders[:, 1], occluders[:, 3]]))
+    if (len(us) - 1) * (len(vs) - 1) > MAX_MERGE_CELLS:
+        return None
+    grid = _cover(us, vs, rects)
+    if len(occluders):
+        grid &= ~_cover(us, vs, occluders)
+    if not grid.any():
+        return []
+    return _grid_rects(grid, us, vs)
+
+
+def optimized_mesh_arrays(platforms):
+    """Like box_mesh_arrays, minus hidden faces and with coplanar neighbours merged.
+
+    A face is hidden where another box sits against it or around it (touching, overlapping
+    or standing on the ground slab). Boxes that touch nothing keep all six faces untouched;
+    the rest are worked out one plane at a time, and whatever is still visible on a plane
+    is greedily merged into as few rectangles as possible.
+    """
+    boxes = as_box_array(platforms).astype(np.float64)
+    count = len(boxes)
+    if not count:
+        return box_mesh_arrays(boxes) # empty buffers of the right types
+    mins = boxes[:, :3] - boxes[:, 3:] / 2
+    maxs = boxes[:, :3] + boxes[:, 3:] / 2
+    pair_i, pair_j = touching_pairs(mins, maxs)
+    touched = np.zeros(count, dtype=bool)
+    touched[pair_i] = True
+    touched[pair_j] = True
+
+    # Loners go out as whole cubes
+    lone = np.repeat(np.flatnonzero(~touched), 6)
+    out_faces = [np.tile(np.arange(6), len(lone) // 6)]
+    lo, hi = _flatten(mins[lone], maxs[lone], out_faces[0])
+    out_min = [lo]
+    out_max = [hi]
+
+    # One row per face of every touched box
+    shared = np.flatnonzero(touched)
+    face_box = np.repeat(shared, 6)
+    face = np.tile(np.arange(6), len(shared))
+    axis = FACE_AXIS[face]
+    plane = np.where(FACE_SIDE[face], maxs[face_box, axis], mins[face_box, axis])
+    u_axis, v_axis = PLANE_AXES[axis, 0], PLANE_AXES[axis, 1]
+    rects = np.column_stack([mins[face_box, u_axis], mins[face_box, v_axis],
+                             maxs[face_box, u_axis], maxs[face_box, v_axis]])
+    first_row = np.full(count, -1)
+    first_row[shared] = np.arange(len(shared)) * 6
+
+    # Box b hides part of box a's face where b's volume starts right at (or straddles) that face
+    a = np.concatenate([pair_i, pair_j])
+    b = np.concatenate([pair_j, pair_i])
+    occ_rows = []
+    occ_rects = []
+    for f in range(6):
+        ax = FACE_AXIS[f]
+        u, v = PLANE_AXES[ax]
+        if FACE_SIDE[f]:
+            c = maxs[a, ax]
+            hit = (mins[b, ax] <= c) & (c < maxs[b, ax])
+        else:
+            c = mins[a, ax]
+            hit = (mins[b, ax] < c) & (c <= maxs[b, ax])
+        hit &= ((mins[b, u] < maxs[a, u]) & (maxs[b, u] > mins[a, u])
+                & (mins[b, v] < maxs[a, v]) & (maxs[b, v] > mins[a, v]))
+        ha, hb = a[hit], b[hit]
+        occ_rows.append(first_row[ha] + f)
+        occ_rects.append(np.column_stack([mins[hb, u], mins[hb, v], maxs[hb, u], maxs[hb, v]]))
+    occ_rows = np.concatenate(occ_rows)
+    occ_rects = np.concatenate(occ_rects)
+
+    # Faces on the same plane, facing the same way, get merged together
+    order = np.lexsort((plane, face))
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (face[order][1:] != face[order][:-1]) | (plane[order][1:] != plane[order][:-1])
+    group = np.empty(len(order), dtype=np.int64)
+    group[order] = np.cumsum(new_group) - 1
+    sizes = np.bincount(group)
+    blocked = np.bincount(occ_rows, minlength=len(face)) > 0
+    simple = (sizes[group] == 1) & ~blocked
+
+    lo, hi = _flatten(mins[face_box[simple]], maxs[face_box[simple]], face[simple])
+    out_faces.append(face[simple])
+    out_min.append(lo)
+    out_max.append(hi)
+
+    # The usual overlap, one face with one box cutting into it, is up to four strips
+    occ_count = np.bincount(group[occ_rows], minlength=len(sizes))
+    lone_cut = (sizes[group[occ_rows]] == 1) & (occ_count[group[occ_rows]] == 1)
+    cut_rows = occ_rows[lone_cut]
+    face_rect, occ = rects[cut_rows], occ_rects[lone_cut]
+    occ = np.clip(occ, face_rect[:, [0, 1, 0, 1]], face_rect[:, [2, 3, 2, 3]])
+    for strip in (
+        np.column_stack([face_rect[:, 0], face_rect[:, 1], occ[:, 0], face_rect[:, 3]]),
+        np.column_stack([occ[:, 2], face_rect[:, 1], face_rect[:, 2], face_rect[:, 3]]),
+        np.column_stack([occ[:, 0], face_rect[:, 1], occ[:, 2], occ[:, 1]]),
+        np.column_stack([occ[:, 0], occ[:, 3], occ[:, 2], face_rect[:, 3]]),
+    ):
+        keep = (strip[:, 0] < strip[:, 2]) & (strip[:, 1] < strip[:, 3])
+        lo, hi = _flatten(mins[face_box[cut_rows[keep]]], maxs[face_box[cut_rows[keep]]], face[cut_rows[keep]])
+        u, v = u_axis[cut_rows[keep]], v_axis[cut_rows[keep]]
+        at = np.arange(int(keep.sum()))
+        lo[at, u], lo[at, v], hi[at, u], hi[at, v] = strip[keep].T
+        out_faces.append(face[cut_rows[keep]])
+        out_min.append(lo)
+        out_max.append(hi)
+
+    # Everything else gets the full per-plane treatment
+    done = simple.copy()
+    done[cut_rows] = True
+    busy = np.flatnonzero(~done)
+    busy = busy[np.argsort(group[busy], kind='stable')]
+    occ_rows, occ_rects = occ_rows[~lone_cut], occ_rects[~lone_cut]
+    occ_order = np.argsort(group[occ_rows], kind='stable')
+    occ_rows, occ_rects = occ_rows[occ_order], occ_rects[occ_order]
+    occ_groups = group[occ_rows]
+    bounds = np.flatnonzero(np.diff(group[busy])) + 1
+    for members in np.split(busy, bounds) if len(busy) else ():
+        g = group[members[0]]
+        start, stop = np.searchsorted(occ_groups, (g, g + 1))
+        merged = merge_plane(rects[members], occ_rects[start:stop])
+        if merged is None:
+            # Too many distinct edges on this plane: cull each face on its own instead
+            merged = []
+            for row in members:
+                own = occ_rects[start:stop][occ_rows[start:stop] == row]
+                cut = merge_plane(rects[row:row + 1], own)
+                merged += cut if cut is not None else [tuple(rects[row])]
+        if not merged:
+            continue
+        merged = np.array(merged)
+        f, c, (u, v) = face[members[0]], plane[members[0]], PLANE_AXES[axis[members[0]]]
+        lo = np.empty((len(merged), 3))
+        hi = np.empty((len(merged), 3))
+        lo[:, FACE_AXIS[f]] = hi[:, FACE_AXIS[f]] = c
+        lo[:, u], lo[:, v], hi[:, u], hi[:, v] = merged.T
+        out_faces.append(np.full(len(merged), f))
+        out_min.append(lo)
+        out_max.append(hi)
+
+    return face_mesh_arrays(np.concatenate(out_min), np.concatenate(out_max), np.concatenate(out_faces))
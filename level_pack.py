@@ -0,0 +1,165 @@
+"""Precompiled binary levels.
+
+A .mlvl file is a small JSON header followed by packed arrays: the platforms, stars,
+Goombas and portals, plus the finished level mesh buffers and the collision index's
+batch tables. Loading one maps the file and hands out NumPy views into it, so there's
+nothing to parse per object and nothing to rebuild, however big the level is.
+
+    python level_pack.py            # compiles every world in worlds.py into levels/
+
+Layout: b'MLVL', uint32 version, uint32 header length, the UTF-8 JSON header, then each
+array 16-byte aligned at the offset the header gives for it.
+"""
+import json
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from collision_index import SpatialIndex
+from game_sim import GameSim
+from level_mesh import optimized_mesh_arrays
+from spawn_index import SpawnIndex
+
+MAGIC = b'MLVL'
+VERSION = 3 # 2: mesh UVs in world units, 3: single-box levels too
+ALIGN = 16
+LEVEL_DIR = 'levels'
+EXTENSION = '.mlvl'
+PREFIX = struct.Struct('<4sII')
+
+
+def source_hash(data):
+    """Fingerprint of a world definition, so a stale compiled copy can be spotted."""
+    return zlib.crc32(repr(sorted((key, repr(value)) for key, value in data.items())).encode())
+
+
+def compile_world(name, data, path, cell_size=4.0):
+    """Packs one worlds.py entry (mesh and collision index included) into a .mlvl file."""
+    platforms = np.asarray(data['platforms'], dtype=np.float32).reshape(-1, 6)
+    vertices, triangles, uvs = optimized_mesh_arrays(platforms)
+    index = SpatialIndex(platforms.tolist(), cell_size)
+    boxes, rows, grid, origin, large = index._build_batch_table()
+    # Same spawn GameSim would work out, done here so loading doesn't have to
+    spawns = SpawnIndex(index, data.get('spawn'), data.get('checkpoints', ()), GameSim.world_kill_height(data))
+    portals = data.get('portals', [])
+    arrays = {
+        'platforms': platforms,
+        'stars': np.asarray(data['stars'], dtype=np.float32).reshape(-1, 3),
+        'goombas': np.asarray(data['goombas'], dtype=np.float32).reshape(-1, 3),
+        'portals': np.asarray([(*position, stars) for position, world, stars in portals], dtype=np.float32).reshape(-1, 4),
+        'mesh_vertices': vertices,
+        'mesh_triangles': triangles,
+        'mesh_uvs': uvs,
+        'index_rows': rows.astype(np.int32),
+        'index_grid': grid.astype(np.int32),
+        'index_origin': origin.astype(np.int32),
+        'index_large': large.astype(np.int32),
+    }
+    header = {
+        'name': name,
+        'source_hash': source_hash(data),
+        'spawn': spawns.spawn,
+        'checkpoints': spawns.checkpoints,
+        'speed': data.get('speed'),
+        'lava_y': data.get('lava_y'),
+        'cell_size': cell_size,
+        'portal_worlds': [world for position, world, stars in portals],
+        'arrays': {},
+    }
+    # Offsets depend on the header's own length, so size it with placeholder offsets first
+    for key, array in arrays.items():
+        header['arrays'][key] = {'dtype': array.dtype.str, 'shape': array.shape, 'offset': 0}
+    start = PREFIX.size + len(json.dumps(header).encode()) + 16 * len(arrays)
+    offset = -(-start // ALIGN) * ALIGN
+    for key, array in arrays.items():
+        header['arrays'][key]['offset'] = offset
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    encoded = json.dumps(header).encode()
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        for key, array in arrays.items():
+            f.write(b'\0' * (header['arrays'][key]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+class PackedLevel:
+    """A memory-mapped .mlvl file; every array attribute is a read-only view into the map."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, size = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path}: not a version {VERSION} level file')
+            self.header = json.loads(f.read(size))
+        self.map = np.memmap(path, dtype=np.uint8, mode='r')
+        for key, spec in self.header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            view = np.frombuffer(self.map, dtype, count, spec['offset']).reshape(spec['shape'])
+            setattr(self, key, view)
+        self.name = self.header['name']
+
+    def spatial_index(self):
+        return SpatialIndex.from_tables(self.platforms, self.index_rows, self.index_grid, self.index_origin,
+                                        self.index_large, self.header['cell_size'])
+
+    def world_data(self):
+        """The level as a worlds.py-style entry, plus its prebuilt 'index' and 'mesh'."""
+        header = self.header
+        data = {
+            'platforms': self.platforms,
+            'stars': self.stars,
+            'goombas': self.goombas,
+            'spawn': tuple(header['spawn']),
+            'checkpoints': [tuple(point) for point in header.get('checkpoints', ())],
+            'portals': [(tuple(row[:3]), world, int(row[3])) for row, world in zip(self.portals.tolist(), header['portal_worlds'])],
+            'index': self.spatial_index(),
+            'mesh': (self.mesh_vertices, self.mesh_triangles, self.mesh_uvs),
+            'source_hash': header['source_hash'],
+        }
+        for key in ('speed', 'lava_y'):
+            if header[key] is not None:
+                data[key] = header[key]
+        return data
+
+
+def packed_worlds(folder=LEVEL_DIR, sources=None):
+    """Loads every .mlvl in folder as {name: world data}.
+
+    With `sources` (a worlds.py-style dict), packs compiled from an older version of
+    a world are skipped, so editing worlds.py without recompiling can't load stale data.
+    Packs with no source at all (downloaded levels) are always loaded, unless they're in
+    an older file format.
+    """
+    worlds = {}
+    if not os.path.isdir(folder):
+        return worlds
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(EXTENSION):
+            continue
+        try:
+            data = PackedLevel(os.path.join(folder, filename)).world_data()
+        except ValueError: # Packed by another version of this file; recompile it to use it
+            continue
+        name = filename[:-len(EXTENSION)]
+        if sources is not None and name in sources and source_hash(sources[name]) != data['source_hash']:
+            continue
+        worlds[name] = data
+    return worlds
+
+
+if __name__ == '__main__':
+    from worlds import WORLDS
+    folder = sys.argv[1] if len(sys.argv) > 1 else LEVEL_DIR
+    for name, data in WORLDS.items():
+        path = os.path.join(folder, name + EXTENSION)
+        compile_world(name, data, path)
+        print(f'{path}: {len(data["platforms"])} platforms, {os.path.getsize(path)} bytes')
@@ -0,0 +1,162 @@
+"""Render-free movement core for MarioController.
+
+Everything in here works on plain floats and collides against a collision_index.SpatialIndex
+built from the same (x, y, z, sx, sy, sz) platform tuples create_level_from_data takes,
+so the movement logic can be stepped without a window or a scene graph. The Ursina
+entity just mirrors a MarioBody's position every frame.
+"""
+import math
+
+from collision_index import SpatialIndex
+
+
+class MarioBody:
+    """Player state plus the movement rules from MarioController, minus the Entity.
+
+    position is the bottom-centre of the player's box, velocity is in units/second.
+    """
+    # Constants for fine-tuning your moves
+    SPEED = 7
+    RUN_ACCEL = 10
+    RUN_DECEL = 8
+    JUMP_FORCE = 10
+    GRAVITY = 30
+    AIR_CONTROL = 0.8
+    TRIPLE_JUMP_MULTS = (1.0, 1.2, 1.5) # Normal, Double, Triple
+    LONG_JUMP_MIN_SPEED = 4
+    LONG_JUMP_FORWARD_BOOST = 10
+    LONG_JUMP_VERTICAL_BOOST = 7
+    WALL_JUMP_FORCE = 9
+    WALL_JUMP_KICKOFF = 6
+    MAX_JUMP_CHAIN_TIME = 0.4 # A tighter window for more skilled moves
+    WALL_SLIDE_SPEED = 3
+
+    # Player box size, matching the old boxcasts
+    WIDTH = 0.8
+    HEIGHT = 1.8
+    MAX_CONTACTS = 4 # slide iterations per step; three axes plus one to spare
+
+    def __init__(self, level=None, position=(0, 5, 0)):
+        self.level = level if level is not None else SpatialIndex()
+        self.position = [float(c) for c in position]
+        self.previous_position = tuple(self.position) # Where the last step started, for render interpolation
+        self.velocity = [0.0, 0.0, 0.0]
+        self.grounded = False
+        self.jump_count = 0
+        self.jump_timer = 0.0
+        self.can_wall_jump = False
+        self.wall_normal = None
+
+    @property
+    def half_extents(self):
+        return (self.WIDTH / 2, self.HEIGHT / 2, self.WIDTH / 2)
+
+    def teleport(self, position):
+        """Puts the player somewhere new and stops it dead, like a respawn."""
+        self.position = [float(c) for c in position]
+        self.previous_position = tuple(self.position)
+        self.velocity = [0.0, 0.0, 0.0]
+        self.grounded = False
+        self.can_wall_jump = False
+        self.wall_normal = None
+
+    def step(self, move_x, move_z, dt, jump=False, long_jump=False):
+        """Runs one frame: an optional jump press, then input and physics."""
+        kind = self.jump(long_jump) if jump else None
+        self.handle_input(move_x, move_z, dt)
+        self.update_physics(dt)
+        return kind
+
+    def handle_input(self, move_x, move_z, dt):
+        """Steers horizontal velocity towards a world-space move direction (already camera aligned)."""
+        v = self.velocity
+        if not self.grounded:
+            t = dt * self.AIR_CONTROL
+            v[0] += (move_x * self.SPEED - v[0]) * t
+            v[2] += (move_z * self.SPEED - v[2]) * t
+        else:
+            target_x = move_x * self.SPEED
+            target_z = move_z * self.SPEED
+            t = dt * (self.RUN_ACCEL if target_x or target_z else self.RUN_DECEL)
+            v[0] += (target_x - v[0]) * t
+            v[2] += (target_z - v[2]) * t
+
+            # Reset jump chain if the window expires
+            if self.jump_timer > self.MAX_JUMP_CHAIN_TIME:
+                self.jump_count = 0
+
+        self.jump_timer += dt
+
+    def jump(self, long_jump=False):
+        """Tries to jump. Returns 'wall', 'long', 'single', 'double' or 'triple', or None if we can't."""
+        v = self.velocity
+        # Wall Jump
+        if self.can_wall_jump:
+            v[1] = self.WALL_JUMP_FORCE
+            # Kick away from the wall
+            for i in range(3):
+                v[i] += self.wall_normal[i] * self.WALL_JUMP_KICKOFF
+            self.jump_count = 1 # A wall jump counts as the first jump
+            self.can_wall_jump = False
+            return 'wall'
+
+        if not self.grounded:
+            return None
+
+        self.grounded = False
+        self.jump_timer = 0
+        running_speed = math.hypot(v[0], v[2])
+
+        # Long Jump
+        if running_speed > self.LONG_JUMP_MIN_SPEED and long_jump:
+            v[1] = self.LONG_JUMP_VERTICAL_BOOST
+            length = math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+            for i in range(3):
+                v[i] += v[i] / length * self.LONG_JUMP_FORWARD_BOOST
+            self.jump_count = 0 # Long jump resets the chain
+            return 'long'
+
+        # Triple Jump Chain
+        self.jump_count = min(self.jump_count + 1, 3)
+        v[1] = self.JUMP_FORCE * self.TRIPLE_JUMP_MULTS[self.jump_count - 1]
+        return ('single', 'double', 'triple')[self.jump_count - 1]
+
+    def update_physics(self, dt):
+        """Applies gravity, moves against the level and refreshes ground and wall contact.
+
+        One swept slide does all of it: the floor we're standing on is a contact every
+        step (gravity always pulls us into it), and so is a wall we're pushing against,
+        so there are no separate ground or wall probes.
+        """
+        p = self.position
+        v = self.velocity
+        half = self.half_extents
+        self.previous_position = tuple(p)
+
+        # Apply gravity
+        v[1] -= self.GRAVITY * dt
+
+        # Move, sliding along everything we hit however far this step goes
+        movement = (v[0] * dt, v[1] * dt, v[2] * dt)
+        center, contacts = self.level.slide((p[0], p[1] + half[1], p[2]), half, movement, self.MAX_CONTACTS)
+        p[0], p[1], p[2] = center[0], center[1] - half[1], center[2]
+
+        self.grounded = False
+        self.can_wall_jump = False
+        for normal in contacts:
+            # Stop moving into whatever we hit
+            dot = v[0] * normal[0] + v[1] * normal[1] + v[2] * normal[2]
+            if dot < 0:
+                for i in range(3):
+                    v[i] -= normal[i] * dot
+            if normal[1] > 0: # Landed on top of something, not the side
+                self.grounded = True
+            elif normal[1] == 0:
+                self.wall_normal = normal
+
+        # Wall jumps and wall slides are for the air
+        if not self.grounded and any(normal[1] == 0 for normal in contacts):
+            self.can_wall_jump = True
+            # Slide down walls slowly
+            if v[1] < 0:
+                v[1] = max(v[1], -self.WALL_SLIDE_SPEED)
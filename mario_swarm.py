@@ -0,0 +1,264 @@
+"""Lots of players at once, for fuzzing levels and tuning movement.
+
+MarioSwarm holds N independent MarioBody states as arrays, one row per player, and
+steps all of them through the same level together: the same input, jump and physics
+rules as MarioBody, and the same sliding sweep against the level (collision_index
+slide_many), just for every row at once. Nobody sees anybody else. A policy picks
+everyone's input each tick; it's any callable (swarm, tick, rng) -> (move, jump,
+long_jump), where move is an (N, 2) array of world-space (x, z) directions like
+move_vector gives and the jumps are (N,) bool arrays.
+
+simulate() runs one swarm through a world, respawning players who fall out, and
+run_sharded() splits a very big swarm across processes:
+
+    python mario_swarm.py grass --agents 100000 --seconds 30 --workers 8
+"""
+import argparse
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from game_sim import GameSim
+from mario_physics import MarioBody
+
+JUMP_KINDS = (None, 'wall', 'long', 'single', 'double', 'triple') # what step() returns, by index
+WALL_JUMP, LONG_JUMP, SINGLE_JUMP = 1, 2, 3
+# MarioBody's tuning constants; MarioSwarm takes any of them as one value or one per player
+CONSTANTS = ('SPEED', 'RUN_ACCEL', 'RUN_DECEL', 'JUMP_FORCE', 'GRAVITY', 'AIR_CONTROL', 'LONG_JUMP_MIN_SPEED',
+             'LONG_JUMP_FORWARD_BOOST', 'LONG_JUMP_VERTICAL_BOOST', 'WALL_JUMP_FORCE', 'WALL_JUMP_KICKOFF',
+             'MAX_JUMP_CHAIN_TIME', 'WALL_SLIDE_SPEED')
+
+SwarmResult = namedtuple('SwarmResult', 'world agents ticks seconds positions falls jumps grounded')
+
+
+def _at(value, rows):
+    """A constant for the given rows, whether it's shared or per player."""
+    return value[rows] if np.ndim(value) else value
+
+
+def _column(value):
+    return value[:, None] if np.ndim(value) else value
+
+
+class MarioSwarm:
+    TRIPLE_JUMP_MULTS = MarioBody.TRIPLE_JUMP_MULTS
+    MAX_CONTACTS = MarioBody.MAX_CONTACTS
+    HALF_EXTENTS = (MarioBody.WIDTH / 2, MarioBody.HEIGHT / 2, MarioBody.WIDTH / 2)
+
+    def __init__(self, level, positions, **constants):
+        """level is a SpatialIndex, positions an (N, 3) array of feet positions. Keyword arguments
+        override MarioBody's constants, e.g. SPEED=np.linspace(5, 9, n) to try a range of speeds."""
+        self.level = level
+        for name in CONSTANTS:
+            value = constants.pop(name, getattr(MarioBody, name))
+            setattr(self, name, np.asarray(value, dtype=float) if np.ndim(value) else value)
+        if constants:
+            raise TypeError(f'unknown movement constants: {", ".join(constants)}')
+        self.position = np.array(positions, dtype=float).reshape(-1, 3)
+        count = len(self.position)
+        self.previous_position = self.position.copy()
+        self.velocity = np.zeros((count, 3))
+        self.grounded = np.zeros(count, dtype=bool)
+        self.jump_count = np.zeros(count, dtype=np.int64)
+        self.jump_timer = np.zeros(count)
+        self.can_wall_jump = np.zeros(count, dtype=bool)
+        self.wall_normal = np.zeros((count, 3)) # all zero until a player first touches a wall
+
+    def __len__(self):
+        return len(self.position)
+
+    def teleport(self, rows, position):
+        """Puts some players (a mask or indices) somewhere new and stops them dead, like a respawn."""
+        self.position[rows] = position
+        self.previous_position[rows] = position
+        self.velocity[rows] = 0.0
+        self.grounded[rows] = False
+        self.can_wall_jump[rows] = False
+        self.wall_normal[rows] = 0.0
+
+    def step(self, move, dt, jump=None, long_jump=None):
+        """One tick for everyone, like MarioBody.step. Returns each player's jump as an index into JUMP_KINDS."""
+        kinds = self.jump(jump, long_jump) if jump is not None else np.zeros(len(self), dtype=np.int8)
+        move = np.asarray(move, dtype=float).reshape(-1, 2)
+        self.handle_input(move[:, 0], move[:, 1], dt)
+        self.update_physics(dt)
+        return kinds
+
+    def handle_input(self, move_x, move_z, dt):
+        v = self.velocity
+        steering = (move_x != 0) | (move_z != 0)
+        t = np.where(self.grounded, np.where(steering, dt * self.RUN_ACCEL, dt * self.RUN_DECEL),
+                     dt * self.AIR_CONTROL)
+        v[:, 0] += (move_x * self.SPEED - v[:, 0]) * t
+        v[:, 2] += (move_z * self.SPEED - v[:, 2]) * t
+
+        # Reset jump chains whose window expired
+        self.jump_count[self.grounded & (self.jump_timer > self.MAX_JUMP_CHAIN_TIME)] = 0
+        self.jump_timer += dt
+
+    def jump(self, jump, long_jump=None):
+        """Jumps for every player pressing jump who can, by MarioBody.jump's rules."""
+        jump = np.asarray(jump, dtype=bool)
+        long_jump = np.zeros(len(self), dtype=bool) if long_jump is None else np.asarray(long_jump, dtype=bool)
+        kinds = np.zeros(len(self), dtype=np.int8)
+        v = self.velocity
+
+        wall = jump & self.can_wall_jump
+        v[wall, 1] = _at(self.WALL_JUMP_FORCE, wall)
+        v[wall] += self.wall_normal[wall] * _column(_at(self.WALL_JUMP_KICKOFF, wall))
+        self.jump_count[wall] = 1
+        self.can_wall_jump[wall] = False
+        kinds[wall] = WALL_JUMP
+
+        ground = jump & ~wall & self.grounded
+        self.grounded[ground] = False
+        self.jump_timer[ground] = 0
+        running = np.hypot(v[:, 0], v[:, 2]) > self.LONG_JUMP_MIN_SPEED
+        long = ground & long_jump & running
+        if long.any():
+            v[long, 1] = _at(self.LONG_JUMP_VERTICAL_BOOST, long)
+            length = np.sqrt(v[long, 0] * v[long, 0] + v[long, 1] * v[long, 1] + v[long, 2] * v[long, 2])
+            v[long] += v[long] / length[:, None] * _column(_at(self.LONG_JUMP_FORWARD_BOOST, long))
+            self.jump_count[long] = 0
+            kinds[long] = LONG_JUMP
+
+        chain = ground & ~long
+        count = self.jump_count[chain] = np.minimum(self.jump_count[chain] + 1, 3)
+        v[chain, 1] = _at(self.JUMP_FORCE, chain) * np.asarray(self.TRIPLE_JUMP_MULTS)[count - 1]
+        kinds[chain] = SINGLE_JUMP - 1 + count
+        return kinds
+
+    def update_physics(self, dt):
+        """Gravity, then everyone's slide against the level, then ground and wall contact from what they hit."""
+        p = self.position
+        v = self.velocity
+        half = self.HALF_EXTENTS
+        self.previous_position = p.copy()
+
+        v[:, 1] -= self.GRAVITY * dt
+        centers = p.copy()
+        centers[:, 1] += half[1]
+        centers, contacts = self.level.slide_many(centers, half, v * dt, self.MAX_CONTACTS)
+        p[:, 0], p[:, 1], p[:, 2] = centers[:, 0], centers[:, 1] - half[1], centers[:, 2]
+
+        self.grounded[:] = False
+        on_wall = np.zeros(len(self), dtype=bool)
+        for normals in contacts: # in the order they were hit, as MarioBody goes through them
+            dot = v[:, 0] * normals[:, 0] + v[:, 1] * normals[:, 1] + v[:, 2] * normals[:, 2]
+            into = dot < 0
+            v[into] -= normals[into] * dot[into, None]
+            self.grounded |= normals[:, 1] > 0
+            wall = (normals[:, 1] == 0) & normals.any(axis=1)
+            self.wall_normal[wall] = normals[wall]
+            on_wall |= wall
+
+        # Wall jumps and wall slides are for the air
+        self.can_wall_jump = on_wall & ~self.grounded
+        sliding = self.can_wall_jump & (v[:, 1] < 0)
+        v[sliding, 1] = np.maximum(v[sliding, 1], -_at(self.WALL_SLIDE_SPEED, sliding))
+
+
+class Wander:
+    """Default policy: everyone runs a random way, turning now and then, and jumps at random."""
+    def __init__(self, turn_chance=0.01, jump_chance=0.02, long_jump_chance=0.3):
+        self.turn_chance = turn_chance
+        self.jump_chance = jump_chance
+        self.long_jump_chance = long_jump_chance
+        self.heading = None
+
+    def __call__(self, swarm, tick, rng):
+        count = len(swarm)
+        if self.heading is None or len(self.heading) != count:
+            self.heading = rng.uniform(0, 2 * math.pi, count)
+        turning = rng.random(count) < self.turn_chance
+        self.heading[turning] = rng.uniform(0, 2 * math.pi, turning.sum())
+        jump = rng.random(count) < self.jump_chance
+        return (np.column_stack([np.cos(self.heading), np.sin(self.heading)]), jump,
+                jump & (rng.random(count) < self.long_jump_chance))
+
+
+def simulate(world, agents, ticks, policy=None, seed=0, dt=1 / 120, constants=None):
+    """Runs `agents` players from a world's spawn point for `ticks` ticks and returns a SwarmResult.
+
+    world is a name from worlds.py or a world dict in the same format (say, a generated
+    layout to fuzz). Players below the world's kill height go back to the spawn, as in GameSim,
+    and the world's own 'speed' applies unless constants says otherwise.
+    """
+    sim = GameSim(seed=seed)
+    if isinstance(world, str):
+        sim.load_world(world)
+    else:
+        world = {'stars': [], 'goombas': [], **world}
+        sim.load_world('fuzz', world)
+    spawn = sim.spawn_point()
+    swarm = MarioSwarm(sim.level, np.tile(spawn, (agents, 1)), **{'SPEED': sim.body.SPEED, **(constants or {})})
+    policy = policy or Wander()
+    rng = np.random.default_rng(seed)
+    falls = np.zeros(agents, dtype=np.int64)
+    jumps = np.zeros(agents, dtype=np.int64)
+    grounded = np.zeros(agents, dtype=np.int64)
+
+    start = time.perf_counter()
+    for tick in range(ticks):
+        move, jump, long_jump = policy(swarm, tick, rng)
+        jumps += swarm.step(move, dt, jump, long_jump) > 0
+        grounded += swarm.grounded
+        fallen = swarm.position[:, 1] < sim.kill_height
+        if fallen.any():
+            swarm.teleport(fallen, spawn)
+            falls += fallen
+    return SwarmResult(sim.world, agents, ticks, time.perf_counter() - start, swarm.position, falls, jumps,
+                       grounded / max(ticks, 1))
+
+
+def _simulate_shard(args):
+    return simulate(*args)
+
+
+def run_sharded(world, agents, ticks, workers=None, policy=None, seed=0, dt=1 / 120, constants=None):
+    """simulate() split across processes, one shard of players each; results come back in one SwarmResult.
+
+    Every shard gets its own random stream from `seed`, so a run repeats exactly for the
+    same seed and worker count. Per-player constants are split along with the players.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = [len(rows) for rows in np.array_split(np.arange(agents), workers) if len(rows)]
+    seeds = np.random.SeedSequence(seed).generate_state(len(shards))
+    jobs = []
+    start = 0
+    for size, shard_seed in zip(shards, seeds):
+        shard_constants = {name: value[start:start + size] if np.ndim(value) else value
+                           for name, value in (constants or {}).items()}
+        jobs.append((world, size, ticks, policy, int(shard_seed), dt, shard_constants))
+        start += size
+
+    began = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        results = list(executor.map(_simulate_shard, jobs))
+    return SwarmResult(results[0].world, agents, ticks, time.perf_counter() - began,
+                       np.concatenate([r.positions for r in results]), np.concatenate([r.falls for r in results]),
+                       np.concatenate([r.jumps for r in results]), np.concatenate([r.grounded for r in results]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs a swarm of random players through a world.')
+    parser.add_argument('world')
+    parser.add_argument('--agents', type=int, default=10000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1, help='processes to split the players across')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ticks = round(args.seconds * 120)
+    if args.workers > 1:
+        result = run_sharded(args.world, args.agents, ticks, args.workers, seed=args.seed)
+    else:
+        result = simulate(args.world, args.agents, ticks, seed=args.seed)
+    print(f'{result.agents} players x {result.ticks} ticks on {result.world} in {result.seconds:.2f}s '
+          f'({result.agents * result.ticks / result.seconds:,.0f} player ticks/s)')
+    print(f'fell at least once: {np.mean(result.falls > 0):.1%}, falls per player: {result.falls.mean():.2f}, '
+          f'jumps per player: {result.jumps.mean():.1f}, time on the ground: {result.grounded.mean():.1%}')
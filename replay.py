@@ -0,0 +1,123 @@
+"""Input recording and high-speed headless replay.
+
+InputRecorder sits between Ursina and the simulation: every fixed tick it hands out
+the held keys, the key presses and the mouse movement since the last tick, and while
+recording it also logs them. replay() feeds such a log back through a GameSim with
+no window, as fast as the CPU allows, and reports where the run ended up.
+
+    python replay.py recordings/*.json
+"""
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+from game_sim import GameSim, move_vector
+
+RECORDED_KEYS = ('w', 'a', 's', 'd', 'shift', 'e')
+MOUSE_SENSITIVITY = 40 # Degrees of camera yaw per unit of mouse velocity
+FORMAT_VERSION = 1
+
+InputFrame = namedtuple('InputFrame', 'held events mouse')
+Recording = namedtuple('Recording', 'rate seed yaw frames')
+ReplayResult = namedtuple('ReplayResult', 'path world position stars ticks seconds tick_ms_mean tick_ms_max')
+
+
+class InputRecorder:
+    def __init__(self, rate=120, seed=0):
+        self.rate = rate
+        self.seed = seed
+        self.recording = False
+        self.start_yaw = 0.0
+        self.frames = []
+        self.pending_events = []
+        self.mouse = [0.0, 0.0]
+
+    def add_mouse(self, dx, dy):
+        """Accumulates a frame's mouse velocity until the next tick picks it up."""
+        self.mouse[0] += dx
+        self.mouse[1] += dy
+
+    def event(self, name):
+        """Queues a key press (or a 'world:<name>' load) for the next tick."""
+        self.pending_events.append(name)
+
+    def tick(self, held):
+        """Returns this tick's InputFrame and logs it if we're recording."""
+        frame = InputFrame(tuple(sorted(held)), tuple(self.pending_events), tuple(self.mouse))
+        self.pending_events.clear()
+        self.mouse = [0.0, 0.0]
+        if self.recording:
+            self.frames.append(frame)
+        return frame
+
+    def start(self, yaw=0.0):
+        """Starts a fresh log; yaw is the camera yaw at this point, so replays face the same way."""
+        self.start_yaw = yaw
+        self.frames = []
+        self.recording = True
+
+    def stop(self):
+        self.recording = False
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'rate': self.rate,
+                'seed': self.seed,
+                'yaw': self.start_yaw,
+                'frames': [[list(frame.held), list(frame.events), *frame.mouse] for frame in self.frames],
+            }, f)
+
+
+def load_recording(path):
+    """Reads a file saved by InputRecorder.save into a Recording."""
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != FORMAT_VERSION:
+        raise ValueError(f'{path}: unsupported recording version {data.get("version")}')
+    frames = [InputFrame(tuple(held), tuple(events), (mx, my)) for held, events, mx, my in data['frames']]
+    return Recording(data['rate'], data['seed'], data['yaw'], frames)
+
+
+def play_frame(sim, frame, yaw, dt):
+    """Applies one recorded tick to a GameSim the way MarioController.tick does. Returns the new yaw."""
+    for event in frame.events:
+        if event.startswith('world:'):
+            sim.load_world(event[len('world:'):])
+    yaw += frame.mouse[0] * MOUSE_SENSITIVITY
+    move_x, move_z = move_vector(frame.held, yaw)
+    sim.tick(dt, move_x, move_z, jump='space' in frame.events, long_jump='shift' in frame.held)
+    return yaw
+
+
+def replay(path, sim=None):
+    """Runs a recording headless and returns a ReplayResult with per-tick timings."""
+    rate, seed, yaw, frames = load_recording(path)
+    sim = sim or GameSim(seed=seed)
+    dt = 1 / rate
+    timings = []
+    clock = time.perf_counter
+    start = clock()
+    for frame in frames:
+        tick_start = clock()
+        yaw = play_frame(sim, frame, yaw, dt)
+        timings.append(clock() - tick_start)
+    seconds = clock() - start
+    return ReplayResult(
+        path, sim.world, tuple(sim.body.position), sim.stars_collected, len(frames), seconds,
+        sum(timings) / len(timings) * 1000 if timings else 0.0,
+        max(timings) * 1000 if timings else 0.0,
+    )
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit(__doc__.strip())
+    for path in sys.argv[1:]:
+        print(json.dumps(replay(path)._asdict()))
@@ -0,0 +1,119 @@
+"""Where to put the player.
+
+SpawnIndex is built once per world, next to its collision index. It works out the
+spawn point up front: the world's own 'spawn' if it has one, otherwise safe ground at
+the origin. Respawning is then just a lookup, as is going back to the last checkpoint
+touched. ground_near finds the nearest safe top surface to any XZ. It grows a square
+through the collision grid until the best surface found is closer than the square's
+edge, so it only looks at the cells around the answer, however big the level is.
+
+Safe means a top the player fits on (both sides at least the player's width), above
+the world's kill height, with headroom for the player standing on it.
+"""
+import math
+
+import numpy as np
+
+from mario_physics import MarioBody
+
+CHECKPOINT_RADIUS = 1.5
+STAND_MARGIN = 0.05 # feet go this far above a surface, so the first ground probe lands them
+
+
+def level_boxes(level):
+    """A SpatialIndex's boxes as an (N, 6) array of (min_x, min_y, min_z, max_x, max_y, max_z)."""
+    boxes = getattr(level.boxes, 'array', level.boxes) # packed levels already have the array
+    return np.asarray(boxes, dtype=float).reshape(-1, 6)
+
+
+class SpawnIndex:
+    def __init__(self, level, spawn=None, checkpoints=(), kill_height=-math.inf, cell_size=None):
+        """level is the world's SpatialIndex; checkpoints are (x, y, z) points touched to set a respawn."""
+        self.level = level
+        self.kill_height = kill_height
+        self.cell_size = cell_size or level.cell_size
+        self.checkpoints = [tuple(float(c) for c in point) for point in checkpoints]
+        self.checkpoint_cells = {}
+        for i, (x, y, z) in enumerate(self.checkpoints):
+            self.checkpoint_cells.setdefault(self._checkpoint_cell(x, z), []).append(i)
+        self._bounds = None
+        if spawn is not None:
+            self.spawn = tuple(float(c) for c in spawn)
+        else:
+            self.spawn = self.ground_near(0, 0) or (0, 5, -10) # Fallback
+
+    def _checkpoint_cell(self, x, z):
+        return math.floor(x / CHECKPOINT_RADIUS), math.floor(z / CHECKPOINT_RADIUS)
+
+    def bounds(self):
+        """XZ extent of the level as (min_x, min_z, max_x, max_z), worked out on first use."""
+        if self._bounds is None:
+            boxes = level_boxes(self.level)
+            if len(boxes):
+                self._bounds = (boxes[:, 0].min(), boxes[:, 2].min(), boxes[:, 3].max(), boxes[:, 5].max())
+            else:
+                self._bounds = (0.0, 0.0, 0.0, 0.0)
+        return self._bounds
+
+    def is_safe(self, box, x, z):
+        """Whether the player can stand on `box` with their feet centred at (x, z)."""
+        min_x, min_y, min_z, max_x, top, max_z = box
+        if top <= self.kill_height or max_x - min_x < MarioBody.WIDTH or max_z - min_z < MarioBody.WIDTH:
+            return False
+        half = MarioBody.WIDTH / 2
+        return not self.level.query_aabb((x - half, top + STAND_MARGIN, z - half),
+                                         (x + half, top + MarioBody.HEIGHT, z + half))
+
+    def _stand_point(self, box, x, z):
+        """The point on a box's top nearest (x, z), pulled in so the whole player fits."""
+        half = MarioBody.WIDTH / 2
+        return (min(max(x, box[0] + half), box[3] - half), min(max(z, box[2] + half), box[5] - half))
+
+    def ground_near(self, x, z):
+        """The nearest safe spot to stand at from (x, z), as an (x, y, z) position, or None.
+
+        Surfaces right under (x, z) count as distance 0, and of those the highest wins,
+        as if the player dropped in from above.
+        """
+        reach = self.cell_size
+        limit = None
+        seen = set()
+        best = None # (distance, -top, position)
+        while True:
+            for box in self.level.candidates(x - reach, z - reach, x + reach, z + reach):
+                if box in seen:
+                    continue
+                seen.add(box)
+                stand_x, stand_z = self._stand_point(box, x, z)
+                distance = math.hypot(stand_x - x, stand_z - z)
+                if best is not None and (distance, -box[4]) >= best[:2]:
+                    continue
+                if self.is_safe(box, stand_x, stand_z):
+                    best = (distance, -box[4], (stand_x, box[4] + STAND_MARGIN, stand_z))
+            # Anything outside the square is further than `reach`, so a closer find is final
+            if best is not None and best[0] <= reach:
+                return best[2]
+            if limit is None and reach >= self.cell_size * 16:
+                # The furthest any box in the level can be from (x, z); no point searching past it.
+                # Only worked out once the search has got this wide, as it means going over every box.
+                min_x, min_z, max_x, max_z = self.bounds()
+                limit = math.hypot(max(abs(x - min_x), abs(x - max_x)), max(abs(z - min_z), abs(z - max_z)))
+            if limit is not None and reach > limit:
+                return best[2] if best is not None else None
+            reach *= 2
+
+    def checkpoint_at(self, x, y, z):
+        """Index of a checkpoint within reach of the player at (x, y, z), or None."""
+        if not self.checkpoint_cells:
+            return None
+        cx, cz = self._checkpoint_cell(x, z)
+        for dx in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                for i in self.checkpoint_cells.get((cx + dx, cz + dz), ()):
+                    px, py, pz = self.checkpoints[i]
+                    if (px - x) ** 2 + (pz - z) ** 2 < CHECKPOINT_RADIUS ** 2 and abs(py - y) < MarioBody.HEIGHT:
+                        return i
+        return None
+
+    def respawn_point(self, checkpoint=None):
+        return self.checkpoints[checkpoint] if checkpoint is not None else self.spawn
@@ -0,0 +1,31 @@
+"""Static batching for scenes built out of many fixed Entities.
+
+A scene like the castle hub is dozens of plain Entities that never move, each its own
+node and its own draw call. flatten_static() copies all their models under one node and
+lets Panda3D's flattenStrong bake every transform and colour into the vertices, which
+joins every copy that shares a texture and shader into a single geom. The scene then
+draws in a handful of calls, one per material.
+"""
+from ursina import Entity, destroy
+
+
+def flatten_static(entities, **kwargs):
+    """Merges the given Entities into one static node and returns it as an Entity.
+
+    Entities with a collider are kept, hidden, so they can still be stood on and bumped
+    into; the rest are destroyed. Nothing in the batch can be moved or recoloured on its own
+    afterwards, so only pass in geometry that stays put.
+    """
+    batch = Entity(name='static_batch', **kwargs)
+    for entity in entities:
+        if entity.model is not None:
+            part = entity.model.copy_to(batch)
+            # Relative to the batch, so the entity's own scale, colour and texture come along
+            part.set_transform(entity.model.get_transform(batch))
+            part.set_state(entity.model.get_state(batch))
+        if entity.collider is not None:
+            entity.visible = False
+        else:
+            destroy(entity)
+    batch.flattenStrong()
+    return batch
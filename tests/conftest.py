@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# The modules under test sit next to the game scripts at the top of the repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app():
+    """A windowless Ursina app, for the tests that need Panda3D nodes. A process only gets one."""
+    ursina = pytest.importorskip('ursina')
+    return ursina.Ursina(window_type='none')
@@ -0,0 +1,26 @@
+import numpy as np
+
+from activity import FAR, MID, NEAR, ActivityTiers
+
+
+def test_tiers_use_xz_distance():
+    activity = ActivityTiers(near=10, mid=20)
+    positions = np.array([(5, 100, 0), (0, 0, 15), (30, 0, 0)], dtype=float)
+    assert activity.tiers(positions, (0, 0, 0)).tolist() == [NEAR, MID, FAR]
+    assert [activity.tier(x, z, (0, 0, 0)) for x, _, z in positions] == [NEAR, MID, FAR]
+
+
+def test_mid_range_is_staggered_and_catches_up():
+    activity = ActivityTiers(near=10, mid=20, mid_interval=4)
+    slots = np.arange(8)
+    positions = np.array([(0, 0, 0)] * 2 + [(15, 0, 0)] * 4 + [(50, 0, 0)] * 2, dtype=float)
+    updates = np.zeros(8, dtype=int)
+    dt_ticks = np.zeros(8, dtype=int)
+    for tick in range(1, 41):
+        due, steps = activity.schedule(slots, positions, (0, 0, 0), tick)
+        updates += due
+        dt_ticks += np.where(due, steps, 0)
+        # Never more than one of the four mid-range slots on the same tick
+        assert due[2:6].sum() == 1
+    assert updates.tolist() == [40, 40, 10, 10, 10, 10, 0, 0]
+    assert dt_ticks.tolist() == [40, 40, 40, 40, 40, 40, 0, 0]
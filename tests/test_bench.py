@@ -0,0 +1,34 @@
+import pytest
+
+import bench
+
+
+def test_measure_reports_per_call_stats():
+    calls = []
+    stats = bench.measure(lambda: calls.append(1), repeat=3, number=4)
+    assert len(calls) == stats['calls'] == 12
+    assert 0 <= stats['min_ms'] <= stats['mean_ms'] <= stats['max_ms']
+
+
+def test_synthetic_platforms_repeat_for_a_seed():
+    assert bench.synthetic_platforms(50, seed=1) == bench.synthetic_platforms(50, seed=1)
+    assert bench.synthetic_platforms(50, seed=1) != bench.synthetic_platforms(50, seed=2)
+    assert len(bench.synthetic_platforms(50)) == 50
+
+
+def test_small_benchmarks_run(capsys):
+    results = {}
+    bench.bench_collision(results, 1, (100,))
+    bench.bench_level_build(results, 1, (10,))
+    bench.bench_packed_load(results, 1, (10,))
+    assert results and all(stats['calls'] for stats in results.values())
+    bench.compare({'results': {}}, {'results': results})
+    assert next(iter(results)) in capsys.readouterr().out
+
+
+def test_ursina_benchmarks_run():
+    pytest.importorskip('ursina')
+    results = {}
+    bench.bench_ursina(results, 1, (10,))
+    assert set(results) == {'ursina/frame/hub', 'ursina/portal_update', 'ursina/update_portal', 'ursina/mesh/10'}
+    assert all(stats['calls'] for stats in results.values())
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from collectibles import CollectibleGrid, star_transform
+
+
+def test_picks_up_within_radius_and_height_only():
+    grid = CollectibleGrid(pickup_radius=1.2, pickup_height=2)
+    near = grid.add((1, 0, 0))
+    grid.add((0, 3, 0)) # too high
+    grid.add((2, 0, 0)) # too far
+    assert list(grid.collect_near(0, 0, 0)) == [near]
+    assert not len(grid.collect_near(0, 0, 0)) # each pickup only once
+
+
+def test_spherical_pickups_test_3d_distance():
+    grid = CollectibleGrid(pickup_radius=1.5, spherical=True)
+    grid.add((1, 1, 0))
+    grid.add((0, 1.6, 0))
+    assert list(grid.collect_near(0, 0, 0)) == [0]
+
+
+def test_pickups_across_a_cell_edge():
+    grid = CollectibleGrid(cell_size=4)
+    grid.add((4.1, 0, 0))
+    assert list(grid.collect_near(3.9, 0, 0)) == [0]
+
+
+def test_matches_brute_force_and_grows():
+    rng = np.random.default_rng(4)
+    grid = CollectibleGrid()
+    points = rng.uniform(-30, 30, (500, 3))
+    for point in points:
+        grid.add(point)
+    assert len(grid) == 500
+    for x, y, z in rng.uniform(-30, 30, (50, 3)):
+        offset = points - (x, y, z)
+        expected = np.flatnonzero((offset[:, 0] ** 2 + offset[:, 2] ** 2 < grid.pickup_radius ** 2)
+                                  & (np.abs(offset[:, 1]) < grid.pickup_height) & grid.active[:500])
+        assert sorted(grid.collect_near(x, y, z)) == list(expected)
+
+
+def test_clear_forgets_everything():
+    grid = CollectibleGrid()
+    grid.add((0, 0, 0))
+    grid.clear()
+    assert len(grid) == 0 and not len(grid.collect_near(0, 0, 0))
+
+
+def test_star_transform_spins_and_bobs():
+    assert star_transform(0) == (0, 0)
+    rotation, offset = star_transform(10, rotation_speed=50, float_amplitude=0.3)
+    assert rotation == pytest.approx(500 % 360)
+    assert abs(offset) <= 0.3
@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pytest
+
+from collision_index import SpatialIndex, platform_boxes, slide_aabb, sweep_aabb
+
+
+def test_platform_boxes_are_centred_on_the_platform():
+    assert platform_boxes([(0, 0, 0, 2, 4, 6)]) == [(-1, -2, -3, 1, 2, 3)]
+
+
+def test_raycast_hits_the_nearest_face():
+    level = SpatialIndex([(5, 0, 0, 2, 2, 2), (9, 0, 0, 2, 2, 2)])
+    distance, normal = level.raycast((0, 0, 0), (1, 0, 0), 20)
+    assert distance == pytest.approx(4)
+    assert normal == (-1.0, 0.0, 0.0)
+    assert level.raycast((0, 0, 0), (-1, 0, 0), 20) is None
+
+
+def test_raycast_many_matches_raycast():
+    rng = np.random.default_rng(1)
+    platforms = [(*rng.uniform(-20, 20, 3), *rng.uniform(0.5, 3, 3)) for _ in range(200)]
+    level = SpatialIndex(platforms)
+    origins = rng.uniform(-20, 20, (500, 3))
+    directions = rng.normal(size=(500, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    lengths = rng.uniform(0.5, 10, 500) # some well over a cell, which take the slow path
+    hit, distance = level.raycast_many(origins, directions, lengths)
+    for i in range(500):
+        single = level.raycast(tuple(origins[i]), tuple(directions[i]), lengths[i])
+        assert hit[i] == (single is not None)
+        if single is not None:
+            assert distance[i] == pytest.approx(single[0])
+
+
+def test_raycast_many_finds_a_box_in_a_cell_neither_end_is_in():
+    # The ray starts in cell (0, 0) and ends in (1, 1), but crosses (1, 0) on the way
+    level = SpatialIndex([(4.3, 0, 3.8, 0.2, 1, 0.2)], cell_size=4.0)
+    origin = np.array([3.0, 0.0, 3.5])
+    delta = np.array([2.0, 0.0, 0.6])
+    length = np.linalg.norm(delta)
+    hit, distance = level.raycast_many([origin], [delta / length], length)
+    assert hit[0]
+    assert distance[0] == pytest.approx(level.raycast(tuple(origin), tuple(delta / length), length)[0])
+
+
+def test_ground_height_takes_the_highest_top_in_reach():
+    level = SpatialIndex([(0, 0, 0, 4, 1, 4), (0, 2, 0, 1, 1, 1)])
+    assert level.ground_height(0, 2.5, 0, 0.1, 0.1, 0.5) == pytest.approx(2.5)
+    assert level.ground_height(1.5, 2.5, 1.5, 0.1, 0.1, 2.5) == pytest.approx(0.5)
+    assert level.ground_height(10, 0, 10, 0.1, 0.1, math.inf) is None
+
+
+def test_sweep_ignores_faces_it_only_slides_along():
+    boxes = platform_boxes([(0, -0.5, 0, 10, 1, 10)])
+    t, normal = sweep_aabb(boxes, (0, 0.5, 0), (0.5, 0.5, 0.5), (3, 0, 0))
+    assert (t, normal) == (1.0, None)
+
+
+def test_slide_lands_and_keeps_moving_sideways():
+    boxes = platform_boxes([(0, -0.5, 0, 10, 1, 10)])
+    center, contacts = slide_aabb(boxes, (0, 2, 0), (0.5, 0.5, 0.5), (1, -3, 0))
+    assert center == pytest.approx([1, 0.5, 0])
+    assert contacts == [(0.0, 1.0, 0.0)]
+
+
+def random_level(seed, count, extent, sizes):
+    rng = np.random.default_rng(seed)
+    platforms = [(*rng.uniform(-extent, extent, 3), *rng.uniform(*sizes, 3)) for _ in range(count)]
+    return rng, platforms
+
+
+def test_grid_sweep_and_slide_match_the_brute_force_ones():
+    rng, platforms = random_level(3, 150, 15, (0.5, 4))
+    level = SpatialIndex(platforms)
+    boxes = platform_boxes(platforms)
+    half = (0.4, 0.9, 0.4)
+    for center, delta in zip(rng.uniform(-15, 15, (200, 3)), rng.uniform(-3, 3, (200, 3))):
+        center, delta = tuple(center), tuple(delta)
+        assert level.sweep(center, half, delta) == sweep_aabb(boxes, center, half, delta)
+        final, hits = level.slide(center, half, delta)
+        expected, expected_hits = slide_aabb(boxes, center, half, delta)
+        assert final == pytest.approx(expected)
+        assert hits == expected_hits
+
+
+def test_slide_many_matches_slide():
+    rng, platforms = random_level(2, 150, 15, (0.5, 4))
+    level = SpatialIndex(platforms)
+    boxes = platform_boxes(platforms)
+    half = (0.4, 0.9, 0.4)
+    centers = rng.uniform(-15, 15, (300, 3))
+    deltas = rng.uniform(-3, 3, (300, 3))
+    final, contacts = level.slide_many(centers, half, deltas)
+    for i in range(300):
+        center, hits = slide_aabb(boxes, tuple(centers[i]), half, tuple(deltas[i]))
+        assert final[i] == pytest.approx(center, abs=1e-6)
+        assert [tuple(n) for n in contacts[:len(hits), i]] == hits
+        assert not contacts[len(hits):, i].any()
+
+
+def test_raycast_many_matches_a_point_sweep():
+    rng, platforms = random_level(4, 200, 20, (0.5, 3))
+    level = SpatialIndex(platforms)
+    boxes = platform_boxes(platforms)
+    origins = rng.uniform(-20, 20, (300, 3))
+    directions = rng.normal(size=(300, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    hit, distance = level.raycast_many(origins, directions, 3.0)
+    for i in range(300):
+        t, normal = sweep_aabb(boxes, tuple(origins[i]), (0, 0, 0), tuple(directions[i] * 3.0))
+        assert hit[i] == (normal is not None)
+        if normal is not None:
+            assert distance[i] == pytest.approx(t * 3.0)
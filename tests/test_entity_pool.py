@@ -0,0 +1,50 @@
+from entity_pool import EntityPool, PoolRegistry
+
+
+class Thing:
+    def __init__(self):
+        self.enabled = True
+        self.position = None
+
+
+def place(entity, position):
+    entity.position = position
+
+
+def test_released_entities_are_reused():
+    pool = EntityPool(Thing, place)
+    first = pool.get((1, 2, 3))
+    assert first.enabled and first.position == (1, 2, 3)
+    assert pool.release(first)
+    assert not first.enabled
+    assert not pool.release(first) # twice does nothing
+    assert not pool.release(Thing()) # nor does a stranger
+    second = pool.get((4, 5, 6))
+    assert second is first and second.enabled and second.position == (4, 5, 6)
+    assert pool.created == 1
+
+
+def test_prewarm_and_release_all():
+    pool = EntityPool(Thing)
+    pool.prewarm(3)
+    assert pool.created == 3 and len(pool.free) == 3
+    assert not any(entity.enabled for entity in pool.free)
+    taken = [pool.get() for _ in range(4)]
+    assert pool.created == 4 and len(pool) == 4
+    pool.release_all()
+    assert len(pool.free) == 4 and not pool.in_use
+    assert not any(entity.enabled for entity in taken)
+
+
+def test_registry_routes_releases_to_the_right_pool():
+    pools = PoolRegistry()
+    pools.register('star', Thing, place)
+    pools.register('goomba', Thing, place)
+    pools.prewarm({'star': 2})
+    star = pools.get('star', (0, 1, 0))
+    goomba = pools.get('goomba', (0, 0, 0))
+    assert pools.release(goomba)
+    assert not pools.release(goomba)
+    assert pools.stats() == {'star': (1, 1, 2), 'goomba': (0, 1, 1)}
+    pools.release_all('star')
+    assert pools['star'].free[-1] is star
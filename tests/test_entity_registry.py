@@ -0,0 +1,43 @@
+from entity_registry import EntityRegistry
+
+
+class Thing:
+    pass
+
+
+def test_lookup_by_kind_and_world():
+    registry = EntityRegistry()
+    portal = registry.add(Thing(), 'portal', 'hub')
+    tree = registry.add(Thing(), 'scenery', 'hub')
+    sky = registry.add(Thing(), 'sky')
+    rock = registry.add(Thing(), 'scenery', 'grass')
+    assert registry.of('scenery') == [tree, rock]
+    assert registry.of('nothing') == []
+    assert registry.in_world('hub') == [portal, tree]
+    assert registry.in_world('hub', 'portal') == [portal]
+    assert registry.in_world(None) == [sky]
+    assert len(registry) == 4
+
+
+def test_take_world_leaves_the_rest():
+    registry = EntityRegistry()
+    portal = registry.add(Thing(), 'portal', 'hub')
+    sky = registry.add(Thing(), 'sky')
+    assert registry.take_world('hub') == [portal]
+    assert registry.take_world('hub') == []
+    assert registry.of('portal') == []
+    assert registry.of('sky') == [sky]
+    assert len(registry) == 1
+
+
+def test_destroying_removes_and_keeps_the_old_hook():
+    registry = EntityRegistry()
+    calls = []
+    thing = Thing()
+    thing.on_destroy = lambda: calls.append('own')
+    registry.add(thing, 'scenery', 'grass')
+    registry.add(thing, 'portal', 'hub') # refiled
+    assert registry.of('scenery') == [] and registry.of('portal') == [thing]
+    thing.on_destroy()
+    assert calls == ['own']
+    assert len(registry) == 0 and registry.in_world('hub') == []
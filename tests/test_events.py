@@ -0,0 +1,116 @@
+import pytest
+
+from events import EventBus, TimerWheel
+
+TICK = 1 / 60
+
+
+def test_emit_calls_subscribers_in_order():
+    bus = EventBus()
+    calls = []
+    bus.subscribe('star_collected', lambda n: calls.append(('hud', n)))
+    bus.subscribe('star_collected', lambda n: calls.append(('portal', n)))
+    assert bus.emit('star_collected', 3) == 2
+    assert calls == [('hud', 3), ('portal', 3)]
+    assert bus.emit('nobody_listens') == 0
+
+
+def test_unsubscribing_while_emitting():
+    bus = EventBus()
+    calls = []
+
+    def once():
+        calls.append('once')
+        bus.unsubscribe('tick', once)
+
+    bus.subscribe('tick', once)
+    bus.subscribe('tick', lambda: calls.append('always'))
+    bus.emit('tick')
+    bus.emit('tick')
+    assert calls == ['once', 'always', 'always']
+    bus.unsubscribe('tick', once) # already gone
+    bus.unsubscribe('never', once)
+
+
+def test_timers_run_in_due_order_within_one_advance():
+    wheel = TimerWheel(TICK)
+    calls = []
+    for name, delay in [('c', 0.5), ('a', 0.1), ('b', 0.25), ('a2', 0.1), ('d', 0)]:
+        wheel.after(delay, calls.append, name)
+    assert len(wheel) == 5
+    wheel.advance(1)
+    assert calls == ['d', 'a', 'a2', 'b', 'c']
+    assert len(wheel) == 0
+
+
+def test_delays_round_up_to_whole_ticks():
+    wheel = TimerWheel(TICK)
+    calls = []
+    wheel.after(TICK * 2.5, calls.append, 'late')
+    wheel.after(TICK * 2, calls.append, 'exact')
+    wheel.advance(TICK * 2)
+    assert calls == ['exact']
+    wheel.advance(TICK)
+    assert calls == ['exact', 'late']
+
+
+def test_small_frames_add_up():
+    wheel = TimerWheel(TICK)
+    calls = []
+    wheel.after(0.5, calls.append, 'done')
+    for _ in range(59):
+        wheel.advance(1 / 120)
+    assert calls == []
+    wheel.advance(1 / 120 + 1e-6)
+    assert calls == ['done']
+
+
+def test_long_delays_go_around_the_wheel():
+    wheel = TimerWheel(TICK, slots=8)
+    calls = []
+    wheel.after(TICK * 3, calls.append, 'short')
+    wheel.after(TICK * 11, calls.append, 'long') # same slot as 'short', one lap later
+    wheel.after(TICK * 27, calls.append, 'longer')
+    wheel.advance(TICK * 3)
+    assert calls == ['short']
+    wheel.advance(TICK * 7)
+    assert calls == ['short']
+    wheel.advance(TICK)
+    assert calls == ['short', 'long']
+    wheel.advance(TICK * 100)
+    assert calls == ['short', 'long', 'longer']
+
+
+def test_cancelled_timers_do_not_run():
+    wheel = TimerWheel(TICK)
+    calls = []
+    wheel.after(0.1, calls.append, 'kept')
+    wheel.after(0.1, calls.append, 'cancelled').cancel()
+    wheel.advance(1)
+    assert calls == ['kept']
+    assert len(wheel) == 0
+
+
+def test_timers_scheduled_by_timers():
+    wheel = TimerWheel(TICK)
+    calls = []
+
+    def chain(n):
+        calls.append((n, wheel.now))
+        if n < 3:
+            wheel.after(TICK, chain, n + 1)
+
+    wheel.after(TICK, chain, 0)
+    wheel.advance(TICK * 10)
+    assert calls == [(0, 1), (1, 2), (2, 3), (3, 4)]
+    assert wheel.now == 10
+
+
+def test_idle_wheel_keeps_time():
+    wheel = TimerWheel(TICK)
+    wheel.advance(1000)
+    assert wheel.now == pytest.approx(60000, abs=1)
+    calls = []
+    wheel.after(TICK, calls.append, 'next')
+    wheel.advance(TICK)
+    assert calls == ['next']
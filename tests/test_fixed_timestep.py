@@ -0,0 +1,23 @@
+import pytest
+
+from fixed_timestep import FixedTimestep, lerp_tuple
+
+
+def test_uneven_frames_add_up_to_whole_ticks():
+    clock = FixedTimestep(rate=120)
+    ticks = sum(clock.advance(dt) for dt in [1 / 60, 1 / 144, 1 / 30, 1 / 90] * 30)
+    assert ticks == clock.ticks
+    total = (1 / 60 + 1 / 144 + 1 / 30 + 1 / 90) * 30
+    assert ticks == int(total * 120 + 1e-9)
+    assert clock.alpha == pytest.approx(total * 120 - ticks, abs=1e-6)
+    assert 0 <= clock.alpha < 1
+
+
+def test_a_long_stall_is_capped():
+    clock = FixedTimestep(rate=120, max_steps=8)
+    assert clock.advance(5) == 8
+    assert clock.alpha == 0
+
+
+def test_lerp_tuple():
+    assert lerp_tuple((0, 10), (10, 20), 0.25) == (2.5, 12.5)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from activity import ActivityTiers
+from collision_index import SpatialIndex
+from goomba_system import GoombaSystem
+
+
+class Marker:
+    position = None
+
+
+class Player:
+    def __init__(self, position, velocity=(0, 0, 0)):
+        self.position = position
+        self.velocity = velocity
+        self.half_extents = (0.4, 0.9, 0.4)
+
+
+FLOOR = SpatialIndex([(0, -0.5, 0, 400, 1, 400)])
+DT = 1 / 120
+
+
+def walker(distance, interval=4):
+    """A system with one Goomba `distance` away from a player at the origin, walking +x."""
+    system = GoombaSystem(seed=0, activity=ActivityTiers(near=10, mid=100, mid_interval=interval))
+    marker = Marker()
+    slot = system.add((distance, 0.4, 0), patrol_area=1000, entity=marker)
+    system.directions[slot] = (1, 0, 0)
+    return system, marker
+
+
+@pytest.mark.parametrize('distance', [5, 50])
+def test_drawn_goombas_move_the_same_amount_every_tick(distance):
+    system, marker = walker(distance)
+    player = Player((0, 0, 0))
+    drawn = []
+    for tick in range(24):
+        system.update(DT, FLOOR, player)
+        system.write_back(0.5)
+        drawn.append(marker.position[0])
+    steps = np.diff(drawn[4:]) # skip the first interval, while a mid-range one waits for its slot
+    assert steps == pytest.approx(GoombaSystem.MOVE_SPEED * DT)
+
+
+def test_mid_range_goombas_cover_the_same_ground_as_near_ones():
+    near, _ = walker(5)
+    far, _ = walker(50)
+    player = Player((0, 0, 0))
+    for tick in range(40):
+        near.update(DT, FLOOR, player)
+        far.update(DT, FLOOR, player)
+    assert far.positions[0, 0] - 50 == pytest.approx(near.positions[0, 0] - 5, abs=4 * GoombaSystem.MOVE_SPEED * DT)
+
+
+def test_goombas_turn_at_walls():
+    level = SpatialIndex([(0, -0.5, 0, 400, 1, 400), (3, 1, 0, 1, 2, 10)])
+    system, _ = walker(0)
+    system.activity = ActivityTiers(near=100, mid=200)
+    player = Player((100, 0, 100))
+    for tick in range(600):
+        system.update(DT, level, player)
+        assert system.positions[0, 0] < 2.5 - GoombaSystem.SIZE[0] / 2 # never into the wall face at x=2.5
+
+
+def test_stomp_and_hurt():
+    system, _ = walker(0)
+    stomped, hurt = system.update(DT, FLOOR, Player((0, 0.5, 0), velocity=(0, -5, 0)))
+    assert list(stomped) == [0] and not hurt
+    assert not system.alive[0]
+
+    system, _ = walker(0)
+    stomped, hurt = system.update(DT, FLOOR, Player((0, 0, 0)))
+    assert not len(stomped) and hurt
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('ursina')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILDS = ['mario4k.py', 'ultramario4k.py', 'deltamario4k6.8.25.a.x.py', 'deltamario4k60fps6.9.25.a.py',
+          'clientv0.6.8.25.py', 'b33134k6.8.25.py']
+
+# A process only gets one Ursina app, so every build runs in its own
+DRIVE = '''
+import json, random, sys
+import headless
+random.seed(0) # the builds scatter props at random; the same layout every run
+game = headless.load_game(sys.argv[1])
+start = tuple(game['player'].position)
+game.hold('w')
+game.step(120)
+game.release('w')
+game.press('space', 2)
+game.step(60)
+print(json.dumps({'start': start, 'end': tuple(game['player'].position), 'report': game.report()}))
+'''
+
+
+def drive(build):
+    result = subprocess.run([sys.executable, '-c', DRIVE, build], cwd=ROOT, capture_output=True, text=True,
+                            timeout=300)
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('build', BUILDS)
+def test_every_build_loads_and_steps_headless(build):
+    run = drive(build)
+    assert run['report']['frames'] == 182
+    assert run['report']['seconds'] == pytest.approx(182 / 60)
+    assert all(abs(c) < 1000 for c in run['end']) # didn't fall out of the world or blow up
+    assert run['end'] != run['start']
+
+
+# The 60fps build's portals only hear about stars and the player through its EventBus
+PORTAL = '''
+import json, random
+import headless
+random.seed(0)
+game = headless.load_game('deltamario4k60fps6.9.25.a.py')
+desert = next(p for p in game['registry'].of('portal') if p.world_name == 'desert')
+game['sim'].body.position[:] = (desert.x, desert.y - 1.5, desert.z - 1)
+game.step(2)
+locked = {'portal': game['player'].portal is desert, 'text': game['ui'].instruction_text.text}
+game.press('e', 2)
+locked['world'] = game['sim'].world
+game['game_state'].stars = 3
+game['events'].emit('star_collected', 3)
+game.press('e', 2)
+print(json.dumps({'locked': locked, 'world': game['sim'].world, 'unlocked': game['game_state'].unlocked_worlds}))
+'''
+
+
+def test_portal_unlocks_on_star_event_and_enters_on_key():
+    result = subprocess.run([sys.executable, '-c', PORTAL], cwd=ROOT, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr[-2000:]
+    run = json.loads(result.stdout.strip().splitlines()[-1])
+    assert run['locked'] == {'portal': True, 'text': 'Need 3 more stars!', 'world': 'hub'}
+    assert run['world'] == 'desert'
+    assert 'desert' in run['unlocked']
+
+def test_command_line_run_reports_frame_times():
+    result = subprocess.run([sys.executable, 'headless.py', 'mario4k.py', '--frames', '30'], cwd=ROOT,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert "'frames': 30" in result.stdout.strip().splitlines()[-1]
@@ -0,0 +1,58 @@
+from hud import HudText, Instruction
+
+
+class Widget:
+    def __init__(self):
+        self.enabled = True
+        self.writes = 0
+        self._text = ''
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self.writes += 1
+        self._text = value
+
+
+def test_hud_text_only_writes_changes():
+    widget = Widget()
+    stars = HudText(widget, 'Stars: {}')
+    assert stars.set(0)
+    for _ in range(100):
+        assert not stars.set(0)
+    assert stars.set(1)
+    assert widget.text == 'Stars: 1'
+    assert widget.writes == 2
+
+
+def test_instruction_stays_up_while_asked_for():
+    widget = Widget()
+    instruction = Instruction(widget)
+    assert not widget.enabled
+    for _ in range(300): # five seconds of asking every frame
+        instruction.show('Press E', 2)
+        instruction.update(1 / 60)
+    assert widget.enabled and widget.text == 'Press E'
+    assert widget.writes == 1
+    for _ in range(110):
+        instruction.update(1 / 60)
+    assert widget.enabled
+    instruction.update(10 / 60)
+    assert not widget.enabled and not instruction.showing
+
+
+def test_a_new_message_restarts_the_timer():
+    widget = Widget()
+    instruction = Instruction(widget)
+    instruction.show('Long one', 10)
+    instruction.show('Short one', 1)
+    assert instruction.remaining == 1
+    instruction.update(1.5)
+    assert not widget.enabled
+    instruction.show('Short one', 1) # same text again, after it hid
+    assert widget.enabled and widget.writes == 2
+    instruction.hide()
+    assert not widget.enabled
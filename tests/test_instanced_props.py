@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('ursina')
+
+from instanced_props import InstancedProps
+
+
+@pytest.fixture
+def props(app):
+    return InstancedProps(model='cube', capacity=4)
+
+
+def test_added_copies_take_the_next_slots(props):
+    assert list(props.extend([(0, 0, 0), (1, 0, 0)])) == [0, 1]
+    assert props.add((2, 0, 0)) == 2
+    assert len(props) == 3
+    assert all(props.is_enabled(i) for i in range(3))
+
+
+def test_switched_off_copies_keep_their_slot(props):
+    props.extend([(0, 0, 0), (1, 0, 0)])
+    props.set_enabled(0, False)
+    assert not props.is_enabled(0) and props.is_enabled(1)
+    assert len(props) == 2
+    props.set_enabled(0, True)
+    assert props.is_enabled(0)
+
+
+def test_cleared_slots_are_reused(props):
+    props.extend([(0, 0, 0), (1, 0, 0), (2, 0, 0)])
+    data = props.data
+    props.clear()
+    assert len(props) == 0
+    assert props.add((5, 6, 7)) == 0
+    assert props.data is data # no new table
+    np.testing.assert_array_equal(props.data[0, 0, :3], (5, 6, 7))
+
+
+def test_capacity_grows_and_keeps_earlier_copies(props):
+    props.extend([(i, 0, 0) for i in range(3)], yaws=[10, 20, 30])
+    props.extend([(i, 1, 0) for i in range(3, 6)])
+    assert len(props) == 6 and len(props.data) == 8
+    np.testing.assert_array_equal(props.data[:6, 0, 0], range(6))
+    np.testing.assert_array_equal(props.data[:3, 0, 3], (10, 20, 30))
+    props.extend([(0, 0, 0)] * 20)
+    assert len(props) == 26 and len(props.data) == 26
+
+
+def test_instance_table_layout(props):
+    props.extend([(1, 2, 3), (4, 5, 6)], scales=[(1, 2, 1), (3, 3, 3)], yaws=[45, 90], colors=(1, 0, 0, 0.5))
+    props.set_enabled(1, False)
+    assert props.data.dtype == np.float32 and props.data.shape == (4, 3, 4)
+    # (x, y, z, yaw), (sx, sy, sz, enabled), (r, g, b, a) per copy
+    np.testing.assert_array_equal(props.data[0], [(1, 2, 3, 45), (1, 2, 1, 1), (1, 0, 0, 0.5)])
+    np.testing.assert_array_equal(props.data[1], [(4, 5, 6, 90), (3, 3, 3, 0), (1, 0, 0, 0.5)])
+
+
+def test_upload_sends_the_whole_table(props):
+    props.extend([(0, 0, 0), (10, 0, -4)], scales=2)
+    props.upload()
+    assert not props.dirty
+    assert props.buffer.get_x_size() == len(props.data) * 3
+    assert bytes(props.buffer.get_ram_image()) == props.data.tobytes()
+    assert props.getInstanceCount() == 2
+    bounds = props.node().get_bounds()
+    low, high = bounds.get_min(), bounds.get_max()
+    assert low.x < -2 and low.z < -6 and high.x > 12 and high.z > 2 # every copy's whole box
+
+
+def test_empty_table_hides_the_model(props):
+    props.upload()
+    assert props.model.is_hidden()
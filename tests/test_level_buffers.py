@@ -0,0 +1,88 @@
+"""The mesh buffers packed levels and the world loader hand the builds, as Ursina gets them."""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('ursina')
+
+from level_mesh import box_mesh_arrays
+from level_pack import EXTENSION, PackedLevel, compile_world
+from world_loader import WorldLoader
+from worlds import WORLDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_mesh(buffers):
+    from ursina import Mesh
+    vertices, triangles, uvs = buffers
+    return Mesh(vertices=vertices, triangles=triangles, uvs=uvs, static=True)
+
+
+def geom_counts(mesh):
+    geom = mesh.geomNode.get_geom(0)
+    return geom.get_vertex_data().get_num_rows(), geom.get_primitive(0).get_num_vertices()
+
+
+@pytest.mark.parametrize('name', list(WORLDS))
+def test_packed_meshes_are_read_only_views_of_the_file(tmp_path, name):
+    path = str(tmp_path / (name + EXTENSION))
+    compile_world(name, WORLDS[name], path)
+    level = PackedLevel(path)
+    for array in (level.mesh_vertices, level.mesh_triangles, level.mesh_uvs, level.platforms):
+        assert not array.flags.writeable
+        assert np.shares_memory(array, level.map)
+    with pytest.raises(ValueError):
+        level.mesh_vertices[0] = 1
+
+
+@pytest.mark.parametrize('name', list(WORLDS))
+def test_ursina_builds_meshes_from_packed_and_prepared_buffers(app, tmp_path, name):
+    path = str(tmp_path / (name + EXTENSION))
+    compile_world(name, WORLDS[name], path)
+    packed = PackedLevel(path).world_data()['mesh']
+    loader = WorldLoader(WORLDS)
+    try:
+        prepared = loader.take(name)['mesh']
+    finally:
+        loader.shutdown()
+    for buffers in (packed, prepared):
+        vertices, triangles, uvs = buffers
+        assert geom_counts(build_mesh(buffers)) == (len(vertices) // 3, len(triangles))
+    for a, b in zip(packed, prepared):
+        np.testing.assert_allclose(a, b, atol=1e-5)
+
+
+def test_client_platform_buffers_build_a_mesh(app):
+    platforms = WORLDS['grass']['platforms']
+    mesh = build_mesh(box_mesh_arrays(platforms))
+    assert geom_counts(mesh) == (24 * len(platforms), 36 * len(platforms))
+
+
+LOAD_EVERY_WORLD = '''
+import json, random, sys
+import headless
+random.seed(0) # the builds scatter props at random; the same layout every run
+game = headless.load_game(sys.argv[1])
+positions = {}
+for name in ['grass', 'desert', 'ice', 'lava', 'hub']:
+    game['load_world'](name)
+    game.hold('w') # the client drops you just off the edge of some worlds
+    game.step(90)
+    game.release('w')
+    positions[name] = tuple(game['player'].position)
+print(json.dumps(positions))
+'''
+
+
+@pytest.mark.parametrize('build', ['clientv0.6.8.25.py', 'deltamario4k60fps6.9.25.a.py'])
+def test_builds_load_every_world_from_the_buffers(build):
+    result = subprocess.run([sys.executable, '-c', LOAD_EVERY_WORLD, build], cwd=ROOT, capture_output=True,
+                            text=True, timeout=300)
+    assert result.returncode == 0, result.stderr[-2000:]
+    positions = json.loads(result.stdout.strip().splitlines()[-1])
+    assert all(-10 < y < 20 for x, y, z in positions.values()) # standing somewhere, not falling through
@@ -0,0 +1,37 @@
+import numpy as np
+
+from level_chunks import ChunkGrid, ChunkStreamer
+
+
+def test_small_boxes_go_to_the_chunk_holding_their_centre():
+    grid = ChunkGrid([(5, 0, 5, 2, 1, 2), (40, 0, -5, 2, 1, 2)], chunk_size=32)
+    assert sorted(grid.chunks) == [(0, 0), (1, -1)]
+    np.testing.assert_allclose(grid.platforms((1, -1)), [(40, 0, -5, 2, 1, 2)])
+
+
+def test_slab_bigger_than_a_chunk_is_cut_into_every_chunk_it_covers():
+    grid = ChunkGrid([(0, -1, 0, 200, 1, 200)], chunk_size=32)
+    # -100..100 covers chunks -4..3 on both axes
+    assert sorted(grid.chunks) == [(cx, cz) for cx in range(-4, 4) for cz in range(-4, 4)]
+    pieces = grid.boxes
+    assert np.isclose((pieces[:, 3] * pieces[:, 5]).sum(), 200 * 200)
+    assert np.all(pieces[:, 1] == -1) and np.all(pieces[:, 4] == 1)
+    np.testing.assert_allclose(grid.platforms((2, 2)), [(80, -1, 80, 32, 1, 32)])
+    np.testing.assert_allclose(grid.platforms((3, -4)), [(98, -1, -98, 4, 1, 4)])
+
+
+def test_box_ending_on_a_chunk_edge_stays_in_one_chunk():
+    grid = ChunkGrid([(16, 0, 16, 32, 1, 32)], chunk_size=32)
+    assert list(grid.chunks) == [(0, 0)]
+
+
+def test_slab_stays_drawn_under_the_player_far_from_its_centre():
+    grid = ChunkGrid([(0, -1, 0, 400, 1, 400)], chunk_size=32)
+    loaded = {}
+    streamer = ChunkStreamer(grid, lambda key: loaded.setdefault(key, grid.platforms(key)),
+                             lambda key, chunk: loaded.pop(key), radius=1, budget=16)
+    streamer.fill(150, 150)
+    under = grid.key(150, 150)
+    assert under in streamer.active
+    piece = loaded[under][0]
+    assert abs(piece[0] - 150) <= piece[3] / 2 and abs(piece[2] - 150) <= piece[5] / 2
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from level_mesh import box_mesh_arrays, optimized_mesh_arrays
+
+
+def quads(mesh):
+    """(corners, uvs) per quad of a mesh made of quads, as (Q, 4, 3) and (Q, 4, 2) arrays."""
+    vertices, triangles, uvs = mesh
+    vertices = vertices.reshape(-1, 3).astype(float)
+    uvs = uvs.reshape(-1, 2).astype(float)
+    tris = triangles.reshape(-1, 6)
+    corners = tris[:, [0, 1, 2, 5]] # (0, 1, 2), (0, 2, 3)
+    return vertices[corners], uvs[corners]
+
+
+def outward_normals(corners):
+    # Ursina is left-handed, so a front face's corners cross the other way round
+    n = np.cross(corners[:, 2] - corners[:, 0], corners[:, 1] - corners[:, 0])
+    return n / np.linalg.norm(n, axis=1, keepdims=True)
+
+
+def areas(corners):
+    return np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 3] - corners[:, 0]), axis=1)
+
+
+def voxels(platforms, size):
+    """Occupancy of unit voxels for integer-aligned boxes inside [0, size)^3."""
+    grid = np.zeros((size, size, size), dtype=bool)
+    for x, y, z, sx, sy, sz in platforms:
+        lo = np.array([x - sx / 2, y - sy / 2, z - sz / 2]).astype(int)
+        hi = np.array([x + sx / 2, y + sy / 2, z + sz / 2]).astype(int)
+        grid[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]] = True
+    return grid
+
+
+def exposed_area(grid):
+    padded = np.pad(grid, 1)
+    return sum(int((padded & ~np.roll(padded, shift, axis)).sum())
+               for axis in range(3) for shift in (1, -1))
+
+
+def test_box_mesh_is_a_cube_per_box():
+    vertices, triangles, uvs = box_mesh_arrays([(0, 0, 0, 2, 4, 6), (10, 0, 0, 1, 1, 1)])
+    assert vertices.dtype == np.float32 and triangles.dtype == np.uint32
+    assert len(vertices) == 2 * 24 * 3 and len(triangles) == 2 * 36 and len(uvs) == 2 * 24 * 2
+    first = vertices.reshape(-1, 3)[:24]
+    np.testing.assert_allclose(first.min(axis=0), (-1, -2, -3))
+    np.testing.assert_allclose(first.max(axis=0), (1, 2, 3))
+
+
+def test_touching_cubes_merge_into_six_quads():
+    corners, uvs = quads(optimized_mesh_arrays([(0.5, 0.5, 0.5, 1, 1, 1), (1.5, 0.5, 0.5, 1, 1, 1)]))
+    assert len(corners) == 6
+    assert areas(corners).sum() == pytest.approx(10)
+
+
+def test_greedy_mesh_covers_exactly_the_exposed_surface():
+    rng = np.random.default_rng(3)
+    size = 12
+    platforms = []
+    for _ in range(40):
+        extent = rng.integers(1, 5, 3)
+        lo = rng.integers(0, size - extent + 1)
+        platforms.append((*(lo + extent / 2), *extent))
+    grid = voxels(platforms, size)
+    corners, _ = quads(optimized_mesh_arrays(platforms))
+    assert areas(corners).sum() == pytest.approx(exposed_area(grid))
+
+    # Every quad faces out: just in front of it is empty, just behind it is solid
+    centres = corners.mean(axis=1)
+    normals = outward_normals(corners)
+    def solid(points):
+        cells = np.floor(points).astype(int)
+        inside = np.all((cells >= 0) & (cells < size), axis=1)
+        result = np.zeros(len(points), dtype=bool)
+        result[inside] = grid[tuple(cells[inside].T)]
+        return result
+    assert not solid(centres + normals * 0.01).any()
+    assert solid(centres - normals * 0.01).all()
+
+
+def test_merged_quads_keep_one_texture_repeat_per_unit():
+    corners, uvs = quads(optimized_mesh_arrays([(x + 0.5, 0.5, 0.5, 1, 1, 1) for x in range(8)]))
+    width = np.linalg.norm(corners[:, 1] - corners[:, 0], axis=1)
+    height = np.linalg.norm(corners[:, 3] - corners[:, 0], axis=1)
+    np.testing.assert_allclose(uvs[:, 2], np.column_stack([width, height]), atol=1e-5)
+    np.testing.assert_allclose(uvs[:, 0], 0)
+    assert width.max() == pytest.approx(8)
+
+
+def test_a_single_box_gets_world_unit_uvs_too():
+    # The hub is one slab; it has to tile like any slab in a bigger level
+    corners, uvs = quads(optimized_mesh_arrays([(0, -0.5, 0, 30, 1, 20)]))
+    assert len(corners) == 6
+    width = np.linalg.norm(corners[:, 1] - corners[:, 0], axis=1)
+    height = np.linalg.norm(corners[:, 3] - corners[:, 0], axis=1)
+    np.testing.assert_allclose(uvs[:, 2], np.column_stack([width, height]), atol=1e-5)
+    assert uvs.max() == pytest.approx(30)
+    _, with_neighbour = quads(optimized_mesh_arrays([(0, -0.5, 0, 30, 1, 20), (100, 0, 0, 1, 1, 1)]))
+    np.testing.assert_allclose(with_neighbour[:6], uvs)
+
+
+def test_no_boxes_make_an_empty_mesh():
+    vertices, triangles, uvs = optimized_mesh_arrays([])
+    assert len(vertices) == len(triangles) == len(uvs) == 0
+    assert vertices.dtype == np.float32 and triangles.dtype == np.uint32
@@ -0,0 +1,59 @@
+import copy
+
+import numpy as np
+import pytest
+
+from collision_index import SpatialIndex
+from game_sim import GameSim
+from level_pack import EXTENSION, PackedLevel, compile_world, packed_worlds
+from level_mesh import optimized_mesh_arrays
+from worlds import WORLDS
+
+
+@pytest.fixture
+def grass(tmp_path):
+    path = str(tmp_path / ('grass' + EXTENSION))
+    compile_world('grass', WORLDS['grass'], path)
+    return PackedLevel(path)
+
+
+def test_arrays_round_trip(grass):
+    data = WORLDS['grass']
+    assert np.array_equal(grass.platforms, np.asarray(data['platforms'], dtype=np.float32).reshape(-1, 6))
+    assert np.array_equal(grass.stars, np.asarray(data['stars'], dtype=np.float32))
+    vertices, triangles, uvs = optimized_mesh_arrays(np.asarray(data['platforms'], dtype=np.float32).reshape(-1, 6))
+    assert np.array_equal(grass.mesh_triangles, triangles)
+    assert np.allclose(grass.mesh_vertices, vertices)
+    assert np.allclose(grass.mesh_uvs, uvs)
+
+
+def test_packed_index_answers_like_a_fresh_one(grass):
+    fresh = SpatialIndex(WORLDS['grass']['platforms'])
+    packed = grass.spatial_index()
+    rng = np.random.default_rng(1)
+    for x, y, z in rng.uniform((-40, -5, -40), (40, 20, 40), (200, 3)):
+        assert packed.ground_height(x, y, z, 0.5, 0.5, 10) == fresh.ground_height(x, y, z, 0.5, 0.5, 10)
+
+
+def test_a_packed_world_plays_like_the_source(grass):
+    source, packed = GameSim(seed=2), GameSim(seed=2)
+    source.load_world('grass')
+    packed.load_world('grass', grass.world_data())
+    assert source.spawn_point() == pytest.approx(packed.spawn_point())
+    for i in range(240):
+        for sim in (source, packed):
+            sim.tick(1 / 120, 0.6, 0.8, jump=i % 50 == 0)
+    assert source.body.position == pytest.approx(packed.body.position, abs=1e-4)
+    assert source.stars_collected == packed.stars_collected
+
+
+def test_stale_and_foreign_packs_are_skipped(tmp_path):
+    compile_world('grass', WORLDS['grass'], str(tmp_path / 'grass.mlvl'))
+    compile_world('custom', WORLDS['ice'], str(tmp_path / 'custom.mlvl'))
+    (tmp_path / 'broken.mlvl').write_bytes(b'MLVL\x00\x00\x00\x00\x00\x00\x00\x00')
+    assert sorted(packed_worlds(str(tmp_path), WORLDS)) == ['custom', 'grass']
+
+    edited = copy.deepcopy(dict(WORLDS))
+    edited['grass']['stars'] = edited['grass']['stars'][1:]
+    assert sorted(packed_worlds(str(tmp_path), edited)) == ['custom']
+    assert packed_worlds(str(tmp_path / 'missing')) == {}
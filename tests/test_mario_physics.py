@@ -0,0 +1,83 @@
+import pytest
+
+from collision_index import SpatialIndex
+from mario_physics import MarioBody
+
+FLOOR = SpatialIndex([(0, -0.5, 0, 100, 1, 100)])
+DT = 1 / 120
+
+
+def settle(body, ticks=60):
+    for _ in range(ticks):
+        body.step(0, 0, DT)
+    return body
+
+
+def test_falls_onto_the_floor_and_stands_there():
+    body = settle(MarioBody(FLOOR, (0, 3, 0)), 240)
+    assert body.grounded
+    assert body.position[1] == pytest.approx(0)
+    assert body.velocity[1] == 0
+
+
+def test_falls_off_into_nothing():
+    body = settle(MarioBody(SpatialIndex(), (0, 3, 0)), 60)
+    assert not body.grounded
+    assert body.position[1] < 0
+
+
+def test_runs_up_to_speed():
+    body = settle(MarioBody(FLOOR, (0, 0.01, 0)))
+    for _ in range(240):
+        body.step(1, 0, DT)
+    assert body.velocity[0] == pytest.approx(MarioBody.SPEED, rel=1e-3)
+    assert body.grounded
+
+
+def test_jump_chain_goes_single_double_triple():
+    body = settle(MarioBody(FLOOR, (0, 0.01, 0)))
+    kinds = []
+    for _ in range(3):
+        kinds.append(body.step(0, 0, DT, jump=True))
+        while not body.grounded:
+            body.step(0, 0, DT)
+        body.jump_timer = 0 # land and go again inside the chain window
+    assert kinds == ['single', 'double', 'triple']
+    body.jump_timer = 0
+    assert body.jump() == 'triple' # the chain tops out until the window runs out
+
+
+def test_no_jump_in_the_air():
+    body = MarioBody(SpatialIndex(), (0, 10, 0))
+    assert body.step(0, 0, DT, jump=True) is None
+
+
+def test_wall_contact_allows_a_wall_jump_away_from_the_wall():
+    level = SpatialIndex([(0, -0.5, 0, 100, 1, 100), (2, 5, 0, 1, 10, 10)])
+    body = MarioBody(level, (0, 3, 0))
+    body.velocity = [6.0, 0.0, 0.0]
+    for _ in range(60):
+        body.handle_input(1, 0, DT)
+        body.update_physics(DT)
+        if body.can_wall_jump:
+            break
+    assert body.can_wall_jump and body.wall_normal == (-1.0, 0.0, 0.0)
+    assert body.jump() == 'wall'
+    assert body.velocity[0] < 0 and body.velocity[1] > 0
+
+
+def test_fast_fall_does_not_tunnel_through_a_thin_platform():
+    level = SpatialIndex([(0, 0, 0, 10, 0.1, 10)])
+    body = MarioBody(level, (0, 20, 0))
+    body.velocity = [0.0, -3000.0, 0.0] # 100 units this tick
+    body.update_physics(1 / 30)
+    assert body.grounded
+    assert body.position[1] == pytest.approx(0.05)
+
+
+def test_teleport_stops_everything():
+    body = MarioBody(FLOOR, (0, 3, 0))
+    body.velocity = [1.0, 2.0, 3.0]
+    body.teleport((5, 6, 7))
+    assert body.position == [5, 6, 7] and body.velocity == [0, 0, 0]
+    assert body.previous_position == (5, 6, 7)
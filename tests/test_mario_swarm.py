@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from collision_index import SpatialIndex
+from game_sim import GameSim
+from mario_physics import MarioBody
+from mario_swarm import JUMP_KINDS, MarioSwarm, simulate
+from worlds import WORLDS
+
+DT = 1 / 120
+
+
+def lockstep(level, starts, ticks, seed=0, **constants):
+    """Runs a swarm and one MarioBody per row on the same random input, checking every tick."""
+    swarm = MarioSwarm(level, starts, **constants)
+    bodies = []
+    for i, start in enumerate(starts):
+        body = MarioBody(level, start)
+        for name, value in constants.items():
+            setattr(body, name, float(value[i]) if np.ndim(value) else value)
+        bodies.append(body)
+    rng = np.random.default_rng(seed)
+    seen = set()
+    heading = rng.uniform(0, 2 * np.pi, len(starts))
+    for tick in range(ticks):
+        turning = rng.random(len(starts)) < 0.02
+        heading[turning] = rng.uniform(0, 2 * np.pi, turning.sum())
+        running = rng.random(len(starts)) < 0.9
+        move = np.column_stack([np.cos(heading), np.sin(heading)]) * running[:, None]
+        jump = rng.random(len(starts)) < 0.05
+        long_jump = rng.random(len(starts)) < 0.5
+        kinds = swarm.step(move, DT, jump, long_jump)
+        seen.update(JUMP_KINDS[kind] for kind in kinds)
+        for i, body in enumerate(bodies):
+            kind = body.step(move[i, 0], move[i, 1], DT, bool(jump[i]), bool(long_jump[i]))
+            assert JUMP_KINDS[kinds[i]] == kind, (tick, i)
+            assert tuple(swarm.position[i]) == tuple(body.position), (tick, i)
+            assert tuple(swarm.velocity[i]) == tuple(body.velocity), (tick, i)
+            assert swarm.grounded[i] == body.grounded, (tick, i)
+            assert swarm.can_wall_jump[i] == body.can_wall_jump, (tick, i)
+            assert swarm.jump_count[i] == body.jump_count, (tick, i)
+    return seen
+
+
+def test_matches_mario_body_exactly_on_a_real_world():
+    level = SpatialIndex(WORLDS['grass']['platforms'])
+    rng = np.random.default_rng(4)
+    starts = rng.uniform((-15, 2, -15), (15, 8, 15), (24, 3))
+    assert {'single', 'double', 'long'} <= lockstep(level, starts, 600)
+
+
+def test_matches_mario_body_exactly_between_walls():
+    # A corridor narrow enough to wall jump up, so the wall rules get exercised
+    level = SpatialIndex([(0, -0.5, 0, 40, 1, 40), (-1.5, 10, 0, 1, 20, 40), (1.5, 10, 0, 1, 20, 40)])
+    starts = [(x, y, 0) for x in (-0.5, 0, 0.5) for y in (0, 3, 6)]
+    assert 'wall' in lockstep(level, starts, 600, seed=1)
+
+
+def test_per_player_constants_match_mario_body():
+    level = SpatialIndex([(0, -0.5, 0, 200, 1, 200)])
+    starts = np.zeros((8, 3))
+    lockstep(level, starts, 300, seed=2, SPEED=np.linspace(4, 10, 8), JUMP_FORCE=np.linspace(8, 14, 8))
+
+
+def test_unknown_constants_are_rejected():
+    with pytest.raises(TypeError):
+        MarioSwarm(SpatialIndex(), np.zeros((1, 3)), SPEEED=3)
+
+
+def test_simulate_repeats_for_a_seed():
+    first = simulate('grass', 50, 240, seed=5)
+    second = simulate('grass', 50, 240, seed=5)
+    assert np.array_equal(first.positions, second.positions)
+    assert np.array_equal(first.falls, second.falls)
+    assert (first.positions[:, 1] >= GameSim.world_kill_height(WORLDS['grass'])).all()
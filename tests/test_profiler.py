@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import profiler as profiler_module
+from profiler import MAX_SECTIONS, NULL_SCOPE, FrameProfiler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(profiler_module, '_clock', lambda: now[0])
+    return now
+
+
+def test_disabled_scopes_are_the_shared_no_op():
+    profiler = FrameProfiler()
+    assert profiler.scope('player') is NULL_SCOPE
+    profiler.next_frame()
+    assert profiler.frames == 0
+    assert profiler.summary() == []
+
+
+def test_nested_sections_count_their_own_time_only(clock):
+    profiler = FrameProfiler(enabled=True)
+    with profiler.scope('player'):
+        clock[0] += 0.002
+        with profiler.scope('physics'):
+            clock[0] += 0.003
+    clock[0] += 0.005
+    profiler.next_frame()
+    rows = {name: mean for name, mean, _ in profiler.summary()}
+    assert rows['physics'] == pytest.approx(3)
+    assert rows['player'] == pytest.approx(2)
+    assert rows['other'] == pytest.approx(5)
+    assert rows['frame'] == pytest.approx(10)
+    assert [name for name, _, _ in profiler.summary()][:2] == ['physics', 'player']
+
+
+def test_too_many_sections():
+    profiler = FrameProfiler(enabled=True)
+    for i in range(MAX_SECTIONS):
+        profiler.scope(f's{i}')
+    with pytest.raises(ValueError):
+        profiler.scope('one more')
+
+
+def test_chrome_trace_export(clock, tmp_path):
+    profiler = FrameProfiler(enabled=True)
+    with profiler.scope('enemies'):
+        clock[0] += 0.001
+    profiler.next_frame()
+    path = tmp_path / 'traces' / 'trace.json'
+    assert profiler.export_chrome_trace(str(path)) == 2
+    events = json.loads(path.read_text())['traceEvents']
+    assert [event['name'] for event in events] == ['enemies', 'frame']
+    assert events[0]['dur'] == pytest.approx(1000)
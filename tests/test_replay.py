@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from game_sim import move_vector
+from replay import FORMAT_VERSION, InputRecorder, load_recording, replay
+
+
+def record(path):
+    recorder = InputRecorder(rate=120, seed=3)
+    recorder.start(yaw=30)
+    recorder.event('world:grass')
+    recorder.tick(set())
+    for i in range(240):
+        recorder.add_mouse(0.01, 0)
+        if i % 40 == 0:
+            recorder.event('space')
+        recorder.tick({'w', 'd'} if i < 160 else {'a', 'shift'})
+    recorder.stop()
+    recorder.tick({'w'}) # not recording any more
+    recorder.save(path)
+    return recorder
+
+
+def test_move_vector_follows_the_camera():
+    assert move_vector(set(), 0) == (0.0, 0.0)
+    assert move_vector({'w'}, 0) == pytest.approx((0, 1))
+    assert move_vector({'w'}, 90) == pytest.approx((1, 0))
+    assert move_vector({'d'}, 0) == pytest.approx((1, 0))
+    assert move_vector({'w', 'd'}, 0) == pytest.approx((2 ** -0.5, 2 ** -0.5))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / 'runs' / 'run.json'
+    recorder = record(str(path))
+    recording = load_recording(str(path))
+    assert (recording.rate, recording.seed, recording.yaw) == (120, 3, 30)
+    assert recording.frames == recorder.frames
+    assert len(recording.frames) == 241
+    assert recording.frames[0].events == ('world:grass',)
+
+
+def test_replay_is_deterministic(tmp_path):
+    path = str(tmp_path / 'run.json')
+    record(path)
+    first, second = replay(path), replay(path)
+    assert first.world == 'grass'
+    assert first.ticks == 241
+    assert first.position == second.position
+    assert first.stars == second.stars
+
+
+def test_unknown_version_is_rejected(tmp_path):
+    path = tmp_path / 'old.json'
+    path.write_text(json.dumps({'version': FORMAT_VERSION + 1, 'rate': 120, 'seed': 0, 'yaw': 0, 'frames': []}))
+    with pytest.raises(ValueError):
+        load_recording(str(path))
@@ -0,0 +1,53 @@
+import pytest
+
+from collision_index import SpatialIndex
+from spawn_index import STAND_MARGIN, SpawnIndex
+
+
+def test_explicit_spawn_wins():
+    spawns = SpawnIndex(SpatialIndex([(0, 0, 0, 10, 1, 10)]), spawn=(1, 2, 3))
+    assert spawns.spawn == (1.0, 2.0, 3.0)
+    assert spawns.respawn_point() == (1.0, 2.0, 3.0)
+
+
+def test_without_a_spawn_the_highest_top_under_the_origin_is_used():
+    level = SpatialIndex([(0, 0, 0, 10, 1, 10), (0, 4, 0, 2, 1, 2)])
+    assert SpawnIndex(level).spawn == pytest.approx((0, 4.5 + STAND_MARGIN, 0))
+
+
+def test_ground_near_skips_unsafe_surfaces():
+    level = SpatialIndex([
+        (0, 0, 0, 0.5, 1, 0.5), # too narrow to stand on
+        (3, -50, 0, 2, 1, 2), # under the kill height
+        (0, 0, 40, 4, 1, 4), # covered by the block above it
+        (0, 1.5, 40, 4, 1, 4),
+        (100, 0, 0, 4, 1, 4),
+    ])
+    spawns = SpawnIndex(level, kill_height=-10)
+    assert spawns.ground_near(0, 0) == pytest.approx((0, 2 + STAND_MARGIN, 38.4))
+    assert spawns.ground_near(95, 0) == pytest.approx((98.4, 0.5 + STAND_MARGIN, 0))
+    assert SpawnIndex(SpatialIndex()).ground_near(0, 0) is None
+
+
+def test_ground_near_matches_a_brute_force_search():
+    level = SpatialIndex([(x * 7 % 60 - 30, (x * 3) % 5, x * 11 % 60 - 30, 2, 1, 2) for x in range(40)])
+    spawns = SpawnIndex(level)
+    for x, z in [(0, 0), (-25, 13), (40, -40), (7.5, 2.25)]:
+        found = spawns.ground_near(x, z)
+        best = min(
+            (((sx - x) ** 2 + (sz - z) ** 2, -box[4]), (sx, sz))
+            for box in level.boxes
+            for sx, sz in [spawns._stand_point(box, x, z)]
+            if spawns.is_safe(box, sx, sz)
+        )
+        assert (found[0], found[2]) == pytest.approx(best[1])
+
+
+def test_checkpoints():
+    level = SpatialIndex([(0, 0, 0, 40, 1, 40)])
+    spawns = SpawnIndex(level, spawn=(0, 1, 0), checkpoints=[(10, 1, 10), (-10, 1, 0)])
+    assert spawns.checkpoint_at(10.5, 1, 9) == 0
+    assert spawns.checkpoint_at(-10, 1.5, 1) == 1
+    assert spawns.checkpoint_at(10, 5, 10) is None # too far above
+    assert spawns.checkpoint_at(0, 1, 0) is None
+    assert spawns.respawn_point(1) == (-10.0, 1.0, 0.0)
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('ursina')
+
+from static_batch import flatten_static
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def geom_count(node):
+    return sum(found.node().get_num_geoms() for found in node.find_all_matches('**/+GeomNode'))
+
+
+def bounds(nodes):
+    from ursina import scene
+    corners = [node.getTightBounds(scene) for node in nodes]
+    return ([min(low[i] for low, _ in corners) for i in range(3)],
+            [max(high[i] for _, high in corners) for i in range(3)])
+
+
+def test_one_geom_per_material_and_the_same_bounds(app):
+    from ursina import Entity, color
+    walls = [Entity(model='cube', color=color.random_color(), position=(i * 3, i % 2, -i), scale=(1, 2 + i, 1),
+                    rotation_y=i * 20) for i in range(10)]
+    floor = Entity(model='cube', texture='grass', scale=(40, 0.1, 40), collider='box')
+    expected = bounds([*walls, floor])
+    batch = flatten_static([*walls, floor])
+    assert geom_count(batch) == 2 # the untextured walls, and the grass floor
+    low, high = bounds([batch])
+    assert low == pytest.approx(expected[0], abs=1e-4)
+    assert high == pytest.approx(expected[1], abs=1e-4)
+    # Anything with a collider stays, hidden, to stand on; the rest are gone
+    assert floor.collider is not None and not floor.visible
+    assert all(wall.is_empty() for wall in walls)
+
+
+CASTLE = '''
+import json, random, sys
+import headless
+random.seed(0) # the builds scatter props at random; the same layout every run
+game = headless.load_game('b33134k6.8.25.py')
+batch = game['castle_scene']
+low, high = batch.getTightBounds()
+print(json.dumps({
+    'geoms': sum(found.node().get_num_geoms() for found in batch.find_all_matches('**/+GeomNode')),
+    'low': tuple(low), 'high': tuple(high),
+}))
+'''
+
+
+def test_castle_scene_draws_as_three_geoms():
+    result = subprocess.run([sys.executable, '-c', CASTLE], cwd=ROOT, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr[-2000:]
+    castle = json.loads(result.stdout.strip().splitlines()[-1])
+    assert castle['geoms'] == 3 # the sky's texture, the grass floor's, and everything untextured
+    # The sky is the biggest thing in the scene, so the batch is its 100-unit cube
+    assert castle['low'] == pytest.approx((-50, -50, -50))
+    assert castle['high'] == pytest.approx((50, 50, 50))
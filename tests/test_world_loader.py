@@ -0,0 +1,38 @@
+import random
+
+from level_chunks import STREAM_THRESHOLD, ChunkGrid
+from world_loader import WorldLoader, prepare_world
+from worlds import WORLDS
+
+
+def test_prepare_world_builds_index_and_mesh_without_touching_the_source():
+    source = WORLDS['desert']
+    prepared = prepare_world(source)
+    assert 'index' not in source and 'mesh' not in source
+    assert prepared['platforms'] is source['platforms']
+    vertices, triangles, uvs = prepared['mesh']
+    assert len(vertices) // 3 == len(uvs) // 2 and len(triangles)
+    x, y, z = prepared['platforms'][0][:3]
+    assert prepared['index'].ground_height(x, y + 5, z, 0.1, 0.1, 10) is not None
+
+
+def test_big_worlds_get_chunks_instead_of_one_mesh():
+    rng = random.Random(0)
+    platforms = [(rng.uniform(-200, 200), 0, rng.uniform(-200, 200), 2, 1, 2) for _ in range(STREAM_THRESHOLD + 1)]
+    prepared = prepare_world({'platforms': platforms, 'stars': [], 'goombas': []})
+    assert isinstance(prepared['chunks'], ChunkGrid)
+    assert 'mesh' not in prepared
+
+
+def test_loader_prepares_each_world_once():
+    loader = WorldLoader(WORLDS)
+    try:
+        job = loader.preload('ice')
+        assert loader.preload('ice') is job
+        assert not loader.ready('lava')
+        world = loader.take('ice')
+        assert loader.ready('ice')
+        assert loader.take('ice') is world
+        assert 'index' in world and 'mesh' in world
+    finally:
+        loader.shutdown()
@@ -1,15 +1,13 @@
 from ursina import *
 import random
+import math
 import os
+from collectibles import CollectibleGrid, star_transform
+from collision_index import SpatialIndex
+from entity_registry import EntityRegistry
+from headless import make_app, run
 
-app = Ursina()
-window.title = 'Mario Platformer'
-window.size = (800, 600)
-window.fps_counter.enabled = True
-window.exit_button.visible = False
-
-def distance_xz(a, b):
-    return (a.x - b.x)**2 + (a.z - b.z)**2
+app = make_app(title='Mario Platformer', size=(800, 600), fps_counter=True, exit_button=False)
 
 class GameState:
     def __init__(self):
@@ -75,24 +73,26 @@ class MarioController(Entity):
         self.grounded = False
 
     def update_physics(self):
-        if not self.grounded:
-            self.velocity.y -= self.GRAVITY * time.dt
-
-        hit_info = self.move(self.velocity * time.dt)
-        if hit_info.hit:
-            self.grounded = False
-            
-        ground_ray = raycast(self.world_position + (0,0.1,0), (0,-1,0), distance=0.2)
-        if ground_ray.hit:
-            if self.velocity.y < 0:
+        # Gravity always pulls, so standing still still presses us into the floor and finds it
+        self.velocity.y -= self.GRAVITY * time.dt
+        self.grounded = False
+        for normal in self.slide(self.velocity * time.dt):
+            if normal[1]: # Landed, or bumped our head
                 self.velocity.y = 0
-            self.grounded = True
-        else:
-            self.grounded = False
-            
+                self.grounded = self.grounded or normal[1] > 0
+
         if self.y < -20:
             self.respawn()
 
+    def slide(self, delta):
+        """Moves our box by delta through the level's SpatialIndex, sliding along what it hits.
+
+        Returns the contact normals, in the order they were hit.
+        """
+        center, contacts = level.slide(tuple(self.position), tuple(self.scale / 2), tuple(delta))
+        self.position = center
+        return contacts
+
     def respawn(self):
         spawn_point = {
             'hub': (0, 2, 0),
@@ -107,23 +107,10 @@ class MarioController(Entity):
 
 class Star(Entity):
     def __init__(self, position=(0, 1, 0), **kwargs):
-        super().__init__(
-            model='sphere',
-            color=color.yellow,
-            scale=0.6,
-            position=position,
-            collider='sphere',
-            always_on_top=True,
-            **kwargs
-        )
-        self.rotation_speed = 100
-        self.start_y = self.y
-
-    def update(self):
-        self.rotation_y += self.rotation_speed * time.dt
-        self.y = self.start_y + sin(time.time() * 2) * 0.1
-        if distance_xz(self.position, player.position) < 1.44:
-            self.collect()
+        super().__init__(position=position, **kwargs)
+        # Model, spin and bob come from the CollectibleManager's shared prototype
+        collectible_manager.star_model.instanceTo(self)
+        self.slot = stars.add(position, self)
 
     def collect(self):
         game_state.stars += 1
@@ -131,6 +118,18 @@ class Star(Entity):
         Audio(clip='saw', pitch=random.uniform(0.9, 1.1), volume=0.5)
         self.disable()
 
+class CollectibleManager(Entity):
+    """Animates the shared star model and runs pickups for the player's nearby grid cells only."""
+    def __init__(self):
+        super().__init__()
+        self.star_model = Entity(model='sphere', color=color.yellow, scale=0.6, always_on_top=True)
+        self.star_model.parent = NodePath('star_prototype') # Only ever drawn through its instances
+
+    def update(self):
+        self.star_model.rotation_y, self.star_model.y = star_transform(time.time(), rotation_speed=100, float_amplitude=0.1)
+        for i in stars.collect_near(*player.position):
+            stars.entities[i].collect()
+
 class Goomba(Entity):
     def __init__(self, position=(0, 0, 0), **kwargs):
         super().__init__(
@@ -146,8 +145,10 @@ class Goomba(Entity):
         self.direction = random.choice([Vec3(1,0,0), Vec3(-1,0,0), Vec3(0,0,1), Vec3(0,0,-1)])
 
     def update(self):
-        hit_info = self.move(self.direction * self.move_speed * time.dt)
-        if hit_info.hit and hit_info.entity != player:
+        delta = self.direction * self.move_speed * time.dt
+        center, contacts = level.slide(tuple(self.position), tuple(self.scale / 2), tuple(delta))
+        self.position = center
+        if any(normal[0] or normal[2] for normal in contacts): # Walked into a wall
             self.direction = -self.direction
 
         if self.intersects(player).hit:
@@ -203,15 +204,19 @@ class UI(Entity):
             origin=(-0.5, 0.5)
         )
 
-world_objects = []
+registry = EntityRegistry() # Everything a world creates, filed under that world
+stars = CollectibleGrid(pickup_height=math.inf) # Stars are picked up at any height here
+level = SpatialIndex() # The current world's platforms, for the player's and Goombas' collision
 
 def clear_world():
-    global world_objects
-    for obj in world_objects:
+    for obj in registry.take_world(game_state.current_world):
         destroy(obj)
-    world_objects.clear()
+    stars.clear()
 
 def create_level(platforms, color_theme, sky_texture):
+    global level
+    # Platforms are (sx, sy, sz, x, y, z) here; the index takes (x, y, z, sx, sy, sz)
+    level = SpatialIndex([(*p[3:], *p[:3]) for p in platforms])
     for p in platforms:
         platform = Entity(
             model='cube',
@@ -221,59 +226,58 @@ def create_level(platforms, color_theme, sky_texture):
             position=p[3:],
             collider='box'
         )
-        world_objects.append(platform)
+        registry.add(platform, 'platform', game_state.current_world)
     
     # Handle skybox correctly
-    existing_sky = [e for e in scene.entities if isinstance(e, Sky)]
-    for sky in existing_sky:
+    for sky in registry.of('sky'):
         destroy(sky)
-    sky = Sky(texture=sky_texture)
-    world_objects.append(sky)
+    registry.add(Sky(texture=sky_texture), 'sky', game_state.current_world)
+
+# Built once at startup, not on every load_world call
+WORLD_DATA = {
+    'hub': {
+        'platforms': [(30, 1, 30, 0, 0, 0)],
+        'color': color.gray,
+        'sky': 'sky_sunset',
+        'objects': [
+            (WorldPortal, {'position': (-10, 1.5, 8), 'world_name': 'grass', 'required_stars': 0}),
+            (WorldPortal, {'position': (10, 1.5, 8), 'world_name': 'desert', 'required_stars': 3})
+        ]
+    },
+    'grass': {
+        'platforms': [
+            (20, 1, 20, 0, 0, 0), (8, 1, 8, 8, 2, 5),
+            (6, 1, 6, -10, 4, -8), (10, 1, 4, 5, 6, 12),
+            (3, 1, 3, 0, 8, -5)
+        ],
+        'color': color.green,
+        'sky': 'sky_default',
+        'objects': [
+            (Star, {'position': (0, 2, 0)}),
+            (Star, {'position': (8, 4.5, 5)}),
+            (Star, {'position': (-10, 6.5, -8)}),
+            (Star, {'position': (5, 8.5, 12)}),
+            (Star, {'position': (0, 10.5, -5)}),
+            (Goomba, {'position': (3, 1, 3)}),
+            (Goomba, {'position': (-5, 1, -2)})
+        ]
+    }
+}
 
 def load_world(world_name):
     clear_world()
     game_state.current_world = world_name
     
-    world_data = {
-        'hub': {
-            'platforms': [(30, 1, 30, 0, 0, 0)],
-            'color': color.gray,
-            'sky': 'sky_sunset',
-            'objects': [
-                (WorldPortal, {'position': (-10, 1.5, 8), 'world_name': 'grass', 'required_stars': 0}),
-                (WorldPortal, {'position': (10, 1.5, 8), 'world_name': 'desert', 'required_stars': 3})
-            ]
-        },
-        'grass': {
-            'platforms': [
-                (20, 1, 20, 0, 0, 0), (8, 1, 8, 8, 2, 5),
-                (6, 1, 6, -10, 4, -8), (10, 1, 4, 5, 6, 12),
-                (3, 1, 3, 0, 8, -5)
-            ],
-            'color': color.green,
-            'sky': 'sky_default',
-            'objects': [
-                (Star, {'position': (0, 2, 0)}),
-                (Star, {'position': (8, 4.5, 5)}),
-                (Star, {'position': (-10, 6.5, -8)}),
-                (Star, {'position': (5, 8.5, 12)}),
-                (Star, {'position': (0, 10.5, -5)}),
-                (Goomba, {'position': (3, 1, 3)}),
-                (Goomba, {'position': (-5, 1, -2)})
-            ]
-        }
-    }
-    
-    data = world_data.get(world_name, world_data['hub'])
+    data = WORLD_DATA.get(world_name, WORLD_DATA['hub'])
     create_level(data['platforms'], data['color'], data['sky'])
     for obj_class, obj_kwargs in data.get('objects', []):
-        entity = obj_class(**obj_kwargs)
-        world_objects.append(entity)
+        registry.add(obj_class(**obj_kwargs), obj_class.__name__.lower(), world_name)
     
     player.respawn()
 
 ui = UI()
 player = MarioController(position=(0, 5, 0))
+collectible_manager = CollectibleManager()
 load_world('hub')
 
-app.run()
+run(app)
@@ -0,0 +1,53 @@
+"""Background world preparation.
+
+Everything expensive about switching worlds is plain data work: bucketing platforms into
+the collision index and building the level mesh buffers. WorldLoader does that on a
+worker thread as soon as it's asked to preload a world (the game asks when the player
+walks up to an unlocked portal), so entering only has to swap the finished pieces in.
+Prepared worlds are kept, so going back to one is free too.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from collision_index import SpatialIndex
+from level_chunks import STREAM_THRESHOLD, ChunkGrid
+from level_mesh import optimized_mesh_arrays
+
+
+def prepare_world(data):
+    """Returns a copy of a world's data with its collision 'index' and 'mesh' buffers built.
+
+    Worlds over STREAM_THRESHOLD platforms get 'chunks' (a ChunkGrid) instead of one mesh.
+    """
+    prepared = dict(data)
+    if 'index' not in prepared:
+        prepared['index'] = SpatialIndex(data['platforms'])
+    if len(data['platforms']) > STREAM_THRESHOLD:
+        prepared.setdefault('chunks', ChunkGrid(data['platforms']))
+    elif 'mesh' not in prepared:
+        prepared['mesh'] = optimized_mesh_arrays(data['platforms']) if len(data['platforms']) else None
+    return prepared
+
+
+class WorldLoader:
+    def __init__(self, worlds, workers=1):
+        self.worlds = worlds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='world-loader')
+        self.jobs = {}
+
+    def preload(self, name):
+        """Starts preparing a world in the background, once; cheap enough to call every frame."""
+        job = self.jobs.get(name)
+        if job is None:
+            job = self.jobs[name] = self.executor.submit(prepare_world, self.worlds[name])
+        return job
+
+    def ready(self, name):
+        job = self.jobs.get(name)
+        return job is not None and job.done()
+
+    def take(self, name):
+        """Returns the prepared world, waiting for the worker if it's still busy with it."""
+        return self.preload(name).result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,54 @@
+"""World layouts for the 60fps build, as plain data.
+
+Platforms use the (x, y, z, sx, sy, sz) tuples create_level_from_data takes. Nothing in
+here touches Ursina, so the headless simulation, replays and tools can load the same
+worlds the game draws. Colours and scenery stay with the world functions in the game.
+level_pack.py compiles these into binary .mlvl files that load without any parsing.
+"""
+
+WORLDS = {
+    'hub': {
+        'platforms': [
+            (0, -1, 0, 30, 1, 30), # Ground
+        ],
+        'spawn': (0, 2, 0),
+        'stars': [],
+        'goombas': [],
+        'portals': [ # (position, world, stars needed)
+            ((-10, 1, 8), 'grass', 0), ((10, 1, 8), 'desert', 3),
+            ((-10, 1, -8), 'ice', 8), ((10, 1, -8), 'lava', 15),
+        ],
+    },
+    'grass': {
+        'platforms': [
+            (0, 0, 0, 20, 1, 20), (8, 2, 5, 8, 1, 8), (-10, 4, -8, 6, 1, 6),
+            (5, 6, 12, 10, 1, 4), (0, 8, -5, 3, 1, 3)
+        ],
+        'stars': [(0, 2, 0), (8, 5, 5), (-10, 7, -8), (5, 9, 12), (0, 12, -5)],
+        'goombas': [(3, 1, 3), (-5, 1, -2), (8, 4, 8), (-8, 6, -8)],
+    },
+    'desert': {
+        'platforms': [
+            (0, 0, 0, 25, 1, 25), (15, 3, 8, 6, 1, 6), (-12, 5, -6, 8, 1, 4),
+            (8, 8, -15, 4, 1, 8), (0, 4, 10, 3, 8, 3) # Pyramid
+        ],
+        'stars': [(0, 2, 0), (15, 6, 8), (-12, 8, -6), (8, 11, -15), (0, 10, 10)],
+        'goombas': [(4, 1, -4), (-6, 1, 5), (15, 5, 10)],
+    },
+    'ice': {
+        'platforms': [
+            (0, -1, 0, 20, 1, 20), (15, 4, 10, 6, 1, 6), (-12, 7, -8, 8, 1, 5), (10, 10, -12, 5, 1, 8)
+        ],
+        'stars': [(0, 2, 0), (15, 7, 10), (-12, 10, -8), (10, 13, -12), (-5, 5, 5)],
+        'goombas': [(5, 1, -3), (-4, 1, 6), (15, 6, 12)],
+        'speed': 8, # Slippery!
+    },
+    'lava': {
+        'platforms': [
+            (0, 0, 0, 8, 1, 8), (12, 5, 8, 5, 1, 5), (-10, 8, -10, 6, 1, 4), (8, 12, -15, 4, 1, 6)
+        ],
+        'stars': [(0, 3, 0), (12, 8, 8), (-10, 11, -10), (8, 15, -15), (5, 3, -5)],
+        'goombas': [(6, 1, -2), (-3, 1, 4), (12, 7, 10)],
+        'lava_y': -2, # Lava floor that hurts you
+    },
+}